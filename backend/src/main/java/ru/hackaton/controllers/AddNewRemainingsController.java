@@ -17,6 +17,7 @@ import org.springframework.web.bind.annotation.RestController;
 import org.springframework.web.multipart.MultipartFile;
 import ru.hackaton.parsers.FromMultipartToFile;
 import ru.hackaton.parsers.StockRemainingsParser;
+import ru.hackaton.service.ColumnarExportService;
 
 import java.io.File;
 
@@ -45,6 +46,9 @@ public class AddNewRemainingsController {
     @Autowired
     private FromMultipartToFile fromMultipartToFile;
 
+    @Autowired
+    private ColumnarExportService columnarExportService;
+
     /**
      * Эндпоинт для загрузки файлов в формате XLSX.
      *
@@ -69,6 +73,7 @@ public class AddNewRemainingsController {
             parser.processFile(simplyFile);
             log.info("Файл загрузился");
             simplyFile.delete();
+            columnarExportService.refresh("stock");
         } catch (Exception e) {
             log.error("Exception occured: {}", e.getMessage());
             return ResponseEntity.status(404).body(FAILED_MESSAGE);
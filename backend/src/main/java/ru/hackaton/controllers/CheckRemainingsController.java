@@ -1,5 +1,7 @@
 package ru.hackaton.controllers;
 
+import com.fasterxml.jackson.databind.JsonNode;
+import com.fasterxml.jackson.databind.ObjectMapper;
 import io.swagger.v3.oas.annotations.Operation;
 import io.swagger.v3.oas.annotations.media.Content;
 import io.swagger.v3.oas.annotations.media.Schema;
@@ -47,7 +49,7 @@ public class CheckRemainingsController {
     })
     public ResponseEntity<RemainingsResponse> checkRemainings(@RequestParam("product") String product) {
         String pythonScriptPath = "/backend/src/main/java/ru/hackaton/python_scripts/remainings_by_item.py";
-        String[] command = {"python3", pythonScriptPath, product};
+        String[] command = {"python3", pythonScriptPath, product, "--inline"};
         String message = "";
         byte[] imageBytes = new byte[0];
 
@@ -74,18 +76,15 @@ public class CheckRemainingsController {
                 return ResponseEntity.status(404).body(new CheckRemainingsController.RemainingsResponse(errorBuilder.toString(), null));
             }
 
-            String[] outputLines = message.split("\n");
-            if (outputLines.length == 1) {
-                String predictionMessage = outputLines[0].trim();
+            // Скрипт возвращает сообщение и изображение в base64 одним JSON, без промежуточных файлов
+            JsonNode response = new ObjectMapper().readTree(message);
+            String predictionMessage = response.get("message").asText().trim();
+            JsonNode images = response.get("images");
+            if (images.size() == 0) {
                 return ResponseEntity.status(404).body(new CheckRemainingsController.RemainingsResponse(predictionMessage, null));
             }
-            String predictionMessage = outputLines[0].trim();
-            String imagePath = outputLines[1].trim();
 
-            imageBytes = readFileToByteArray(imagePath);
-
-            File file = new File(imagePath);
-            file.delete();
+            imageBytes = images.get(0).binaryValue();
 
             return ResponseEntity.ok(new CheckRemainingsController.RemainingsResponse(predictionMessage, imageBytes));
         } catch (IOException | InterruptedException e) {
@@ -94,22 +93,6 @@ public class CheckRemainingsController {
         return ResponseEntity.ok(new RemainingsResponse(message, imageBytes));
     }
 
-    /**
-     * Читает файл и возвращает его содержимое в виде массива байтов.
-     *
-     * @param filePath Путь к файлу.
-     * @return Массив байтов, представляющий содержимое файла.
-     * @throws IOException Если возникает ошибка ввода-вывода при чтении файла.
-     */
-    private byte[] readFileToByteArray(String filePath) throws IOException {
-        File imgFile = new File(filePath);
-        byte[] fileBytes = new byte[(int) imgFile.length()];
-        try (FileInputStream fis = new FileInputStream(imgFile)) {
-            fis.read(fileBytes);
-        }
-        return fileBytes;
-    }
-
     /**
      * Внутренний класс, представляющий ответ, содержащий сообщение и изображение (если доступно).
      */
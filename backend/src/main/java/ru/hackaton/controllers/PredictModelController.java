@@ -1,5 +1,7 @@
 package ru.hackaton.controllers;
 
+import com.fasterxml.jackson.databind.JsonNode;
+import com.fasterxml.jackson.databind.ObjectMapper;
 import io.swagger.v3.oas.annotations.Operation;
 import io.swagger.v3.oas.annotations.media.Content;
 import io.swagger.v3.oas.annotations.media.Schema;
@@ -48,7 +50,7 @@ public class PredictModelController {
     })
     public ResponseEntity<PredictionResponse> predict(@RequestParam("product") String product, @RequestParam("month") Integer month) {
         String pythonScriptPath = "/backend/src/main/java/ru/hackaton/python_scripts/forcaster.py";
-        String[] command = {"python3", pythonScriptPath, product, month.toString()};
+        String[] command = {"python3", pythonScriptPath, product, month.toString(), "--inline"};
         String message = "";
         byte[] imageBytes1 = new byte[0];
         byte[] imageBytes2 = new byte[0];
@@ -77,31 +79,20 @@ public class PredictModelController {
                 return ResponseEntity.status(404).body(new PredictionResponse(errorBuilder.toString(), null, null));
             }
 
-            // Parsing message to get image paths
-            String[] outputLines = message.split("\n");
-            if (outputLines.length == 1) {
-                String predictionMessage = outputLines[0].trim();
+            // Скрипт возвращает сообщение и изображения в base64 одним JSON, без промежуточных файлов
+            JsonNode response = new ObjectMapper().readTree(message);
+            String predictionMessage = response.get("message").asText().trim();
+            JsonNode images = response.get("images");
+            if (images.size() == 0) {
                 log.info("We got ONLY prediction");
                 return ResponseEntity.status(200).body(new PredictionResponse(predictionMessage, null, null));
             }
-            if (outputLines.length == 2) {
-                String predictionMessage = outputLines[0].trim();
-                String imagePath1 = outputLines[1].trim();
-                imageBytes1 = readFileToByteArray(imagePath1);
+            imageBytes1 = images.get(0).binaryValue();
+            if (images.size() == 1) {
                 log.info("We got prediction and ONLY one image");
                 return ResponseEntity.status(200).body(new PredictionResponse(predictionMessage, imageBytes1, null));
             }
-            String predictionMessage = outputLines[0].trim();
-            String imagePath1 = outputLines[1].trim();
-            String imagePath2 = outputLines[2].trim();
-
-            imageBytes1 = readFileToByteArray(imagePath1);
-            imageBytes2 = readFileToByteArray(imagePath2);
-
-            File file = new File(imagePath1);
-            file.delete();
-            file = new File(imagePath2);
-            file.delete();
+            imageBytes2 = images.get(1).binaryValue();
 
             log.info("All good! We got prediction and two images");
             return ResponseEntity.ok(new PredictionResponse(predictionMessage, imageBytes1, imageBytes2));
@@ -112,22 +103,6 @@ public class PredictModelController {
         }
     }
 
-    /**
-     * Читает содержимое файла в массив байтов.
-     *
-     * @param filePath Путь к файлу.
-     * @return Массив байтов, содержащий данные файла.
-     * @throws IOException Если происходит ошибка при чтении файла.
-     */
-    private byte[] readFileToByteArray(String filePath) throws IOException {
-        File imgFile = new File(filePath);
-        byte[] fileBytes = new byte[(int) imgFile.length()];
-        try (FileInputStream fis = new FileInputStream(imgFile)) {
-            fis.read(fileBytes);
-        }
-        return fileBytes;
-    }
-
     /**
      * Внутренний класс, представляющий ответ, содержащий предсказание и изображения.
      */
@@ -17,6 +17,7 @@ import org.springframework.web.bind.annotation.RestController;
 import org.springframework.web.multipart.MultipartFile;
 import ru.hackaton.parsers.FromMultipartToFile;
 import ru.hackaton.parsers.TurnoversParser;
+import ru.hackaton.service.ColumnarExportService;
 
 import java.io.File;
 
@@ -44,6 +45,9 @@ public class TurnoversController {
     @Autowired
     TurnoversParser parser;
 
+    @Autowired
+    ColumnarExportService columnarExportService;
+
     /**
      * Эндпоинт для загрузки файла оборотов в формате XLSX.
      *
@@ -66,6 +70,7 @@ public class TurnoversController {
             File excelFile = fromMultipartToFile.convertMultipartFileToFile(file);
             parser.processFile(excelFile);
             excelFile.delete();
+            columnarExportService.refresh("turnovers");
         } catch (Exception e) {
             log.error("Exception occurred: {}", e.getMessage());
             return ResponseEntity.status(404).body(FAILED_MESSAGE);
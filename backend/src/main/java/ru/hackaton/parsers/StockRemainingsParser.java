@@ -4,6 +4,8 @@ import com.mongodb.client.MongoClient;
 import com.mongodb.client.MongoClients;
 import com.mongodb.client.MongoCollection;
 import com.mongodb.client.MongoDatabase;
+import com.mongodb.client.model.Filters;
+import com.mongodb.client.model.UpdateOptions;
 import lombok.Data;
 import lombok.extern.slf4j.Slf4j;
 import org.apache.poi.xssf.usermodel.XSSFWorkbook;
@@ -15,6 +17,13 @@ import ru.hackaton.config.ApplicationConfig;
 import java.io.File;
 import java.io.FileInputStream;
 import java.io.IOException;
+import java.time.LocalDate;
+import java.time.ZoneOffset;
+import java.time.format.DateTimeFormatter;
+import java.time.format.DateTimeParseException;
+import java.util.Arrays;
+import java.util.Collections;
+import java.util.Date;
 import java.util.regex.Matcher;
 import java.util.regex.Pattern;
 
@@ -29,6 +38,7 @@ public class StockRemainingsParser {
     private static MongoClient client;
     private static MongoDatabase db;
     private static MongoCollection<Document> collection;
+    private static MongoCollection<Document> latestStock;
     private static final String EXCEPTION_LOG = "Exception occurred: {}";
 
     /**
@@ -41,6 +51,7 @@ public class StockRemainingsParser {
         client = MongoClients.create(config.getMongoUrl());
         db = client.getDatabase("stock_remainings");
         collection = db.getCollection("Складские остатки");
+        latestStock = db.getCollection("Последние остатки");
     }
 
     /**
@@ -108,7 +119,7 @@ public class StockRemainingsParser {
                             .append("Дата", date)
                             .append("сч", 21)
                             .append("полное название", val2);
-                    collection.insertOne(document);
+                    insertDocument(document);
                 }
             } catch (NumberFormatException e){
                 String string = cell0.getStringCellValue();
@@ -195,7 +206,7 @@ public class StockRemainingsParser {
                                                     .append("сч", 105)
                                                     .append("полное название", value0.substring(0, value0.lastIndexOf(',')));
                                             //System.out.println(document);
-                                            collection.insertOne(document);
+                                            insertDocument(document);
                                         }
                                     } catch (IllegalStateException ex) {
                                         log.error("Error processing row for MongoDB insertion: {}", ex.getMessage());
@@ -246,7 +257,7 @@ public class StockRemainingsParser {
                             .append("Дата", date)
                             .append("сч", 101)
                             .append("полное название", val2);
-                    collection.insertOne(document);
+                    insertDocument(document);
                 }
             }catch (NumberFormatException e){
                 String string = cell0.getStringCellValue();
@@ -268,6 +279,43 @@ public class StockRemainingsParser {
 
     }
 
+    /**
+     * Сохранение строки остатков и обновление снимка последних остатков товара.
+     *
+     * @param document документ складских остатков
+     */
+    private static void insertDocument(Document document) {
+        collection.insertOne(document);
+        updateLatestStock(document.getString("Название"), document.getString("Дата"),
+                Double.parseDouble(String.valueOf(document.get("Остаток"))));
+    }
+
+    /**
+     * Обновление документа товара в коллекции "Последние остатки".
+     *
+     * Остаток заменяется, если дата ведомости не раньше сохраненной. Python-скрипты читают
+     * последний остаток товара из этой коллекции одним запросом по _id.
+     *
+     * @param name      нормализованное имя товара
+     * @param date      дата ведомости в формате dd.MM.yyyy
+     * @param remaining остаток
+     */
+    private static void updateLatestStock(String name, String date, double remaining) {
+        Date moment;
+        try {
+            moment = Date.from(LocalDate.parse(date, DateTimeFormatter.ofPattern("dd.MM.yyyy"))
+                    .atStartOfDay(ZoneOffset.UTC).toInstant());
+        } catch (DateTimeParseException e) {
+            log.error(EXCEPTION_LOG, e.getMessage());
+            return;
+        }
+        Document newer = new Document("$gte", Arrays.asList(moment, new Document("$ifNull", Arrays.asList("$Дата", moment))));
+        Document update = new Document("$set", new Document()
+                .append("Остаток", new Document("$cond", Arrays.asList(newer, remaining, "$Остаток")))
+                .append("Дата", new Document("$cond", Arrays.asList(newer, moment, "$Дата"))));
+        latestStock.updateOne(Filters.eq("_id", name), Collections.singletonList(update), new UpdateOptions().upsert(true));
+    }
+
     /**
      * Метод для нормализации имени товара (удаляет пробелы и приводит к нижнему регистру).
      *
@@ -4,6 +4,9 @@ import com.mongodb.client.MongoClient;
 import com.mongodb.client.MongoClients;
 import com.mongodb.client.MongoCollection;
 import com.mongodb.client.MongoDatabase;
+import com.mongodb.client.model.Filters;
+import com.mongodb.client.model.UpdateOptions;
+import com.mongodb.client.model.Updates;
 import lombok.Data;
 import lombok.extern.slf4j.Slf4j;
 import org.apache.poi.ss.usermodel.Cell;
@@ -12,13 +15,18 @@ import org.apache.poi.ss.usermodel.Sheet;
 import org.apache.poi.ss.usermodel.Workbook;
 import org.apache.poi.xssf.usermodel.XSSFWorkbook;
 import org.bson.Document;
+import org.bson.conversions.Bson;
 import org.springframework.stereotype.Component;
 import ru.hackaton.config.ApplicationConfig;
 
 import java.io.File;
 import java.io.FileInputStream;
 import java.io.IOException;
+import java.util.ArrayList;
+import java.util.Arrays;
+import java.util.Collections;
 import java.util.HashMap;
+import java.util.List;
 import java.util.Map;
 import java.util.regex.Matcher;
 import java.util.regex.Pattern;
@@ -31,8 +39,22 @@ public class TurnoversParser {
     private static MongoClient client;
     private static MongoDatabase db;
     private static MongoCollection<Document> collection;
+    private static MongoCollection<Document> calendar;
+    private static MongoCollection<Document> buckets;
+    private static MongoCollection<Document> latestPrices;
     private static final String EXCEPTION_LOG = "Exception occurred: {}";
     private static final String SUCCESS_UPLOAD = "Файл успешно загружен";
+    /**
+     * Колонки оборотной ведомости и поля массивов в документе товара коллекции "Обороты по товарам".
+     */
+    private static final String[][] BUCKET_FIELDS = {
+            {"единиц до", "ub"}, {"единиц дебет во", "ud"}, {"единиц кредит во", "uc"}, {"единиц после", "ua"},
+            {"цена до", "pb"}, {"цена дебет во", "pd"}, {"цена кредит во", "pc"}, {"цена после", "pa"}
+    };
+    /**
+     * Поля строки оборотной ведомости, которые хранит коллекция "Последние цены".
+     */
+    private static final String[] PRICE_FIELDS = {"цена до", "цена после", "цена кредит во", "цена дебет во", "единица измерения"};
 
     /**
      * Конструктор для инициализации компонента.
@@ -44,6 +66,9 @@ public class TurnoversParser {
         client = MongoClients.create(config.getMongoUrl());
         db = client.getDatabase("stock_remainings");
         collection = db.getCollection("Оборотная ведомость");
+        calendar = db.getCollection("Отчетные периоды");
+        buckets = db.getCollection("Обороты по товарам");
+        latestPrices = db.getCollection("Последние цены");
     }
 
     /**
@@ -61,7 +86,29 @@ public class TurnoversParser {
             process101(file);
         } else {
             log.error("Skipping {}, no matching function found", file.getName());
+            return;
+        }
+        String[] quarterYear = extractQuarterYear(file.getName());
+        updateReportCalendar(quarterYear[0], quarterYear[1]);
+    }
+
+    /**
+     * Добавление загруженного периода в календарь отчетных периодов.
+     *
+     * Python-скрипты держат календарь в памяти и перечитывают его при смене версии.
+     * Если документа календаря еще нет, скрипты построят его сами по всей коллекции.
+     *
+     * @param quarter квартал
+     * @param year    год
+     */
+    private void updateReportCalendar(String quarter, String year) {
+        String[] quarterEnds = {"-03-31", "-06-30", "-09-30", "-12-31"};
+        if (quarter == null || year == null || !quarter.matches("[1-4]")) {
+            return;
         }
+        String date = year + quarterEnds[Integer.parseInt(quarter) - 1];
+        calendar.updateOne(Filters.eq("_id", "quarters"),
+                Updates.combine(Updates.addToSet("dates", date), Updates.inc("version", 1)));
     }
 
     /**
@@ -258,6 +305,55 @@ public class TurnoversParser {
      */
     private void insertDataToDb(Map<String, Object> data) {
         collection.insertOne(new Document(data));
+        updateTurnoverBucket(data);
+        updateLatestPrice(data);
+    }
+
+    /**
+     * Обновление документа товара в коллекции "Последние цены".
+     *
+     * Цены заменяются, если квартал строки не раньше сохраненного. Python-скрипты читают
+     * цену товара для JSON закупки из этой коллекции одним запросом по _id.
+     *
+     * @param data данные строки оборотной ведомости
+     */
+    private void updateLatestPrice(Map<String, Object> data) {
+        String quarter = (String) data.get("квартал");
+        String year = (String) data.get("год");
+        if (quarter == null || year == null) {
+            return;
+        }
+        int key = Integer.parseInt(year) * 10 + Integer.parseInt(quarter);
+        Document newer = new Document("$gte", Arrays.asList(key, new Document("$ifNull", Arrays.asList("$q", key))));
+        Document fields = new Document("q", new Document("$cond", Arrays.asList(newer, key, "$q")));
+        for (String field : PRICE_FIELDS) {
+            fields.append(field, new Document("$cond", Arrays.asList(newer, new Document("$literal", data.get(field)), "$" + field)));
+        }
+        latestPrices.updateOne(Filters.eq("_id", data.get("name")), Collections.singletonList(new Document("$set", fields)),
+                new UpdateOptions().upsert(true));
+    }
+
+    /**
+     * Дописывание строки в документ товара коллекции "Обороты по товарам".
+     *
+     * Документ хранит параллельные массивы: ключ квартала (год * 10 + квартал) и числовые колонки,
+     * NaN сохраняется как null. Python-скрипты читают из него всю историю товара одним запросом.
+     *
+     * @param data данные строки оборотной ведомости
+     */
+    private void updateTurnoverBucket(Map<String, Object> data) {
+        String quarter = (String) data.get("квартал");
+        String year = (String) data.get("год");
+        if (quarter == null || year == null) {
+            return;
+        }
+        List<Bson> pushes = new ArrayList<>();
+        pushes.add(Updates.push("q", Integer.parseInt(year) * 10 + Integer.parseInt(quarter)));
+        for (String[] field : BUCKET_FIELDS) {
+            Object value = data.get(field[0]);
+            pushes.add(Updates.push(field[1], value instanceof Double && ((Double) value).isNaN() ? null : value));
+        }
+        buckets.updateOne(Filters.eq("_id", data.get("name")), Updates.combine(pushes), new UpdateOptions().upsert(true));
     }
 
     /**
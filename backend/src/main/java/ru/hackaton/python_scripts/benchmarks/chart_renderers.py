@@ -0,0 +1,76 @@
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+from io import BytesIO
+from time import perf_counter
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.abspath(os.path.join(current_dir, '..')))
+
+# Сравнение движков отрисовки: время импорта, время одного графика и пиковая память.
+# Каждый движок запускается в отдельном процессе, чтобы импорт измерялся на холодном интерпретаторе.
+
+LABELS = ['2022-03-31', '2022-06-30', '2022-09-30', '2022-12-31']
+VALUES = [12., 0., 7.5, 31.]
+TITLE = 'Остатки за период в конце квартала'
+
+
+def load_renderer(name):
+    """
+    Импортирует движок и возвращает функцию отрисовки в файловый объект.
+
+    :param name: seaborn (прежний путь), matplotlib или pillow
+    """
+    if name == 'seaborn':
+        import pandas, seaborn
+        from matplotlib import pyplot
+        from render_charts import render_legacy
+        return render_legacy
+    module = {'matplotlib': 'utils.mpl_plot_scripts', 'pillow': 'utils.pil_plot_scripts'}[name]
+    render_bar_chart = __import__(module, fromlist=['render_bar_chart']).render_bar_chart
+    return lambda target: render_bar_chart(LABELS, VALUES, TITLE, 'Остатки', target)
+
+
+def child(name, count):
+    start = perf_counter()
+    render = load_renderer(name)
+    import_time = perf_counter() - start
+
+    start = perf_counter()
+    render(BytesIO())
+    first_render = perf_counter() - start
+
+    start = perf_counter()
+    for _ in range(count):
+        render(BytesIO())
+    render_time = (perf_counter() - start) / count
+
+    print(json.dumps({'import': import_time, 'first': first_render, 'render': render_time,
+                      'rss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Время импорта, отрисовки и память движков графиков.')
+    parser.add_argument('--renderers', nargs='+', default=['seaborn', 'matplotlib', 'pillow'])
+    parser.add_argument('--count', type=int, default=50)
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.count)
+        return
+
+    print(f'{"движок":<12}{"импорт, мс":>12}{"1-й график, мс":>16}{"график, мс":>12}{"пик RSS, МБ":>13}')
+    for name in args.renderers:
+        output = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', name, '--count', str(args.count)],
+                                check=True, capture_output=True, text=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f'{name:<12}{result["import"] * 1000:>12.0f}{result["first"] * 1000:>16.1f}'
+              f'{result["render"] * 1000:>12.1f}{result["rss"]:>13.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+import argparse
+import glob
+import os
+import random
+import sys
+import tempfile
+from time import perf_counter
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.abspath(os.path.join(current_dir, '..')))
+
+DATASET_DIR = os.path.abspath(os.path.join(current_dir, *(['..'] * 8), 'dataset'))
+# Справочник и правила читаются из dataset/, сохраненный словарь справочника пишется во временную папку
+os.environ.setdefault('SETTINGS_DIR', os.path.join(DATASET_DIR, 'Настроечные таблицы', ''))
+os.environ.setdefault('CACHE_ROOT', tempfile.mkdtemp(prefix='json_batch_'))
+
+from pymongo import MongoClient
+
+import json_maker
+from utils import mongo_scripts
+from utils.index_scripts import ensure_indexes
+from utils.workbook_scripts import read_catalog, read_turnovers
+
+# Пропускная способность json_maker: make_json по одному товару (как при вызове скрипта на каждый товар,
+# без учета запуска процесса) против make_json_batch для того же списка товаров.
+# Требует запущенный MongoDB; пишет в отдельную базу, которая удаляется после прогона.
+
+
+def fill_database(database, dataset_dir):
+    """
+    :return: Нормализованные названия товаров из оборотной ведомости и справочника
+    """
+    for name in database.list_collection_names():
+        database.drop_collection(name)
+    turnovers = [doc for path in sorted(glob.glob(os.path.join(dataset_dir, 'Обороты по счету', '*.xlsx')))
+                 for doc in read_turnovers(path)]
+    catalog = list(read_catalog(os.path.join(dataset_dir, 'КПГЗ ,СПГЗ, СТЕ.xlsx')))
+    database['Оборотная ведомость'].insert_many(turnovers, ordered=False)
+    database['Справочники'].insert_many(catalog, ordered=False)
+    ensure_indexes(database)
+    return sorted({doc['name'] for doc in turnovers} | {json_maker.normalize_name(str(doc['Название СТЕ']))
+                                                        for doc in catalog})
+
+
+def make_records(names, count, seed):
+    rng = random.Random(seed)
+    return [[rng.choice(names), i, 1, rng.randint(1, 500), '01.01.2024', '31.03.2024'] for i in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Пропускная способность json_maker по одному товару и пакетом.')
+    parser.add_argument('--url', default='mongodb://localhost:27017')
+    parser.add_argument('--database', default='stock_remainings_benchmark')
+    parser.add_argument('--dataset', default=DATASET_DIR)
+    parser.add_argument('--items', type=int, nargs='+', default=[1000, 5000])
+    parser.add_argument('--keep', action='store_true', help='Не удалять базу после прогона')
+    args = parser.parse_args()
+
+    client = MongoClient(args.url)
+    mongo_scripts.MONGO_URL, mongo_scripts.DB_NAME = args.url, args.database
+    try:
+        names = fill_database(client[args.database], args.dataset)
+        print(f'Товаров в базе: {len(names)}')
+        start = perf_counter()
+        json_maker.warm_up()
+        print(f'Справочник и правила загружены за {perf_counter() - start:.2f} с')
+
+        print(f'{"товаров":>8}{"по одному":>22}{"пакетом":>22}')
+        for count in args.items:
+            records = make_records(names, count, seed=count)
+            start = perf_counter()
+            single = [json_maker.make_json(params) for params in records]
+            single_time = perf_counter() - start
+            start = perf_counter()
+            batch = json_maker.make_json_batch(records)
+            batch_time = perf_counter() - start
+            assert len(single) == len(batch) == count
+            print(f'{count:>8}{count / single_time:>14.0f} шт/с{count / batch_time:>14.0f} шт/с'
+                  f'   ({single_time:.2f} с / {batch_time:.2f} с)')
+    finally:
+        if not args.keep:
+            client.drop_database(args.database)
+        client.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+import argparse
+import os
+import sys
+import threading
+from time import perf_counter
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.abspath(os.path.join(current_dir, '..')))
+
+from pymongo import MongoClient
+
+from utils import mongo_scripts
+
+# Накладные расходы на подключение к MongoDB на один запрос прогноза: прежний путь создавал
+# новый MongoClient в каждом обращении (не меньше трех на прогноз), новый использует общий клиент.
+# Требует запущенный MongoDB (по умолчанию mongo_scripts.MONGO_URL).
+
+COLLECTIONS = ('Оборотная ведомость', 'Нормализированные имена', 'Складские остатки')
+
+
+def request_per_call_clients(url):
+    for name in COLLECTIONS:
+        MongoClient(url)[mongo_scripts.DB_NAME][name].find_one({'name': '__benchmark__'})
+
+
+def request_shared_client(url):
+    for name in COLLECTIONS:
+        mongo_scripts.get_collection(name).find_one({'name': '__benchmark__'})
+
+
+def run(name, request, url, count):
+    request(url)
+    threads_before = threading.active_count()
+    timings = []
+    for _ in range(count):
+        start = perf_counter()
+        request(url)
+        timings.append(perf_counter() - start)
+    timings.sort()
+    print(f'{name:<28}среднее {sum(timings) / count * 1000:8.2f} мс  p95 {timings[int(count * 0.95) - 1] * 1000:8.2f} мс  '
+          f'потоков +{threading.active_count() - threads_before}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Накладные расходы на подключение к MongoDB на один запрос.')
+    parser.add_argument('--url', default=mongo_scripts.MONGO_URL)
+    parser.add_argument('--count', type=int, default=200)
+    args = parser.parse_args()
+
+    mongo_scripts.MONGO_URL = args.url
+    run('MongoClient на обращение', request_per_call_clients, args.url, args.count)
+    run('общий клиент', request_shared_client, args.url, args.count)
+    mongo_scripts.close_client()
+
+
+if __name__ == '__main__':
+    main()
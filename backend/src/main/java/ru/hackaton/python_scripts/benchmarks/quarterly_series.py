@@ -0,0 +1,84 @@
+import argparse
+import os
+import sys
+from datetime import datetime
+from time import perf_counter
+
+import numpy as np
+import pandas as pd
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.abspath(os.path.join(current_dir, '..')))
+
+from utils.series_scripts import quarterly_frame
+from utils.time_scripts import make_datetime
+
+# Построение квартального ряда товара по суммам за периоды на длинных синтетических историях:
+# прежний путь (create_dataframe + add_missing_dates + sort_values) против series_scripts.quarterly_frame.
+
+
+def synthetic_history(years, fill, seed):
+    """
+    :param years: Длина календаря в годах
+    :param fill: Доля кварталов, в которых у товара есть данные
+    :return: Суммы {(квартал, год): значение} и даты календаря
+    """
+    rng = np.random.default_rng(seed)
+    periods = [(str(quarter), str(year)) for year in range(2100 - years, 2100) for quarter in range(1, 5)]
+    dates = [make_datetime(quarter, year).strftime('%Y-%m-%d') for quarter, year in periods]
+    chosen = rng.random(len(periods)) < fill
+    sums = {period: float(rng.integers(0, 100)) for period, keep in zip(periods, chosen) if keep}
+    return sums, dates
+
+
+def build_legacy(sums, dates):
+    """Прежний путь: перебор дат календаря с форматированием всей колонки на каждой итерации."""
+    df = pd.DataFrame([(value, make_datetime(key[0], key[1])) for key, value in sums.items()],
+                      columns=['Kredit', 'дата'])
+    new_rows = []
+    for date in dates:
+        if date not in df['дата'].apply(lambda x: x.strftime('%Y-%m-%d')).values:
+            new_rows.append({'дата': datetime.strptime(date, '%Y-%m-%d'), 'Kredit': 0})
+    if new_rows:
+        df = pd.concat([df, pd.DataFrame(new_rows)], ignore_index=True)
+    df.sort_values(by='дата', inplace=True)
+    return df.set_index('дата')['Kredit']
+
+
+def build_periods(sums, dates):
+    periods = list(sums)
+    return quarterly_frame([quarter for quarter, _ in periods], [year for _, year in periods],
+                           list(sums.values()), ['Kredit'], dates)['Kredit']
+
+
+def run(name, build, sums, dates, count):
+    build(sums, dates)
+    timings = []
+    for _ in range(count):
+        start = perf_counter()
+        build(sums, dates)
+        timings.append(perf_counter() - start)
+    timings.sort()
+    print(f'  {name:<34}среднее {sum(timings) / count * 1000:9.3f} мс  p95 {timings[int(count * 0.95) - 1] * 1000:9.3f} мс')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Построение квартального ряда товара с заполнением пропусков.')
+    parser.add_argument('--years', type=int, nargs='+', default=[3, 25, 100, 250])
+    parser.add_argument('--fill', type=float, default=0.7, help='Доля кварталов с данными')
+    parser.add_argument('--count', type=int, default=50)
+    args = parser.parse_args()
+
+    for years in args.years:
+        sums, dates = synthetic_history(years, args.fill, years)
+        legacy = build_legacy(sums, dates)
+        current = build_periods(sums, dates)
+        assert (legacy.index == current.index.to_timestamp(how='end').normalize()).all()
+        assert (legacy.to_numpy(dtype='float64') == current.to_numpy()).all()
+        print(f'{years} лет, {len(dates)} кварталов, с данными {len(sums)}:')
+        run('add_missing_dates (прежний путь)', build_legacy, sums, dates, args.count)
+        run('quarterly_frame', build_periods, sums, dates, args.count)
+
+
+if __name__ == '__main__':
+    main()
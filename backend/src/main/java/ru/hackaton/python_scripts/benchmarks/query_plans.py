@@ -0,0 +1,208 @@
+import argparse
+import glob
+import os
+import random
+import sys
+from time import perf_counter
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.abspath(os.path.join(current_dir, '..')))
+
+from pymongo import MongoClient
+
+from utils.data_scripts import quarterly_pipeline
+from utils.index_scripts import drop_provisioned_indexes, ensure_indexes
+from utils.price_scripts import LATEST_SORT
+from utils.workbook_scripts import read_catalog, read_stock, read_turnovers
+
+# Задержка запросов скриптов к stock_remainings без индексов и с индексами из index_scripts.
+# Данные - выгрузки из dataset/, размноженные в 1x/10x/100x (копии товаров получают суффикс
+# в названии). Планы запросов проверяются через explain: с индексами не должно быть COLLSCAN
+# и сортировки в памяти (SORT).
+# Требует запущенный MongoDB; пишет в отдельную базу, которая удаляется после прогона.
+
+DATASET_DIR = os.path.abspath(os.path.join(current_dir, *(['..'] * 8), 'dataset'))
+CHUNK_SIZE = 10000
+
+
+def load_dataset(dataset_dir):
+    """
+    :return: Документы оборотной ведомости, складских остатков и справочника
+    """
+    turnovers = [doc for path in sorted(glob.glob(os.path.join(dataset_dir, 'Обороты по счету', '*.xlsx')))
+                 for doc in read_turnovers(path)]
+    stock = [doc for path in sorted(glob.glob(os.path.join(dataset_dir, 'Складские остатки', '*.xlsx')))
+             for doc in read_stock(path)]
+    catalog = list(read_catalog(os.path.join(dataset_dir, 'КПГЗ ,СПГЗ, СТЕ.xlsx')))
+    return turnovers, stock, catalog
+
+
+def scaled(docs, field, scale):
+    # Копия i товара отличается суффиксом названия, так что число различных товаров растет вместе с данными
+    for i in range(scale):
+        for doc in docs:
+            copy = dict(doc)
+            if i:
+                copy[field] = f'{doc[field]}~{i}'
+            yield copy
+
+
+def insert_chunks(collection, docs):
+    chunk = []
+    for doc in docs:
+        chunk.append(doc)
+        if len(chunk) == CHUNK_SIZE:
+            collection.insert_many(chunk, ordered=False)
+            chunk = []
+    if chunk:
+        collection.insert_many(chunk, ordered=False)
+
+
+def fill_database(database, dataset, scale):
+    turnovers, stock, catalog = dataset
+    for name in database.list_collection_names():
+        database.drop_collection(name)
+    insert_chunks(database['Оборотная ведомость'], scaled(turnovers, 'name', scale))
+    insert_chunks(database['Складские остатки'], scaled(stock, 'Название', scale))
+    insert_chunks(database['Справочники'], scaled(catalog, 'Название СТЕ', scale))
+    names = sorted({doc['name'] for doc in turnovers})
+    insert_chunks(database['Нормализированные имена'],
+                  scaled([{'name': name, 'normalized_name': name} for name in names], 'name', scale))
+    insert_chunks(database['Прогнозы'], scaled([{'name': name} for name in names], 'name', scale))
+
+
+def query_shapes(dataset, scale, samples, seed):
+    """
+    Запросы в том виде, в каком их выполняют скрипты, со случайными товарами из загруженных данных.
+
+    :return: Список (описание, команда find/aggregate)
+    """
+    turnovers, stock, catalog = dataset
+    rng = random.Random(seed)
+
+    def pick(docs, field):
+        doc = rng.choice(docs)
+        i = rng.randrange(scale)
+        return f'{doc[field]}~{i}' if i else doc[field]
+
+    shapes = []
+    for _ in range(samples):
+        name, stock_name, cte = pick(turnovers, 'name'), pick(stock, 'Название'), pick(catalog, 'Название СТЕ')
+        shapes += [
+            ('Оборотная ведомость: fetch_quarterly',
+             {'aggregate': 'Оборотная ведомость', 'pipeline': quarterly_pipeline(name, ['единиц кредит во']),
+              'cursor': {}}),
+            ('Оборотная ведомость: find name', {'find': 'Оборотная ведомость', 'filter': {'name': name}}),
+            ('Оборотная ведомость: latest_price',
+             {'find': 'Оборотная ведомость', 'filter': {'name': name}, 'sort': dict(LATEST_SORT), 'limit': 1}),
+            ('Складские остатки: find Название', {'find': 'Складские остатки', 'filter': {'Название': stock_name}}),
+            ('Справочники: find Название СТЕ', {'find': 'Справочники', 'filter': {'Название СТЕ': cte}}),
+            ('Нормализированные имена: name', {'find': 'Нормализированные имена', 'filter': {'name': name}, 'limit': 1}),
+            ('Прогнозы: find_forecast', {'find': 'Прогнозы', 'filter': {'name': name}, 'limit': 1}),
+        ]
+    return shapes
+
+
+def run_query(database, command):
+    collection = database[command.get('aggregate') or command['find']]
+    if 'aggregate' in command:
+        return list(collection.aggregate(command['pipeline']))
+    return list(collection.find(command['filter'], sort=list(command.get('sort', {}).items()) or None,
+                                limit=command.get('limit', 0)))
+
+
+def winning_stages(plan):
+    """
+    :param plan: Результат explain
+    :return: Множество стадий выигравших планов (COLLSCAN, IXSCAN, FETCH, ...)
+    """
+    stages = set()
+
+    def walk(node, in_winning):
+        if isinstance(node, dict):
+            if in_winning and isinstance(node.get('stage'), str):
+                stages.add(node['stage'])
+            for key, value in node.items():
+                if key != 'rejectedPlans':
+                    walk(value, in_winning or key in ('winningPlan', 'queryPlan'))
+        elif isinstance(node, list):
+            for value in node:
+                walk(value, in_winning)
+
+    walk(plan, False)
+    return stages
+
+
+def measure(database, shapes, count):
+    """
+    :return: Словарь {описание: (среднее мс, p95 мс, стадии плана)}
+    """
+    timings, stages = {}, {}
+    for label, command in shapes:
+        run_query(database, command)
+        plan = database.command('explain', command, verbosity='queryPlanner')
+        stages.setdefault(label, set()).update(winning_stages(plan))
+        for _ in range(count):
+            start = perf_counter()
+            run_query(database, command)
+            timings.setdefault(label, []).append(perf_counter() - start)
+    result = {}
+    for label, values in timings.items():
+        values.sort()
+        result[label] = (sum(values) / len(values) * 1000, values[max(int(len(values) * 0.95) - 1, 0)] * 1000,
+                         stages[label])
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Задержка запросов скриптов и планы запросов с индексами и без.')
+    parser.add_argument('--url', default='mongodb://localhost:27017')
+    parser.add_argument('--database', default='stock_remainings_benchmark')
+    parser.add_argument('--dataset', default=DATASET_DIR)
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--samples', type=int, default=20, help='Сколько случайных товаров на каждый вид запроса')
+    parser.add_argument('--count', type=int, default=5, help='Повторов каждого запроса')
+    parser.add_argument('--keep', action='store_true', help='Не удалять базу после прогона')
+    args = parser.parse_args()
+
+    client = MongoClient(args.url)
+    database = client[args.database]
+    start = perf_counter()
+    dataset = load_dataset(args.dataset)
+    print(f'Выгрузки прочитаны за {perf_counter() - start:.1f} с: оборотная ведомость {len(dataset[0])}, '
+          f'складские остатки {len(dataset[1])}, справочник {len(dataset[2])} документов')
+
+    slow_plans = []
+    try:
+        for scale in args.scales:
+            start = perf_counter()
+            fill_database(database, dataset, scale)
+            print(f'\n{scale}x: загружено за {perf_counter() - start:.1f} с, '
+                  f'оборотная ведомость {database["Оборотная ведомость"].estimated_document_count()} документов')
+            shapes = query_shapes(dataset, scale, args.samples, seed=scale)
+
+            drop_provisioned_indexes(database)
+            without = measure(database, shapes, args.count)
+            ensure_indexes(database)
+            with_indexes = measure(database, shapes, args.count)
+
+            print(f'  {"запрос":<40}{"без индексов":>26}{"с индексами":>26}  план с индексами')
+            for label, (mean, p95, _) in without.items():
+                indexed_mean, indexed_p95, stages = with_indexes[label]
+                print(f'  {label:<40}{mean:10.2f} мс (p95 {p95:7.2f}){indexed_mean:10.2f} мс (p95 {indexed_p95:7.2f})'
+                      f'  {"+".join(sorted(stages))}')
+                # Полный проход коллекции или сортировка в памяти при наличии индексов - регрессия
+                for stage in sorted({'COLLSCAN', 'SORT'} & stages):
+                    slow_plans.append(f'{scale}x {label} ({stage})')
+    finally:
+        if not args.keep:
+            client.drop_database(args.database)
+        client.close()
+
+    if slow_plans:
+        print('\nCOLLSCAN или SORT при наличии индексов: ' + ', '.join(slow_plans))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+import argparse
+import os
+import sys
+from io import BytesIO
+from time import perf_counter
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.abspath(os.path.join(current_dir, '..')))
+
+from utils.plot_scripts import render_bar_chart
+
+LABELS = ['2022-03-31', '2022-06-30', '2022-09-30', '2022-12-31']
+VALUES = [12., 0., 7.5, 31.]
+
+
+def rss_mb():
+    """Текущий RSS процесса в мегабайтах (Linux)."""
+    with open('/proc/self/statm') as f:
+        pages = int(f.read().split()[1])
+    return pages * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+
+
+def render_legacy(target):
+    """Отрисовка как в скриптах до появления plot_scripts: pyplot + seaborn без закрытия фигур."""
+    import pandas as pd
+    import seaborn as sns
+    from matplotlib import pyplot as plt
+    import matplotlib.font_manager as font_manager
+
+    df = pd.DataFrame({'дата': pd.to_datetime(LABELS), 'значение': VALUES})
+    plt.figure(figsize=(8, 7))
+    bars = sns.barplot(x='дата', y='значение', hue='дата', palette='Reds', data=df, legend=False)
+    font = font_manager.FontProperties(family='serif', style='italic')
+    font1 = font_manager.FontProperties(family='serif', style='italic', size=16)
+    for p in bars.patches:
+        plt.text(p.get_x() + p.get_width() / 2., p.get_height(), f'{p.get_height():.2f}',
+                 ha='center', va='bottom', fontsize=10, fontproperties=font)
+    plt.xlabel('Дата', fontsize=14, fontproperties=font)
+    plt.ylabel('Остатки', ha='center', fontsize=14, fontproperties=font)
+    plt.title('Остатки за период в конце квартала', fontproperties=font1)
+    plt.xticks(rotation=45, ha='center', fontsize=10, fontproperties=font)
+    plt.yticks(fontsize=12, fontstyle='italic', fontproperties=font)
+    plt.savefig(target)
+
+
+def render_shared(target):
+    render_bar_chart(LABELS, VALUES, 'Остатки за период в конце квартала', 'Остатки', target)
+
+
+def run(name, render, count, checkpoints):
+    timings = []
+    print(f'{name}: {count} графиков')
+    for i in range(1, count + 1):
+        start = perf_counter()
+        render(BytesIO())
+        timings.append(perf_counter() - start)
+        if i % checkpoints == 0 or i == count:
+            window = sorted(timings[-checkpoints:])
+            print(f'  {i:>6}  среднее {sum(window) / len(window) * 1000:7.2f} мс  '
+                  f'p95 {window[int(len(window) * 0.95) - 1] * 1000:7.2f} мс  RSS {rss_mb():8.1f} МБ')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Время отрисовки и RSS для столбчатых графиков.')
+    parser.add_argument('--count', type=int, default=10000)
+    parser.add_argument('--legacy-count', type=int, default=300)
+    parser.add_argument('--checkpoints', type=int, default=1000)
+    args = parser.parse_args()
+
+    run('plot_scripts.render_bar_chart', render_shared, args.count, args.checkpoints)
+    if args.legacy_count:
+        run('pyplot + seaborn (прежний путь)', render_legacy, args.legacy_count, max(args.legacy_count // 5, 1))
+
+
+if __name__ == '__main__':
+    main()
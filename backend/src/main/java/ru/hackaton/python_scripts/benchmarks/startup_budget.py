@@ -0,0 +1,185 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from os import getenv
+
+# Отчет о холодном старте скриптов python_scripts и проверка бюджета времени.
+# Каждый скрипт импортируется в свежем интерпретаторе с -X importtime, затем выполняется
+# первый запрос против mongomock с небольшим набором данных. Скрипт завершается с кодом 1,
+# если импорт или первый запрос какого-либо скрипта превысил бюджет или первый запрос
+# завершился ошибкой, поэтому его можно запускать в CI.
+
+SCRIPTS_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+# Скрипт -> (функция первого запроса, аргументы). None - только импорт.
+ENTRY_POINTS = {
+    'forcaster': ('make_forecast', ['тестовыйтовар', 3]),
+    'remainings_by_item': ('make_plot_of_remainings', ['тестовыйтовар']),
+    'classify_product': ('get_time_interval', ['Сколько бумаги понадобится на три месяца?']),
+    'json_maker': (None, []),
+}
+# Бюджет импорта в секундах; переопределяется STARTUP_BUDGET_<СКРИПТ> или --budget скрипт=секунды
+DEFAULT_BUDGETS = {
+    'forcaster': 2.0,
+    'remainings_by_item': 1.5,
+    'classify_product': 0.5,
+    'json_maker': 1.5,
+}
+# Бюджет первого запроса в секундах; переопределяется STARTUP_FIRST_CALL_BUDGET_<СКРИПТ>
+# или --first-call-budget скрипт=секунды
+DEFAULT_FIRST_CALL_BUDGETS = {
+    'forcaster': 3.0,
+    'remainings_by_item': 2.0,
+    # Первый запрос загружает словари pymorphy3
+    'classify_product': 2.0,
+    'json_maker': 0.,
+}
+
+CHILD = r'''
+import importlib, json, sys
+from datetime import datetime
+from time import perf_counter
+
+import mongomock, pymongo
+
+# Все MongoClient скрипта работают с одной базой mongomock
+client = mongomock.MongoClient()
+pymongo.MongoClient = lambda *args, **kwargs: client
+db = client['stock_remainings']
+db['Оборотная ведомость'].insert_many([
+    {'name': 'тестовыйтовар', 'квартал': str(quarter), 'год': str(year), 'единиц кредит во': float(quarter + year % 3),
+     'единиц после': float(10 * quarter), 'цена после': 100.}
+    for year in (2021, 2022) for quarter in (1, 2, 3, 4)
+])
+db['Складские остатки'].insert_one({'Название': 'тестовыйтовар', 'Дата': '31.12.2022', 'Остаток': '5'})
+db['Последние остатки'].insert_many([{'_id': 'тестовыйтовар', 'Остаток': 5., 'Дата': datetime(2022, 12, 31)},
+                                     {'_id': 'snapshot built', 'built_at': datetime(2022, 12, 31)}])
+
+module_name, function_name, args = sys.argv[1], sys.argv[2], json.loads(sys.argv[3])
+# Импорты выше относятся к подмене базы и в отчет не попадают (pymongo уже загружен mongomock)
+sys.stderr.write('startup_budget: script\n')
+sys.stderr.flush()
+start = perf_counter()
+module = importlib.import_module(module_name)
+import_time = perf_counter() - start
+
+first_call, error = None, None
+if function_name:
+    start = perf_counter()
+    try:
+        getattr(module, function_name)(*args)
+        first_call = perf_counter() - start
+    except Exception as e:
+        error = f'{type(e).__name__}: {e}'
+print(json.dumps({'import': import_time, 'first_call': first_call, 'error': error}))
+'''
+
+
+def parse_importtime(stderr, top):
+    """
+    Разбирает вывод -X importtime и возвращает самые долгие пакеты верхнего уровня.
+
+    :param stderr: stderr дочернего процесса
+    :param top: Количество пакетов в отчете
+    :return: Список (секунды, пакет)
+    """
+    packages = {}
+    if 'startup_budget: script\n' in stderr:
+        stderr = stderr.split('startup_budget: script\n', 1)[1]
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if name.startswith('  '):
+            # Вложенные импорты уже учтены в cumulative пакета верхнего уровня
+            continue
+        root = name.strip().split('.')[0]
+        packages[root] = packages.get(root, 0) + int(cumulative) / 1e6
+    return sorted(((seconds, name) for name, seconds in packages.items()), reverse=True)[:top]
+
+
+def measure(script, mongomock_env):
+    """
+    Запускает скрипт в свежем интерпретаторе и измеряет импорт и первый запрос.
+
+    :param script: Название модуля скрипта
+    :param mongomock_env: Переменные окружения дочернего процесса
+    :return: Результат дочернего процесса и stderr с выводом importtime
+    """
+    function_name, args = ENTRY_POINTS[script]
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', CHILD, script, function_name or '', json.dumps(args)],
+        cwd=SCRIPTS_DIR, env=mongomock_env, capture_output=True, text=True)
+    lines = completed.stdout.strip().splitlines()
+    if completed.returncode != 0 or not lines:
+        error = [line for line in completed.stderr.splitlines() if not line.startswith('import time:')]
+        return {'import': None, 'first_call': None, 'error': error[-1] if error else 'нет вывода'}, ''
+    return json.loads(lines[-1]), completed.stderr
+
+
+def budgets(defaults, prefix, overrides):
+    """
+    :param defaults: Бюджеты по умолчанию {скрипт: секунды}
+    :param prefix: Префикс переменных окружения, например STARTUP_BUDGET_
+    :param overrides: Значения скрипт=секунды из командной строки
+    :return: Словарь {скрипт: секунды}
+    """
+    result = {script: float(getenv(f'{prefix}{script.upper()}', budget)) for script, budget in defaults.items()}
+    for override in overrides:
+        script, seconds = override.split('=')
+        result[script] = float(seconds)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Отчет о холодном старте скриптов и проверка бюджета импорта '
+                                                 'и первого запроса.')
+    parser.add_argument('scripts', nargs='*', default=list(ENTRY_POINTS))
+    parser.add_argument('--budget', action='append', default=[], help='Бюджет импорта: скрипт=секунды')
+    parser.add_argument('--first-call-budget', action='append', default=[],
+                        help='Бюджет первого запроса: скрипт=секунды')
+    parser.add_argument('--top', type=int, default=8, help='Сколько самых долгих импортов показать')
+    args = parser.parse_args()
+
+    limits = budgets(DEFAULT_BUDGETS, 'STARTUP_BUDGET_', args.budget)
+    call_limits = budgets(DEFAULT_FIRST_CALL_BUDGETS, 'STARTUP_FIRST_CALL_BUDGET_', args.first_call_budget)
+    with tempfile.TemporaryDirectory() as cache_root:
+        env = dict(os.environ, CACHE_ROOT=cache_root, CHART_CACHE_DIR=os.path.join(cache_root, 'images'),
+                   WORKER_POOL_URL='', PYTHONDONTWRITEBYTECODE='1')
+        failures = []
+        for script in args.scripts:
+            result, stderr = measure(script, env)
+            limit = limits[script]
+            if result['import'] is None:
+                failures.append(script)
+                print(f'{script}: не удалось импортировать ({result["error"]})\n')
+                continue
+            status = 'OK' if result['import'] <= limit else 'ПРЕВЫШЕН'
+            if result['error']:
+                call_status = 'ОШИБКА'
+            elif result['first_call'] is None:
+                call_status = 'OK'
+            else:
+                call_status = 'OK' if result['first_call'] <= call_limits[script] else 'ПРЕВЫШЕН'
+            if status != 'OK' or call_status != 'OK':
+                failures.append(script)
+            first_call = 'не выполнялся' if result['first_call'] is None else f'{result["first_call"]:.3f} с'
+            print(f'{script}: импорт {result["import"]:.3f} с (бюджет {limit:.2f} с, {status}), '
+                  f'первый запрос {first_call} (бюджет {call_limits[script]:.2f} с, {call_status})')
+            if result['error']:
+                print(f'  ошибка первого запроса: {result["error"]}')
+            print('  самые долгие импорты (модуль и первый запрос):')
+            for seconds, package in parse_importtime(stderr, args.top):
+                print(f'    {seconds:8.3f} с  {package}')
+            print()
+
+    if failures:
+        print('Бюджет холодного старта нарушен: ' + ', '.join(failures))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,38 +1,92 @@
 import argparse
+import os
 import re
 import string
-import pymorphy3
-from transformers import BertTokenizer, BertForSequenceClassification
-import torch
 
-morph = pymorphy3.MorphAnalyzer()
+if __name__ == '__main__':
+    # Если запущен пул воркеров, запрос уходит в него без загрузки модели и словарей
+    from worker_client import forward_cli
+    forward_cli('make_action_time_code', (str,))
+
+# pymorphy3, transformers и torch загружаются при первом обращении: импорт torch и словарей
+# занимает секунды и не нужен, например, для одного get_time_interval
+MODEL_PATH = "/backend/src/main/java/ru/hackaton/python_scripts/saved_model"
+# Если задан, запросы классифицируются сервером classify_server.py (одна модель, запросы
+# объединяются в батчи); пока сервер недоступен, модель загружается в процесс
+CLASSIFY_SERVER_URL = os.getenv('CLASSIFY_SERVER_URL', '')
 common_time = {'месяц': 30, 'год': 365, "квартал": 90, "полгода": 180, "лет": 365, "неделя": 7, "день": 1}
 
+_morph = None
+_classifier = None
+
+
+def get_morph():
+    """
+    Возвращает морфологический анализатор, создавая его при первом вызове.
+    """
+    global _morph
+    if _morph is None:
+        import pymorphy3
+        _morph = pymorphy3.MorphAnalyzer()
+    return _morph
+
+
+def get_classifier():
+    """
+    Возвращает токенизатор и модель классификации запросов, загружая их один раз на процесс.
+    """
+    global _classifier
+    if _classifier is None:
+        from transformers import BertTokenizerFast, BertForSequenceClassification
+        model = BertForSequenceClassification.from_pretrained(MODEL_PATH)
+        model.eval()  # Перевод модели в режим предсказания
+        # Быстрый токенизатор (Rust) токенизирует батч одним вызовом
+        _classifier = BertTokenizerFast.from_pretrained(MODEL_PATH), model
+    return _classifier
+
+
+def warm_up():
+    """
+    Загружает словари и модель заранее (вызывается пулом воркеров при старте).
+    Если запросы классифицирует сервер, модель в воркер не загружается.
+    """
+    get_morph()
+    if not CLASSIFY_SERVER_URL:
+        get_classifier()
+
+
+def predict_actions(texts):
+    """
+    Классифицирует набор запросов одним прогоном модели.
+
+    :param texts: Тексты запросов
+    :return: Список классов (0 - остатки, 1 - прогноз)
+    """
+    import torch
 
-def choose_action(question):
     # Загрузка сохраненной модели и токенизатора
-    model = BertForSequenceClassification.from_pretrained("/backend/src/main/java/ru/hackaton/python_scripts/saved_model")
-    tokenizer = BertTokenizer.from_pretrained("/backend/src/main/java/ru/hackaton/python_scripts/saved_model")
+    tokenizer, model = get_classifier()
 
-    # Пример нового текста для предсказания
-    text = question
+    # Токенизация текстов: короткие дополняются до длины самого длинного в батче
+    inputs = tokenizer(list(texts), return_tensors='pt', padding=True, truncation=True, max_length=64)
 
-    # Токенизация текста
-    inputs = tokenizer(text, return_tensors='pt', padding=True, truncation=True, max_length=64)
-
-    # Прогон данных через модель
-    model.eval()  # Перевод модели в режим предсказания
-    with torch.no_grad():  # Отключение градиентов для ускорения и снижения потребления памяти
+    # Прогон данных через модель без autograd
+    with torch.inference_mode():
         outputs = model(**inputs)
 
-    # Логиты (сырые предсказания модели)
-    logits = outputs.logits
+    # Предсказание класса по логитам
+    return torch.argmax(outputs.logits, dim=1).tolist()
 
-    # Предсказание класса
-    predictions = torch.argmax(logits, dim=1)
 
-    # Интерпретация предсказания
-    return predictions.item()
+def choose_action(question):
+    if CLASSIFY_SERVER_URL:
+        from worker_client import classify, PoolError, PoolUnavailable
+        try:
+            return classify([question])[0]
+        except (PoolUnavailable, PoolError):
+            # Сервер недоступен или не ответил (ошибка, таймаут, перегрузка): классифицируем сами
+            pass
+    return predict_actions([question])[0]
 
 
 def classify_product(question):
@@ -57,6 +111,7 @@ def classify_product(question):
 
         def normalize_words(words):
             normalized = []
+            morph = get_morph()
             for word in words:
                 parsed_word = morph.parse(word)
 
@@ -109,6 +164,7 @@ def get_time_interval(mesg):
         "одиннадцать": 11,
         "двенадцать": 12
     }
+    morph = get_morph()
     translator = str.maketrans('', '', string.punctuation)
     text = mesg.translate(translator).lower()
     days = -1
@@ -145,10 +201,10 @@ def make_action_time_code(question_from_user):
         response_list.append('2')
         response_list.append(classify_product(question_from_user))
         response_list.append(str(get_time_interval(question_from_user)))
-    print(', '.join(response_list))
+    return ', '.join(response_list)
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='Process some arguments.')
     parser.add_argument('message', type=str)
     args = parser.parse_args()
-    make_action_time_code(args.message)
+    print(make_action_time_code(args.message))
@@ -0,0 +1,224 @@
+import argparse
+import json
+import logging
+import queue
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from os import getenv
+from time import monotonic, perf_counter
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+log = logging.getLogger('classify_server')
+
+# Сервер классификации запросов пользователей: модель BERT загружается один раз, одновременные
+# запросы собираются в течение нескольких миллисекунд и прогоняются через модель одним батчем.
+# Скрипты обращаются к нему через worker_client.classify, если задан CLASSIFY_SERVER_URL.
+
+# Сколько запросов может войти в один батч
+CLASSIFY_MAX_BATCH = int(getenv('CLASSIFY_MAX_BATCH', '32'))
+# Сколько ждать следующие запросы после первого, миллисекунды
+CLASSIFY_MAX_WAIT_MS = float(getenv('CLASSIFY_MAX_WAIT_MS', '5'))
+# Сколько последних задержек хранится для перцентилей
+LATENCY_WINDOW = 10000
+
+
+class Server(ThreadingHTTPServer):
+    # Батчинг рассчитан на пачки одновременных подключений; очереди accept по умолчанию (5) для них мало
+    request_queue_size = 128
+    daemon_threads = True
+
+
+class CallTimeoutError(Exception):
+    """Запрос не классифицирован за отведенное время."""
+
+
+class Request:
+    """Текст, ожидающий классификации, и его результат."""
+
+    def __init__(self, text):
+        self.text = text
+        self.created = perf_counter()
+        self.done = threading.Event()
+        self.label = None
+        self.error = None
+
+
+class Metrics:
+    """Счетчики запросов и батчей, задержки последних запросов."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self.started = monotonic()
+        self.requests = 0
+        self.batches = 0
+        self.errors = 0
+        self.inference_seconds = 0.0
+
+    def record_batch(self, requests, seconds, failed):
+        finished = perf_counter()
+        with self._lock:
+            self.batches += 1
+            self.requests += len(requests)
+            self.errors += len(requests) if failed else 0
+            self.inference_seconds += seconds
+            self._latencies.extend(finished - request.created for request in requests)
+
+    def snapshot(self):
+        """
+        :return: Словарь метрик: пропускная способность, средний размер батча, перцентили задержки в мс
+        """
+        with self._lock:
+            latencies = sorted(self._latencies)
+            uptime = monotonic() - self.started
+            data = {
+                'requests': self.requests,
+                'batches': self.batches,
+                'errors': self.errors,
+                'mean_batch_size': round(self.requests / self.batches, 2) if self.batches else 0,
+                'mean_inference_ms': round(self.inference_seconds / self.batches * 1000, 2) if self.batches else 0,
+                'throughput_rps': round(self.requests / uptime, 2) if uptime else 0,
+            }
+        for percentile in (50, 95, 99):
+            value = latencies[min(len(latencies) - 1, len(latencies) * percentile // 100)] if latencies else 0
+            data[f'latency_p{percentile}_ms'] = round(value * 1000, 2)
+        return data
+
+
+class Batcher:
+    """
+    Поток, собирающий запросы в батчи: берет первый запрос из очереди и добирает следующие,
+    пока батч не заполнится или не истечет max_wait.
+    """
+
+    def __init__(self, predict, max_batch, max_wait):
+        self.predict = predict
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.metrics = Metrics()
+        self._queue = queue.Queue()
+        threading.Thread(target=self._loop, daemon=True).start()
+
+    def classify(self, texts, timeout):
+        """
+        Классифицирует тексты; они могут попасть в разные батчи вместе с текстами других запросов.
+
+        :param texts: Тексты запросов
+        :param timeout: Таймаут в секундах
+        :return: Список классов
+        """
+        requests = [Request(text) for text in texts]
+        for request in requests:
+            self._queue.put(request)
+        deadline = monotonic() + timeout
+        for request in requests:
+            if not request.done.wait(max(0.0, deadline - monotonic())):
+                raise CallTimeoutError(f'Запрос не классифицирован за {timeout} с')
+            if request.error is not None:
+                raise RuntimeError(request.error)
+        return [request.label for request in requests]
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self):
+        while True:
+            batch = self._collect()
+            start = perf_counter()
+            failed = False
+            try:
+                labels = self.predict([request.text for request in batch])
+                for request, label in zip(batch, labels):
+                    request.label = label
+            except Exception as e:
+                log.exception('Ошибка классификации батча из %s запросов', len(batch))
+                failed = True
+                for request in batch:
+                    request.error = str(e)
+            finally:
+                self.metrics.record_batch(batch, perf_counter() - start, failed)
+                for request in batch:
+                    request.done.set()
+
+
+def make_handler(batcher, default_timeout):
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, status, data):
+            body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == '/health':
+                self._reply(200, {'status': 'ok'})
+            elif self.path == '/metrics':
+                self._reply(200, batcher.metrics.snapshot())
+            else:
+                self._reply(404, {'error': 'Not found'})
+
+        def do_POST(self):
+            if self.path != '/classify':
+                self._reply(404, {'error': 'Not found'})
+                return
+            try:
+                request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                texts = [str(text) for text in request['texts']]
+            except (ValueError, KeyError, TypeError):
+                self._reply(400, {'error': 'Некорректный запрос'})
+                return
+            try:
+                self._reply(200, {'labels': batcher.classify(texts, request.get('timeout') or default_timeout)})
+            except CallTimeoutError as e:
+                self._reply(504, {'error': str(e)})
+            except Exception as e:
+                self._reply(500, {'error': str(e)})
+
+        def log_message(self, format, *args):
+            log.debug('%s %s', self.address_string(), format % args)
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Сервер классификации запросов пользователей с батчингом.')
+    parser.add_argument('--host', type=str, default=getenv('CLASSIFY_SERVER_HOST', '127.0.0.1'))
+    parser.add_argument('--port', type=int, default=int(getenv('CLASSIFY_SERVER_PORT', '8766')))
+    parser.add_argument('--max-batch', type=int, default=CLASSIFY_MAX_BATCH)
+    parser.add_argument('--max-wait-ms', type=float, default=CLASSIFY_MAX_WAIT_MS)
+    parser.add_argument('--timeout', type=float, default=float(getenv('CLASSIFY_TIMEOUT', '10')))
+    parser.add_argument('--threads', type=int, default=int(getenv('CLASSIFY_THREADS', '0')),
+                        help='Потоков torch (0 - по умолчанию)')
+    args = parser.parse_args()
+
+    import torch
+    from classify_product import get_classifier, predict_actions
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    get_classifier()
+    # Первый прогон выделяет буферы модели, чтобы он не попал в задержку пользовательского запроса
+    predict_actions(['прогрев'])
+
+    batcher = Batcher(predict_actions, args.max_batch, args.max_wait_ms / 1000)
+    server = Server((args.host, args.port), make_handler(batcher, args.timeout))
+    log.info('Сервер классификации слушает %s:%s (батч до %s, ожидание %s мс)',
+             args.host, args.port, args.max_batch, args.max_wait_ms)
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
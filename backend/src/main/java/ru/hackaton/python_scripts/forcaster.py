@@ -1,19 +1,45 @@
 import argparse
+import json
+import os
 
+if __name__ == '__main__':
+    # Если запущен пул воркеров, запрос уходит в него без импорта тяжелых библиотек
+    from worker_client import forward_cli
+    forward_cli('make_forecast', (str, int), flags=('--inline',))
+
+import numpy as np
 import pandas as pd
 
 from math import ceil
-from time import time_ns
+from time import time
 from datetime import datetime
-from matplotlib import pyplot as plt
-from pmdarima import auto_arima
-import matplotlib.font_manager as font_manager
-import seaborn as sns
-
-from utils.data_scripts import get_mongo_collection, fetch_data, aggregate_data, create_dataframe, add_missing_dates, \
-    mongo_find
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pymongo import ReplaceOne
+
+from utils.data_scripts import get_mongo_collection, fetch_quarterly, aggregate_all_data, find_forecast
+from utils.cache_scripts import model_cache, order_store, series_fingerprint
+from utils.forecast_scripts import fast_forecast, needs_arima, purchase_matrix, build_matrix
+from utils.plot_scripts import cached_bar_chart, bar_chart_bytes, chart_response
+from utils.series_scripts import quarterly_frame, quarter_ends
+from utils.stock_scripts import latest_stock, latest_stocks
+
+# Сколько кварталов прогнозирует пакетный режим (покрывает запросы на 3, 6 и 12 месяцев)
+BATCH_QUARTERS = 4
+# Через сколько дней порядок модели подбирается заново полным перебором auto_arima
+ORDER_SEARCH_DAYS = int(os.getenv('ORDER_SEARCH_DAYS', '90'))
+# Допустимый рост ошибки на обучающих данных относительно момента подбора порядка
+ORDER_ERROR_TOLERANCE = float(os.getenv('ORDER_ERROR_TOLERANCE', '0.25'))
+# Дообучать сохраненную модель через update(), если к ряду добавились только новые кварталы
+ORDER_USE_UPDATE = os.getenv('ORDER_USE_UPDATE', '1') == '1'
+# Сколько часов прогноз из коллекции "Прогнозы" считается актуальным (0 - всегда считать заново)
+FORECAST_MAX_AGE_HOURS = float(os.getenv('FORECAST_MAX_AGE_HOURS', '26'))
+
+def warm_up():
+    """
+    Импортирует pmdarima заранее (вызывается пулом воркеров при старте).
+    """
+    import pmdarima
 
-ABSOLUTE_PATH = "/backend/src/main/java/ru/hackaton/python_scripts/"
 
 def purchase(months, forecast):
     """
@@ -30,93 +56,153 @@ def purchase(months, forecast):
     return sum_of_purchase
 
 
-def plot_forecast(df_forecast, filename):
+def in_sample_error(model, series):
     """
-    Строит график прогноза потребления.
-    :param df_forecast: DataFrame с прогнозом потребления
+    Средняя абсолютная ошибка модели на обучающих данных.
+    :param model: Обученная модель ARIMA
+    :param series: Квартальный ряд
+    :return: MAE
     """
+    return float(np.mean(np.abs(np.asarray(model.predict_in_sample()) - series.to_numpy(dtype='float64'))))
 
-    plt.figure(figsize=(8, 7))
-    if len(df_forecast) == 1:
-        plt.xlim(-2, 2)
-    bars = sns.barplot(x='дата', y='прогноз', hue='дата', palette='Reds', data=df_forecast, legend=False)
-
-    font = font_manager.FontProperties(family='serif', style='italic')
-    font1 = font_manager.FontProperties(family='serif',style='italic', size=16)
-
-    # Add labels to the bars, using the x-axis values and y-axis values
-    for p in bars.patches:
-        plt.text(p.get_x() + p.get_width()/2., p.get_height(), f'{p.get_height():.2f}',
-                 ha='center', va='bottom', fontsize=10, fontproperties=font)
-
-    plt.xlabel('Дата', fontsize=14, fontproperties=font)
-    plt.ylabel('Прогноз потребления', ha= 'center', fontsize=14, fontproperties=font)
-    plt.title('Прогноз потребления на конец каждого квартала', fontproperties=font1)
-
-    plt.xticks(rotation=45, ha='center', fontsize=10, fontproperties=font)
-    plt.yticks(fontsize=12, fontstyle= 'italic',fontproperties=font)
 
-    plt.savefig(filename)
+def fit_arima(name, series):
+    """
+    Обучает ARIMA для товара. Полный перебор auto_arima выполняется только по расписанию
+    или при росте ошибки, в остальных случаях модель дообучается с сохраненным порядком.
+    :param name: Нормализованное название товара
+    :param series: Квартальный ряд потребления с датами в индексе
+    :return: Обученная модель
+    """
+    # pmdarima тянет statsmodels, scipy и sklearn: импортируется только когда ряд действительно идет в ARIMA
+    from pmdarima import auto_arima, ARIMA
+
+    record = order_store.get(name)
+    model = None
+    if record is not None and time() - record['searched_at'] < ORDER_SEARCH_DAYS * 86400:
+        length = record['length']
+        previous_fingerprint, previous = model_cache.peek(name)
+        if (ORDER_USE_UPDATE and previous is not None and previous_fingerprint == record['fingerprint']
+                and len(series) > length and series_fingerprint(series.iloc[:length]) == record['fingerprint']):
+            # К ряду добавились только новые кварталы: дообучаем прежнюю модель
+            model = previous.update(series.iloc[length:])
+        else:
+            model = ARIMA(order=tuple(record['order']), seasonal_order=tuple(record['seasonal_order']),
+                          with_intercept=record['with_intercept'], suppress_warnings=True).fit(series)
+        if in_sample_error(model, series) > record['error'] * (1 + ORDER_ERROR_TOLERANCE):
+            model = None
+
+    if model is None:
+        model = auto_arima(series, seasonal=True, stepwise=True, trace=False, m=4, D=0)
+        record = {
+            'order': list(model.order),
+            'seasonal_order': list(model.seasonal_order),
+            'with_intercept': bool(model.with_intercept),
+            'searched_at': time(),
+            'error': in_sample_error(model, series),
+        }
+    record['length'] = len(series)
+    record['fingerprint'] = series_fingerprint(series)
+    order_store.put(name, record)
+    return model
+
+
+def predict_series(name, series, n_periods):
+    """
+    Прогнозирует квартальный ряд товара: auto_arima для длинных рядов, быстрые методы для остальных.
+    :param name: Нормализованное название товара
+    :param series: Квартальный ряд потребления с датами в индексе
+    :param n_periods: Количество прогнозируемых кварталов
+    :return: Прогноз (Series с датами концов кварталов) и модель ARIMA, если она использовалась
+    """
+    values = series.to_numpy(dtype='float64')[None, :]
+    if not needs_arima(values)[0]:
+        forecast, _ = fast_forecast(values, n_periods)
+        index = pd.date_range(start=series.index[-1], periods=n_periods + 1, freq='Q')[1:]
+        return pd.Series(forecast[0], index=index), None
+
+    # Модель переобучается только если изменился квартальный ряд товара
+    fingerprint = series_fingerprint(series)
+    model = model_cache.get(name, fingerprint)
+    if model is None:
+        model = fit_arima(name, series)
+        model_cache.put(name, fingerprint, model)
+    return model.predict(n_periods=n_periods), model
+
+
+def stored_forecast(name, series, n_periods):
+    """
+    Прогноз товара, сохраненный пакетным режимом. Используется, если он построен не раньше
+    FORECAST_MAX_AGE_HOURS назад, по тому же последнему кварталу ряда и на достаточный горизонт.
+    :param name: Нормализованное название товара
+    :param series: Квартальный ряд потребления с датами в индексе
+    :param n_periods: Количество прогнозируемых кварталов
+    :return: Прогноз (Series с датами концов кварталов) или None
+    """
+    if FORECAST_MAX_AGE_HOURS <= 0:
+        return None
+    document = find_forecast(name)
+    if (document is None or len(document['forecast']) < n_periods
+            or (datetime.now() - document['updated_at']).total_seconds() > FORECAST_MAX_AGE_HOURS * 3600):
+        return None
+    forecast = document['forecast'][:n_periods]
+    # После загрузки нового квартала прогноз сдвигается: сохраненный строился по старому ряду
+    next_quarter = pd.date_range(start=series.index[-1], periods=2, freq='Q')[1]
+    if pd.Timestamp(forecast[0]['date']) != next_quarter:
+        return None
+    return pd.Series([point['value'] for point in forecast], index=pd.to_datetime([point['date'] for point in forecast]))
+
+
+def plot_forecast(df_forecast, months, inline=False):
+    """
+    Строит график прогноза потребления.
+    :param df_forecast: DataFrame с прогнозом потребления
+    :param months: Количество месяцев для прогноза
+    :param inline: Вернуть PNG вместо пути к файлу
+    :return: Путь к файлу графика или содержимое PNG
+    """
+    chart = bar_chart_bytes if inline else cached_bar_chart
+    return chart('forecast', df_forecast['дата'].dt.strftime('%Y-%m-%d'), df_forecast['прогноз'],
+                 'Прогноз потребления на конец каждого квартала', 'Прогноз потребления', horizon=months)
 
 
-def make_forecast(name, months):
+def make_forecast(name, months, inline=False):
     """
     Делает прогноз потребления на заданное количество месяцев.
     :param name: Название продукта
     :param months: Количество месяцев для прогноза
+    :param inline: Вернуть словарь с сообщением и PNG в base64 вместо строки с путями к файлам
     :return: Прогноз потребления или сообщение об ошибке
     """
+    chart = bar_chart_bytes if inline else cached_bar_chart
     collection = get_mongo_collection("Оборотная ведомость")
     name = name.lower().replace(" ", "")
-    data, dates = fetch_data(collection, name)
-    aggregated_data = aggregate_data(data, "единиц кредит во")
-    df = create_dataframe(aggregated_data, ['Kredit', 'дата'])
-
-    if df.empty:
-        return "Извините, данные оборотной ведомости не найдены для данного товара, невозможно предсказать потребление."
-
-    df = add_missing_dates(df, dates, 'Kredit')
-    df.sort_values(by='дата', inplace=True)
-
-    plt.figure(figsize=(8, 7))
-
-
-    bars = sns.barplot(x='дата', y='Kredit', hue='дата', palette='Reds', data=df, legend=False)
-
-    font = font_manager.FontProperties(family='serif', style='italic')
-    font1 = font_manager.FontProperties(family='serif',style='italic', size=16)
-
-    # Add labels to the bars, using the x-axis values and y-axis values
-    for p in bars.patches:
-        plt.text(p.get_x() + p.get_width()/2., p.get_height(), f'{p.get_height():.2f}',
-                 ha='center', va='bottom', fontsize=10, fontproperties=font)
-
-    plt.xlabel('Дата', fontsize=14, fontproperties=font)
-    plt.ylabel('Потребление', ha= 'center', fontsize=14, fontproperties=font)
-    plt.title('Известное потребление за период в конце квартала', fontproperties=font1)
-
-    plt.xticks(rotation=45, ha='center', fontsize=10, fontproperties=font)
-    plt.yticks(fontsize=12, fontstyle= 'italic',fontproperties=font)
-
-
-    known_consume_filename = ABSOLUTE_PATH + "images/" + str(time_ns()) + ".png"
-    plt.savefig(known_consume_filename)
-    if pd.notna(df['Kredit']).sum() == 0 or df['Kredit'].max() == 0:
-        return ("Извините, кажется, данный товар не тратился в течение всего времени, невозможно предсказать "
-                "потребление.")
-    df.set_index('дата', inplace=True)
-    model = auto_arima(df, seasonal=True, stepwise=True, trace=False, m=4, D=0)
-    forecast = model.predict(n_periods=ceil(months / 3))
+    consumption = fetch_quarterly(collection, name, ["единиц кредит во"])["единиц кредит во"]
+
+    if consumption.empty:
+        return chart_response("Извините, данные оборотной ведомости не найдены для данного товара, невозможно "
+                              "предсказать потребление.", [], inline)
+
+    known_consume = chart('known_consume', consumption.index.strftime('%Y-%m-%d'), consumption,
+                          'Известное потребление за период в конце квартала', 'Потребление')
+    if consumption.max() == 0:
+        return chart_response("Извините, кажется, данный товар не тратился в течение всего времени, невозможно "
+                              "предсказать потребление.", [], inline)
+    # Прогноз из пакетного режима (forcaster.py --batch), иначе модель обучается по запросу
+    series = quarter_ends(consumption)
+    forecast = stored_forecast(name, series, ceil(months / 3))
+    if forecast is None:
+        forecast, _ = predict_series(name, series, ceil(months / 3))
     forecast = forecast.apply(lambda x: round(x))
 
     if forecast.max() == 0:
-        return "Кажется данный товар редко используется, невозможно предсказать потребление.\n" + known_consume_filename
+        return chart_response("Кажется данный товар редко используется, невозможно предсказать потребление.",
+                              [known_consume], inline)
 
     df_forecast = pd.DataFrame(
         {'дата': pd.date_range(start=forecast.index[0], periods=len(forecast), freq='Q'), 'прогноз': forecast})
-    predict_consume_filename = ABSOLUTE_PATH + "images/" + str(time_ns()) + ".png"
     if months % 3 == 0:
-        plot_forecast(df_forecast, predict_consume_filename)
+        predict_consume = plot_forecast(df_forecast, months, inline)
     else:
         monthly_consuming = pd.DataFrame(columns=['дата', 'прогноз'])
         for index, row in df_forecast.iterrows():
@@ -128,50 +214,138 @@ def make_forecast(name, months):
                 monthly_consuming.loc[len(monthly_consuming)] = [row['дата'] - pd.offsets.MonthEnd(month),
                                                                  avg_consuming]
 
-        plt.figure(figsize=(8, 7))
-        if months == 1:
-            plt.xlim(-2, 2)
-        plt.bar(monthly_consuming['дата'].dt.strftime('%Y-%m'), monthly_consuming['прогноз'], color='blue', width=0.4)
-
-        bars = sns.barplot(x='дата', y='прогноз', hue='дата', palette='Reds', data=monthly_consuming, legend=False)
-        font = font_manager.FontProperties(family='serif', style='italic')
-        font1 = font_manager.FontProperties(family='serif',style='italic', size=16)
-        # Add labels to the bars, using the x-axis values and y-axis values
-        for p in bars.patches:
-            plt.text(p.get_x() + p.get_width()/2., p.get_height(), f'{p.get_height():.2f}',
-                     ha='center', va='bottom', fontsize=10, fontproperties=font)
-        plt.xlabel('Дата', fontsize=14, fontproperties=font)
-        plt.ylabel('Прогноз потребления', ha= 'center', fontsize=14, fontproperties=font)
-        plt.title('Прогноз потребления по месяцам', fontproperties=font1)
-        plt.xticks(rotation=45, ha='center', fontsize=10, fontproperties=font)
-        plt.yticks(fontsize=12, fontstyle= 'italic',fontproperties=font)
-
-        plt.savefig(predict_consume_filename)
-
-    remainings_data = mongo_find({"Название": name})
-    df = pd.DataFrame(columns=['дата', 'остатки'])
-    for document in remainings_data:
-        df.loc[len(df)] = [document['Дата'], document['Остаток']]
-
-    df['дата'] = pd.to_datetime(df['дата'], dayfirst=True)
-    df.sort_values(by='дата', inplace=True)
-    df.reset_index(drop=True, inplace=True)
-
-    if len(df) == 0 or df.iloc[-1]['дата'] < datetime(2022, 12, 31):
+        predict_consume = chart('monthly_forecast', monthly_consuming['дата'].dt.strftime('%Y-%m'),
+                                monthly_consuming['прогноз'], 'Прогноз потребления по месяцам', 'Прогноз потребления',
+                                horizon=months)
+
+    stock = latest_stock(name)
+    if stock is None or stock[1] < datetime(2022, 12, 31):
         rem = 0.
     else:
-        rem = float(df.iloc[-1]['остатки'])
+        rem = stock[0]
 
     sum_of_purchase = purchase(months, forecast)
     if sum_of_purchase < rem:
-        return "На складе имеется достаточное количество товаров для данного срока.\n" + known_consume_filename + "\n" + predict_consume_filename
+        return chart_response("На складе имеется достаточное количество товаров для данного срока.",
+                              [known_consume, predict_consume], inline)
+
+    return chart_response("Необходимо докупить " + str(ceil((sum_of_purchase - rem) * 1.1)) + " ед. товара.",
+                          [known_consume, predict_consume], inline)
+
 
-    return "Необходимо докупить " + str(ceil((sum_of_purchase - rem) * 1.1)) + " ед. товара.\n" + known_consume_filename + "\n" + predict_consume_filename
+def fit_series(name, aggregated_data, dates, months):
+    """
+    Обучает ARIMA для одного товара. Выполняется в отдельном процессе пакетного режима.
+    :param name: Нормализованное название товара
+    :param aggregated_data: Потребление товара по кварталам {(квартал, год): сумма}
+    :param dates: Даты всех отчетных периодов
+    :param months: Количество месяцев для расчета закупки
+    :return: Словарь с прогнозом или None, если товар не расходовался
+    """
+    periods = list(aggregated_data)
+    consumption = quarterly_frame([quarter for quarter, _ in periods], [year for _, year in periods],
+                                  list(aggregated_data.values()), ['Kredit'], dates)['Kredit']
+    if consumption.max() == 0:
+        return None
+
+    start = time()
+    forecast, model = predict_series(name, quarter_ends(consumption), max(BATCH_QUARTERS, ceil(months / 3)))
+    forecast = forecast.apply(lambda x: round(x))
+    fit_time = time() - start
+
+    forecast_dates = pd.date_range(start=forecast.index[0], periods=len(forecast), freq='Q')
+    return {
+        'name': name,
+        'forecast': [{'date': date.strftime('%Y-%m-%d'), 'value': float(value)}
+                     for date, value in zip(forecast_dates, forecast)],
+        'consumption': purchase(months, forecast),
+        'method': 'arima' if model is not None else 'fast',
+        'order': list(model.order) if model is not None else None,
+        'seasonal_order': list(model.seasonal_order) if model is not None else None,
+        'fit_time': fit_time,
+    }
+
+
+def batch_forecast(months, workers=None):
+    """
+    Прогнозирует потребление всех товаров и сохраняет результат в коллекцию "Прогнозы".
+    :param months: Количество месяцев для расчета закупки
+    :param workers: Количество процессов, по умолчанию по числу ядер
+    :return: Количество сохраненных прогнозов
+    """
+    collection = get_mongo_collection("Оборотная ведомость")
+    series, dates = aggregate_all_data(collection, "единиц кредит во")
+    remainings = latest_stocks(since=datetime(2022, 12, 31))
+    names, dates, matrix = build_matrix(series, dates)
+    if not names:
+        return 0
+    names = np.array(names, dtype=object)
+    horizon = max(BATCH_QUARTERS, ceil(months / 3))
+    active = matrix.max(axis=1, initial=0) > 0
+    arima_rows = needs_arima(matrix) & active
+    fast_rows = active & ~arima_rows
+
+    # Короткие и прерывистые ряды прогнозируются одним векторным проходом
+    results = []
+    start = time()
+    forecast, methods = fast_forecast(matrix[fast_rows], horizon)
+    consumption = purchase_matrix(months, forecast)
+    fit_time = (time() - start) / max(len(forecast), 1)
+    forecast_dates = [date.strftime('%Y-%m-%d')
+                      for date in pd.date_range(start=dates[-1], periods=horizon + 1, freq='Q')[1:]] if dates else []
+    for name, values, method, used in zip(names[fast_rows], forecast, methods, consumption):
+        results.append({
+            'name': name,
+            'forecast': [{'date': date, 'value': float(value)} for date, value in zip(forecast_dates, values)],
+            'consumption': float(used),
+            'method': str(method),
+            'order': None,
+            'seasonal_order': None,
+            'fit_time': fit_time,
+        })
+
+    # auto_arima запускается только для длинных рядов, параллельно по ядрам
+    if arima_rows.any():
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+            futures = {executor.submit(fit_series, name, series[name], dates, months): name
+                       for name in names[arima_rows]}
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"{futures[future]}: {e}")
+                    continue
+                if result is not None:
+                    results.append(result)
+
+    operations = []
+    for result in results:
+        rem = remainings.get(result['name'], 0.)
+        consumption = result.pop('consumption')
+        result['months'] = months
+        result['remaining'] = rem
+        result['purchase'] = 0 if consumption < rem else ceil((consumption - rem) * 1.1)
+        result['updated_at'] = datetime.now()
+        operations.append(ReplaceOne({'name': result['name']}, result, upsert=True))
+
+    if operations:
+        get_mongo_collection("Прогнозы").bulk_write(operations, ordered=False)
+    return len(operations)
 
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='Process some arguments.')
-    parser.add_argument('item_name', type=str)
-    parser.add_argument('n_months', type=int)
+    parser.add_argument('item_name', type=str, nargs='?')
+    parser.add_argument('n_months', type=int, nargs='?')
+    parser.add_argument('--batch', action='store_true', help='Спрогнозировать все товары в коллекцию "Прогнозы"')
+    parser.add_argument('--months', type=int, default=3, help='Горизонт закупки для пакетного режима')
+    parser.add_argument('--workers', type=int, default=None, help='Количество процессов пакетного режима')
+    parser.add_argument('--inline', action='store_true', help='Напечатать JSON с графиками в base64 вместо путей к файлам')
     args = parser.parse_args()
-    print(make_forecast(args.item_name, args.n_months))
\ No newline at end of file
+    if args.batch:
+        print(batch_forecast(args.months, args.workers))
+    elif args.item_name is None or args.n_months is None:
+        parser.error('item_name и n_months обязательны без --batch')
+    else:
+        result = make_forecast(args.item_name, args.n_months, args.inline)
+        print(json.dumps(result, ensure_ascii=False) if args.inline else result)
\ No newline at end of file
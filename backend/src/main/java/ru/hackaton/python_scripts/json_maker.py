@@ -1,54 +1,51 @@
 import argparse
 import json
 import math
-import os
 import re
+import sys
+from itertools import islice
 
-import pandas as pd
+if __name__ == '__main__':
+    # Если запущен пул воркеров, запрос уходит в него без импорта pandas и pymongo
+    from worker_client import forward_cli
+    forward_cli('make_json', (lambda name: re.sub(r'\s+', '', name).strip().lower(), int, int, int, str, str),
+                output=json.dumps, as_list=True)
 
+from utils.catalog_scripts import get_catalog, find_entry
+from utils.price_scripts import latest_price, latest_prices
+from utils.rules_scripts import get_trie, matching_rules
 
-from pymongo import MongoClient
+# Сколько товаров пакетного режима обрабатывается за один запрос цен
+JSON_BATCH_SIZE = 1000
 
 
-def find_OKPD(name):
-    # Загрузка данных из CSV файла с кодами ОКПД-2
-    df = pd.read_csv(
-        '/backend/src/main/java/ru/hackaton/python_scripts/СТЕ_ОКПД-2.csv',
-        encoding='utf-8')
-    # Поиск номера ОКПД-2 по названию СТЕ
-    res = df[df['Название СТЕ'] == name]
-    okpd_number = 0 if len(res) == 0 else res['ОКПД-2'].values[0]
-    return okpd_number
+def warm_up():
+    """
+    Загружает справочник СТЕ и правила настроечных таблиц заранее (вызывается пулом воркеров при старте).
+    """
+    try:
+        get_trie()
+        get_catalog()
+    except Exception:
+        # Если база или таблицы недоступны, они загрузятся при первом запросе
+        pass
 
 
-def get_settings_table():
-    # Путь к папке с настроечными таблицами
-    dir_path = '/backend/src/main/resources/Настроечные таблицы/'
+def find_OKPD(name):
+    # Поиск номера ОКПД-2 по названию СТЕ в справочнике, собранном из CSV и "Справочники"
+    entry = find_entry(name)
+    return 0 if entry is None else entry.okpd
 
-    dfs = []
-    # Инициализация пустого списка для хранения DataFrame
-    for file in os.listdir(dir_path):
-        # Чтение Excel файлов из указанной директории
-        df = pd.read_excel(dir_path + file, sheet_name=None)
-        dfs.extend([value for key, value in df.items() if value.shape[0] > 0])
 
-    # Объединение всех DataFrame в один
-    full_df = pd.concat(dfs, ignore_index=True)
-    return full_df
+def find_rules(name):
+    # Правила из настроечных таблиц, под которые попадает код ОКПД-2 товара
+    okpd = find_OKPD(name)
+    return [] if okpd == 0 else matching_rules(okpd)
 
 
 def is_in_rules(name):
-    # Получение полной таблицы настроек
-    full_df = get_settings_table()
-    flag = False
-    okpd = find_OKPD(name)
-
     # Проверка наличия соответствия в правилах по ОКПД
-    for index, row in full_df.iterrows():
-        if isinstance(full_df.iloc[index, 1], str) and str(full_df.iloc[index, 1]) in str(okpd) and len(
-                full_df.iloc[index, 1]) >= 5:
-            flag = True
-    return flag
+    return len(find_rules(name)) > 0
 
 
 def normalize_name(name):
@@ -61,29 +58,80 @@ def make_json(params):
     """
     Создание JSON файла на основе прогноза
     :param params: массив параметров
-    :return: None
+    :return: Словарь закупки для сериализации в JSON
+    """
+    # Цена берется из строки оборотной ведомости за последний квартал
+    return build_json(params, find_entry(params[0]), latest_price(params[0]))
+
+
+def make_json_batch(records):
+    """
+    Создание JSON для набора товаров: справочник, правила и клиент MongoDB общие,
+    цены всех товаров читаются одним запросом.
+
+    :param records: Массивы параметров, как у make_json
+    :return: Список словарей закупки в порядке records
+    """
+    return list(iter_json(records))
+
+
+def iter_json(records):
+    """
+    Генератор словарей закупки для набора товаров (для потоковой выдачи в NDJSON).
+
+    :param records: Массивы параметров, как у make_json
+    """
+    records = iter(records)
+    while True:
+        chunk = list(islice(records, JSON_BATCH_SIZE))
+        if not chunk:
+            return
+        prices = latest_prices([params[0] for params in chunk])
+        for params in chunk:
+            yield build_json(params, find_entry(params[0]), prices.get(params[0]))
+
+
+def merge_json(documents):
+    """
+    Объединяет словари закупки в один документ со строками всех товаров.
+
+    :param documents: Словари закупки
+    :return: Словарь закупки; id и CustomerId берутся из первого словаря
+    """
+    documents = list(documents)
+    first = documents[0] if documents else {"id": "", "CustomerId": ""}
+    return {
+        "has_warning": any(document["has_warning"] for document in documents),
+        "id": first["id"],
+        "lotEntityId": "",
+        "CustomerId": first["CustomerId"],
+        "rows": [row for document in documents for row in document["rows"]],
+    }
+
+
+def build_json(params, data, document_to_use):
+    """
+    Собирает словарь закупки.
+
+    :param params: массив параметров
+    :param data: Запись справочника СТЕ (CatalogEntry) или None
+    :param document_to_use: Строка оборотной ведомости с ценой и единицей измерения или None
+    :return: Словарь закупки для сериализации в JSON
     """
 
     entity_id, id_spgz, kpgz, char_in_str, end_price, si, okei_code = '', '', '', '', '', '', ''
     has_warning = False
-    client = MongoClient('localhost', 27017)
-    db = client['stock_remainings']
-    collection = db['Справочники']
-
-    data = None
-    for doc in collection.find({'Название СТЕ': params[0]}):
-        data = doc
-        break
-    if data is not None:
+
+    if data is not None and data.in_reference:
         if is_in_rules(params[0]):
             has_warning = True
 
-        entity_id = data['СПГЗ код']
+        entity_id = data.spgz_code
 
-        id_spgz = data['СПГЗ']
-        kpgz = data['Конечный код КПГЗ']
+        id_spgz = data.spgz
+        kpgz = data.kpgz
 
-        characteristics = data['наименование характеристик'].split(';')
+        characteristics = data.characteristics.split(';')
         char_in_str = ','.join(characteristics)
 
         if entity_id == 'NULL':
@@ -93,15 +141,6 @@ def make_json(params):
         if kpgz == 'NULL':
             kpgz = ''
 
-    new_colllection = db['Оборотная ведомость']
-    data = new_colllection.find({'name': params[0]})
-    document_to_use = None
-
-    for document in data:
-        quart = 0
-        if int(document['квартал']) > quart:
-            document_to_use = document
-
     if document_to_use is not None:
         price = [document_to_use['цена до'], document_to_use['цена после'], document_to_use['цена кредит во'],
                  document_to_use['цена дебет во']]
@@ -182,10 +221,48 @@ def make_json(params):
             }
         ]
     }
-    print(json.dumps(data))
+    return data
+
+
+def read_records(path):
+    """
+    Читает записи пакетного режима: по JSON на строку с полями аргументов командной строки
+    {"item_name", "id", "user_id", "predict", "start_date", "end_date"}.
+
+    :param path: Путь к файлу или - для stdin
+    :return: Генератор массивов параметров для make_json
+    """
+    f = sys.stdin if path == '-' else open(path, encoding='utf-8')
+    try:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            yield [normalize_name(record['item_name']), int(record['id']), int(record['user_id']),
+                   int(record['predict']), str(record['start_date']), str(record['end_date'])]
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def batch_main():
+    parser = argparse.ArgumentParser(description='Создание JSON закупки для набора товаров.')
+    parser.add_argument('--batch', required=True, help='Файл с записями, по JSON на строку (- для stdin)')
+    parser.add_argument('--format', choices=['ndjson', 'json'], default='ndjson',
+                        help='ndjson - словарь на каждый товар по мере готовности, json - один документ со всеми строками')
+    args = parser.parse_args()
+    documents = iter_json(read_records(args.batch))
+    if args.format == 'json':
+        print(json.dumps(merge_json(documents)))
+        return
+    for document in documents:
+        print(json.dumps(document))
 
 
 def main():
+    if '--batch' in sys.argv[1:]:
+        batch_main()
+        return
     parser = argparse.ArgumentParser(description='Обработка аргументов.')
     parser.add_argument('item_name', type=str)
     parser.add_argument('id', type=int)
@@ -194,7 +271,8 @@ def main():
     parser.add_argument('start_date', type=str)
     parser.add_argument('end_date', type=str)
     args = parser.parse_args()
-    make_json([normalize_name(args.item_name), args.id, args.user_id, args.predict, args.start_date, args.end_date])
+    print(json.dumps(make_json([normalize_name(args.item_name), args.id, args.user_id, args.predict, args.start_date,
+                                args.end_date])))
 
 
 if __name__ == '__main__':
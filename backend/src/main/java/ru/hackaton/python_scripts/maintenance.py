@@ -0,0 +1,101 @@
+import argparse
+import os
+import sys
+from time import perf_counter
+
+# Служебные команды для базы stock_remainings. Запуск: python3 maintenance.py <команда>
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(current_dir)
+
+from utils.bucket_scripts import rebuild_turnover_buckets
+from utils.calendar_scripts import rebuild_report_calendar
+from utils.columnar_scripts import TABLES, refresh_columnar
+from utils.index_scripts import ensure_indexes
+from utils.ingest_scripts import INGEST_CHUNK_SIZE, SOURCES, dataset_files, ingest
+from utils.price_scripts import rebuild_price_cache
+from utils.stock_scripts import rebuild_stock_snapshot
+
+DATASET_DIR = os.path.abspath(os.path.join(current_dir, *(['..'] * 7), 'dataset'))
+
+
+def calendar_command(args):
+    dates = rebuild_report_calendar()
+    print(f'Календарь отчетных периодов пересобран: {len(dates)} периодов'
+          + (f', с {dates[0]} по {dates[-1]}' if dates else ''))
+
+
+def indexes_command(args):
+    for collection, names in ensure_indexes().items():
+        print(f'{collection}: {", ".join(names)}')
+
+
+def buckets_command(args):
+    print(f'Компактная копия оборотной ведомости пересобрана: {rebuild_turnover_buckets()} товаров')
+
+
+def stock_command(args):
+    print(f'Снимок последних остатков пересобран: {rebuild_stock_snapshot()} товаров')
+
+
+def prices_command(args):
+    print(f'Кеш последних цен пересобран: {rebuild_price_cache()} товаров')
+
+
+def export_command(args):
+    for table in args.table or list(TABLES):
+        rows = refresh_columnar(table, full=args.full)
+        print(f'Колоночная копия {table}: выгружено {rows} строк' + (' (заново)' if args.full else ''))
+
+
+def ingest_command(args):
+    files = dataset_files(args.dataset, args.kind)
+    if not files:
+        print(f'В {args.dataset} нет выгрузок')
+        return
+
+    def progress(kind, path, rows, seconds):
+        print(f'{os.path.basename(path)}: {rows} документов за {seconds:.1f} с ({rows / max(seconds, 1e-9):.0f} строк/с)')
+
+    start = perf_counter()
+    totals = ingest(files, chunk_size=args.chunk_size, workers=args.workers, progress=progress)
+    seconds = perf_counter() - start
+    rows = sum(totals.values())
+    print(f'Загружено {len(files)} книг, {rows} документов '
+          f'({", ".join(f"{kind} {count}" for kind, count in totals.items())}) за {seconds:.1f} с: '
+          f'{rows / max(seconds, 1e-9):.0f} строк/с')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Служебные команды для базы stock_remainings.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    commands.add_parser('calendar', help='Пересобрать календарь отчетных периодов по оборотной ведомости') \
+        .set_defaults(handler=calendar_command)
+    commands.add_parser('indexes', help='Создать индексы под запросы скриптов (повторный запуск безопасен)') \
+        .set_defaults(handler=indexes_command)
+    commands.add_parser('buckets', help='Пересобрать документы товаров "Обороты по товарам" по оборотной ведомости '
+                                          '(загрузку оборотов на это время нужно остановить)') \
+        .set_defaults(handler=buckets_command)
+    commands.add_parser('stock', help='Пересобрать снимок последних остатков по складским остаткам') \
+        .set_defaults(handler=stock_command)
+    commands.add_parser('prices', help='Пересобрать кеш последних цен "Последние цены" по оборотной ведомости') \
+        .set_defaults(handler=prices_command)
+    export = commands.add_parser('export', help='Дописать новые документы в колоночную копию (Parquet) '
+                                                'оборотной ведомости и складских остатков')
+    export.add_argument('--table', action='append', choices=list(TABLES), help='Таблица, по умолчанию все')
+    export.add_argument('--full', action='store_true', help='Выгрузить заново (после удаления документов)')
+    export.set_defaults(handler=export_command)
+    ingest_parser = commands.add_parser('ingest', help='Загрузить выгрузки "Обороты по счету" и "Складские остатки" '
+                                                       'из dataset/ пакетами, параллельно по файлам')
+    ingest_parser.add_argument('dataset', nargs='?', default=DATASET_DIR, help='Папка dataset/')
+    ingest_parser.add_argument('--kind', action='append', choices=list(SOURCES), help='Вид выгрузок, по умолчанию все')
+    ingest_parser.add_argument('--chunk-size', type=int, default=INGEST_CHUNK_SIZE, help='Документов в одном insert_many')
+    ingest_parser.add_argument('--workers', type=int, help='Процессов, по умолчанию по числу ядер')
+    ingest_parser.set_defaults(handler=ingest_command)
+
+    args = parser.parse_args()
+    args.handler(args)
+
+
+if __name__ == '__main__':
+    main()
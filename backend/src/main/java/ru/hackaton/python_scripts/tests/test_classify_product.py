@@ -0,0 +1,72 @@
+import json
+import os
+import sys
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.abspath(os.path.join(current_dir, '..')))
+
+import classify_product
+import worker_client
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    # Ответ сервера классификации задается атрибутами класса в тесте
+    status = 503
+    payload = {'error': 'Сервер перегружен'}
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        body = json.dumps(self.payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(self.status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ChooseActionTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.url = f'http://127.0.0.1:{cls.server.server_port}'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def choose_action(self, status, payload, url=None):
+        StubHandler.status, StubHandler.payload = status, payload
+        url = url or self.url
+        # Локальная модель в репозитории не хранится: вместо нее функция с известным ответом
+        with mock.patch.object(classify_product, 'CLASSIFY_SERVER_URL', url), \
+                mock.patch.object(worker_client, 'CLASSIFY_SERVER_URL', url), \
+                mock.patch.object(classify_product, 'predict_actions', return_value=[1]) as local:
+            return classify_product.choose_action('Сколько бумаги понадобится на три месяца?'), local.call_count
+
+    def test_server_answer_is_used(self):
+        self.assertEqual(self.choose_action(200, {'labels': [0]}), (0, 0))
+
+    def test_falls_back_to_local_model_on_503(self):
+        self.assertEqual(self.choose_action(503, {'error': 'Сервер перегружен'}), (1, 1))
+
+    def test_falls_back_to_local_model_on_timeout(self):
+        self.assertEqual(self.choose_action(504, {'error': 'Запрос не классифицирован за 10 с'}), (1, 1))
+
+    def test_falls_back_to_local_model_when_server_is_down(self):
+        # Порт закрытого сервера: подключение к нему отклоняется
+        with ThreadingHTTPServer(('127.0.0.1', 0), StubHandler) as closed:
+            port = closed.server_port
+        self.assertEqual(self.choose_action(200, {}, url=f'http://127.0.0.1:{port}'), (1, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import os
+import sys
+import unittest
+from unittest import mock
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.abspath(os.path.join(current_dir, '..')))
+
+from utils import rules_scripts
+from utils.rules_scripts import RuleEntry, build_trie, exclusion_target, matching_rules
+
+SETTINGS_DIR = os.path.abspath(os.path.join(current_dir, *(['..'] * 8), 'dataset', 'Настроечные таблицы'))
+RULE_143 = '143_Товары_ происходящие из иностранного государства или группы иностранных государств_ допускаемые ....xls'
+# Листы правила 143: два списка кодов, у каждого свой лист исключений
+RULE_143_LISTS = ['44-ФЗ', 'ОКПД-2', 'Мед.маски', 'Конкурентные закупки', 'ОКПД прил.2']
+
+
+def entry(attribute, code, exclude=False, list_name=None, rule_id=143, with_children=True):
+    return RuleEntry(rule_id, 'Правило', attribute, code, with_children, exclude,
+                     list_name if exclude else attribute)
+
+
+class ExclusionTargetTest(unittest.TestCase):
+    def test_pairs_exclusion_sheets_with_their_lists(self):
+        self.assertEqual(exclusion_target('Искл.ОКПД-2', RULE_143_LISTS), 'ОКПД-2')
+        self.assertEqual(exclusion_target('Искл. ОКПД прил.2', RULE_143_LISTS), 'ОКПД прил.2')
+        self.assertEqual(exclusion_target('Кроме ОКПД-2', ['Закон основание', 'ОКПД-2']), 'ОКПД-2')
+        self.assertEqual(exclusion_target('ОКПД-2 исключения', ['ОКПД-2', 'ОКПД-2 пищ. продукты']), 'ОКПД-2')
+
+    def test_unpaired_exclusion_applies_to_whole_rule(self):
+        self.assertIsNone(exclusion_target('Исключение ДЗМ', ['44-ФЗ', 'ОКПД-2']))
+
+
+class MatchingRulesTest(unittest.TestCase):
+    # Форма правила 143: "ОКПД-2" с "Искл.ОКПД-2" и "ОКПД прил.2" с "Искл. ОКПД прил.2"
+    ENTRIES = [
+        entry('ОКПД-2', '26.20'),
+        entry('Искл.ОКПД-2', '26.20.1', exclude=True, list_name='ОКПД-2'),
+        entry('ОКПД прил.2', '26.20.1'),
+        entry('Искл. ОКПД прил.2', '26.20.18', exclude=True, list_name='ОКПД прил.2'),
+        entry('ОКПД-2', '27.40'),
+        entry('Исключение', '27.40.1', exclude=True, list_name=None),
+        entry('ОКПД прил.2', '27.40'),
+        entry('ОКПД-2', '26.20', rule_id=3),
+    ]
+
+    def matches(self, okpd):
+        with mock.patch.object(rules_scripts, 'get_trie', return_value=build_trie(self.ENTRIES)):
+            return sorted((found.rule_id, found.attribute) for found in matching_rules(okpd))
+
+    def test_exclusion_keeps_other_list_of_rule(self):
+        self.assertEqual(self.matches('26.20.11.110'), [(3, 'ОКПД-2'), (143, 'ОКПД прил.2')])
+
+    def test_exclusion_from_second_list_keeps_first(self):
+        self.assertEqual(self.matches('26.20.40.150'), [(3, 'ОКПД-2'), (143, 'ОКПД-2')])
+
+    def test_code_excluded_from_both_lists(self):
+        self.assertEqual(self.matches('26.20.18.000'), [(3, 'ОКПД-2')])
+
+    def test_unpaired_exclusion_drops_all_lists(self):
+        self.assertEqual(self.matches('27.40.11'), [])
+        self.assertEqual(self.matches('27.40.21'), [(143, 'ОКПД прил.2'), (143, 'ОКПД-2')])
+
+
+@unittest.skipUnless(os.path.exists(os.path.join(SETTINGS_DIR, RULE_143)), 'нет "Настроечные таблицы" в dataset/')
+class Rule143Test(unittest.TestCase):
+    def test_exclusion_sheets_are_paired(self):
+        try:
+            entries = rules_scripts.read_rules(SETTINGS_DIR)
+        except ImportError as e:
+            self.skipTest(f'нет зависимости для чтения .xls: {e}')
+        pairs = {(found.attribute, found.list_name) for found in entries if found.rule_id == 143 and found.exclude}
+        self.assertEqual(pairs, {('Искл.ОКПД-2', 'ОКПД-2'), ('Искл. ОКПД прил.2', 'ОКПД прил.2')})
+
+
+if __name__ == '__main__':
+    unittest.main()
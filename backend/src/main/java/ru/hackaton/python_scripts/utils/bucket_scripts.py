@@ -0,0 +1,172 @@
+import math
+from datetime import datetime
+from os import getenv
+
+import numpy as np
+from pymongo import UpdateOne
+
+from utils.mongo_scripts import get_collection
+
+# Компактная копия оборотной ведомости: один документ на товар
+# {'_id': название, 'q': [год * 10 + квартал, ...], 'uc': [...], ...}, где q и числовые колонки -
+# параллельные массивы по строкам ведомости, а NaN хранится как null. История товара читается
+# одним запросом по _id. Документы дополняются при загрузке оборотов и пересобираются командой
+# maintenance.py buckets. Копия используется только после полной сборки (отметка BUILT_ID):
+# до нее в ней есть лишь строки, загруженные после появления копии. Сборка идет во временную
+# коллекцию и отменяется, если за это время в оборотную ведомость загрузили строки: их $push
+# попали бы в старую копию и пропали. Поэтому пересобирать копию нужно при остановленной загрузке.
+
+BUCKET_COLLECTION = 'Обороты по товарам'
+TURNOVER_COLLECTION = 'Оборотная ведомость'
+# Читать историю из компактной копии, если она построена (0 - всегда из оборотной ведомости)
+TURNOVER_BUCKETS = getenv('TURNOVER_BUCKETS', '1') == '1'
+# _id отметки о сборке копии; нормализованные названия не содержат пробелов, поэтому не совпадут с ней
+BUILT_ID = 'buckets built'
+# Временная коллекция сборки и количество попыток, если ведомость менялась во время сборки
+REBUILD_COLLECTION = BUCKET_COLLECTION + ' (сборка)'
+REBUILD_ATTEMPTS = 3
+# Строки с некорректными кварталом или годом пропускаются при сборке, как в календаре отчетных периодов
+VALID_PERIOD = {'квартал': {'$in': ['1', '2', '3', '4', 1, 2, 3, 4]},
+                '$or': [{'год': {'$regex': r'^\d{4}$'}}, {'год': {'$type': 'number'}}]}
+
+# Колонка оборотной ведомости -> поле массива в документе товара
+BUCKET_FIELDS = {
+    'единиц до': 'ub',
+    'единиц дебет во': 'ud',
+    'единиц кредит во': 'uc',
+    'единиц после': 'ua',
+    'цена до': 'pb',
+    'цена дебет во': 'pd',
+    'цена кредит во': 'pc',
+    'цена после': 'pa',
+}
+
+_buckets = {'ready': False}
+
+
+def bucket_key(quarter, year):
+    """
+    :param quarter: Квартал (1-4)
+    :param year: Год
+    :return: Ключ квартала год * 10 + квартал, например 20223
+    """
+    return int(year) * 10 + int(quarter)
+
+
+def stored(value):
+    # NaN и отсутствующие значения хранятся как null
+    return None if value is None or (isinstance(value, float) and math.isnan(value)) else value
+
+
+def bucket_update(document):
+    """
+    Операция добавления строки оборотной ведомости в документ товара.
+
+    :param document: Документ "Оборотная ведомость"
+    :return: UpdateOne для bulk_write
+    """
+    push = {'q': bucket_key(document['квартал'], document['год'])}
+    for column, field in BUCKET_FIELDS.items():
+        push[field] = stored(document.get(column))
+    return UpdateOne({'_id': document['name']}, {'$push': push}, upsert=True)
+
+
+def update_buckets(documents):
+    """
+    Дописывает загруженные строки оборотной ведомости в документы товаров.
+
+    :param documents: Документы "Оборотная ведомость"
+    :return: Количество строк
+    """
+    operations = [bucket_update(doc) for doc in documents]
+    if operations:
+        # Строки одного товара должны дописываться в порядке загрузки
+        get_collection(BUCKET_COLLECTION).bulk_write(operations, ordered=True)
+    return len(operations)
+
+
+def source_signature():
+    """
+    :return: Количество документов и последний _id оборотной ведомости
+    """
+    collection = get_collection(TURNOVER_COLLECTION)
+    last = collection.find_one({}, {'_id': 1}, sort=[('_id', -1)])
+    return collection.estimated_document_count(), None if last is None else last['_id']
+
+
+def rebuild_turnover_buckets():
+    """
+    Пересобирает документы товаров по всей оборотной ведомости. Загрузку оборотов на время
+    сборки нужно остановить: если ведомость изменилась, сборка повторяется, а после
+    REBUILD_ATTEMPTS попыток завершается ошибкой.
+
+    :return: Количество товаров
+    """
+    group = {'_id': '$name', 'q': {'$push': {'$add': [{'$multiply': [{'$toInt': '$год'}, 10]}, {'$toInt': '$квартал'}]}}}
+    for column, field in BUCKET_FIELDS.items():
+        group[field] = {'$push': {'$cond': [{'$gte': ['$' + column, float('-inf')]}, '$' + column, None]}}
+    pipeline = [
+        {'$match': VALID_PERIOD},
+        {'$sort': {'_id': 1}},
+        {'$group': group},
+        {'$out': REBUILD_COLLECTION},
+    ]
+    for _ in range(REBUILD_ATTEMPTS):
+        signature = source_signature()
+        get_collection(TURNOVER_COLLECTION).aggregate(pipeline, allowDiskUse=True)
+        collection = get_collection(REBUILD_COLLECTION)
+        if source_signature() != signature:
+            collection.drop()
+            continue
+        count = collection.estimated_document_count()
+        collection.update_one({'_id': BUILT_ID}, {'$set': {'built_at': datetime.now()}}, upsert=True)
+        # Копия с отметкой заменяет прежнюю одной операцией
+        collection.rename(BUCKET_COLLECTION, dropTarget=True)
+        _buckets['ready'] = True
+        return count
+    raise RuntimeError(f'"{TURNOVER_COLLECTION}" менялась во время сборки копии: остановите загрузку оборотов '
+                       f'и повторите maintenance.py buckets')
+
+
+def buckets_ready():
+    """
+    :return: True, если компактная копия включена и собрана командой maintenance.py buckets
+    """
+    if not TURNOVER_BUCKETS:
+        return False
+    if not _buckets['ready']:
+        _buckets['ready'] = get_collection(BUCKET_COLLECTION).find_one({'_id': BUILT_ID}, {'_id': 1}) is not None
+    return _buckets['ready']
+
+
+def bucket_columns(document, columns):
+    """
+    Достает из документа товара ключи кварталов и колонки.
+
+    :param document: Документ "Обороты по товарам"
+    :param columns: Колонки оборотной ведомости
+    :return: Кварталы, годы и матрица строки x колонки (NaN заменен нулем)
+    """
+    keys = np.asarray(document['q'], dtype='int64')
+    values = np.array([document[BUCKET_FIELDS[column]] for column in columns], dtype='float64')
+    values = values.T.reshape(len(keys), len(columns))
+    return keys % 10, keys // 10, np.where(np.isnan(values), 0., values)
+
+
+def find_bucket(name, columns):
+    """
+    :param name: Нормализованное название товара
+    :param columns: Нужные колонки оборотной ведомости
+    :return: Документ товара только с нужными массивами или None
+    """
+    projection = {'q': 1, **{BUCKET_FIELDS[column]: 1 for column in columns}}
+    return get_collection(BUCKET_COLLECTION).find_one({'_id': name}, projection)
+
+
+def find_all_buckets(columns):
+    """
+    :param columns: Нужные колонки оборотной ведомости
+    :return: Курсор по документам всех товаров с нужными массивами
+    """
+    projection = {'q': 1, **{BUCKET_FIELDS[column]: 1 for column in columns}}
+    return get_collection(BUCKET_COLLECTION).find({'_id': {'$ne': BUILT_ID}}, projection)
@@ -0,0 +1,252 @@
+import hashlib
+import json
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from os import getenv
+from time import time
+
+CACHE_ROOT = getenv('CACHE_ROOT', "/backend/src/main/java/ru/hackaton/python_scripts/cache/")
+
+
+def series_fingerprint(series):
+    """
+    Считает отпечаток квартального ряда: меняется при любом изменении дат или значений.
+
+    :param series: pandas Series с датами в индексе
+    :return: Шестнадцатеричный хеш
+    """
+    digest = hashlib.sha1()
+    digest.update(str([date.strftime('%Y-%m-%d') for date in series.index]).encode('utf-8'))
+    digest.update(series.to_numpy(dtype='float64').tobytes())
+    return digest.hexdigest()
+
+
+class ModelCache:
+    """
+    LRU-кеш обученных моделей в памяти и на диске.
+
+    На каждый товар хранится одна модель вместе с отпечатком данных, на которых она обучена.
+    Если отпечаток не совпадает (загружена новая оборотная ведомость), запись считается
+    устаревшей: get ее не возвращает, а следующий put перезаписывает. Устаревшая модель
+    остается доступна через peek для дообучения на новых кварталах.
+    """
+
+    def __init__(self, directory, max_entries):
+        self.directory = directory
+        self.max_entries = max_entries
+        self._memory = OrderedDict()
+
+    def _path(self, name):
+        return os.path.join(self.directory, hashlib.sha1(name.encode('utf-8')).hexdigest() + '.pkl')
+
+    def get(self, name, fingerprint):
+        """
+        Возвращает модель товара, если она обучена на данных с тем же отпечатком.
+
+        :param name: Нормализованное название товара
+        :param fingerprint: Отпечаток агрегированного ряда
+        :return: Модель или None
+        """
+        if name in self._memory:
+            cached_fingerprint, model = self._memory[name]
+            if cached_fingerprint == fingerprint:
+                self._memory.move_to_end(name)
+                return model
+            return None
+
+        path = self._path(name)
+        try:
+            with open(path, 'rb') as f:
+                entry = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        if entry['fingerprint'] != fingerprint:
+            return None
+        os.utime(path)
+        self._remember(name, fingerprint, entry['model'])
+        return entry['model']
+
+    def peek(self, name):
+        """
+        Возвращает последнюю сохраненную модель товара без проверки актуальности данных.
+
+        :param name: Нормализованное название товара
+        :return: Отпечаток и модель, либо (None, None)
+        """
+        if name in self._memory:
+            return self._memory[name]
+        try:
+            with open(self._path(name), 'rb') as f:
+                entry = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None, None
+        return entry['fingerprint'], entry['model']
+
+    def put(self, name, fingerprint, model):
+        """
+        Сохраняет модель товара в памяти и на диске.
+
+        :param name: Нормализованное название товара
+        :param fingerprint: Отпечаток агрегированного ряда
+        :param model: Обученная модель
+        """
+        self._remember(name, fingerprint, model)
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(name)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump({'name': name, 'fingerprint': fingerprint, 'model': model}, f)
+        os.replace(tmp_path, path)
+        self._evict_disk()
+
+    def invalidate(self, name):
+        """
+        Удаляет модель товара из памяти и с диска.
+
+        :param name: Нормализованное название товара
+        """
+        self._memory.pop(name, None)
+        try:
+            os.remove(self._path(name))
+        except OSError:
+            pass
+
+    def _remember(self, name, fingerprint, model):
+        self._memory[name] = (fingerprint, model)
+        self._memory.move_to_end(name)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _evict_disk(self):
+        files = [entry for entry in os.scandir(self.directory) if entry.name.endswith('.pkl')]
+        if len(files) <= self.max_entries:
+            return
+        files.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in files[:len(files) - self.max_entries]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+
+class OrderStore:
+    """
+    Порядки моделей ARIMA, подобранные auto_arima для каждого товара.
+
+    Хранится по одному JSON-файлу на товар, чтобы процессы пакетного режима и пула
+    воркеров могли обновлять записи независимо.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def _path(self, name):
+        return os.path.join(self.directory, hashlib.sha1(name.encode('utf-8')).hexdigest() + '.json')
+
+    def get(self, name):
+        """
+        :param name: Нормализованное название товара
+        :return: Запись с порядком модели или None
+        """
+        try:
+            with open(self._path(name), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, name, record):
+        """
+        :param name: Нормализованное название товара
+        :param record: Запись с порядком модели
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(name)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(dict(record, name=name), f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+
+class ChartCache:
+    """
+    Каталог PNG-графиков с адресацией по содержимому.
+
+    Имя файла - хеш от типа графика, данных, подписей и горизонта прогноза, поэтому
+    повторный запрос с теми же данными возвращает готовый файл без отрисовки.
+    Каталог ограничен по количеству файлов, суммарному размеру и возрасту: при каждом
+    сохранении нового графика удаляются самые давно запрошенные файлы.
+    """
+
+    def __init__(self, directory, max_files, max_bytes, max_age):
+        self.directory = directory
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+
+    @staticmethod
+    def key(*parts):
+        """
+        :param parts: Тип графика, данные и подписи (должны сериализоваться в JSON)
+        :return: Ключ графика
+        """
+        return hashlib.sha1(json.dumps(parts, ensure_ascii=False, default=str).encode('utf-8')).hexdigest()
+
+    def get_or_render(self, key, render):
+        """
+        Возвращает путь к графику, отрисовывая его только при отсутствии в кеше.
+
+        :param key: Ключ графика
+        :param render: Функция, сохраняющая PNG по переданному пути
+        :return: Путь к файлу графика
+        """
+        path = os.path.join(self.directory, key + '.png')
+        try:
+            # Время изменения служит временем последнего запроса для вытеснения
+            os.utime(path)
+            return path
+        except OSError:
+            pass
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        render(tmp_path)
+        os.replace(tmp_path, path)
+        self.evict()
+        return path
+
+    def evict(self):
+        """
+        Удаляет устаревшие графики и самые давно запрошенные, пока каталог не уложится в лимиты.
+        """
+        now = time()
+        files = []
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith('.png'):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, entry.path))
+        files.sort()
+
+        total_size = sum(size for _, size, _ in files)
+        count = len(files)
+        for mtime, size, path in files:
+            if count <= self.max_files and total_size <= self.max_bytes and now - mtime <= self.max_age:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            count -= 1
+            total_size -= size
+
+
+model_cache = ModelCache(os.path.join(CACHE_ROOT, 'models'), int(getenv('MODEL_CACHE_SIZE', '512')))
+order_store = OrderStore(os.path.join(CACHE_ROOT, 'orders'))
+chart_cache = ChartCache(getenv('CHART_CACHE_DIR', "/backend/src/main/java/ru/hackaton/python_scripts/images/"),
+                         int(getenv('CHART_CACHE_MAX_FILES', '2000')),
+                         int(getenv('CHART_CACHE_MAX_MB', '200')) * 2 ** 20,
+                         float(getenv('CHART_CACHE_MAX_AGE_HOURS', '168')) * 3600)
@@ -0,0 +1,89 @@
+from utils.mongo_scripts import get_collection
+from utils.time_scripts import make_datetime
+
+# Календарь отчетных периодов: даты концов кварталов, за которые загружены оборотные ведомости.
+# Хранится одним документом {'_id': 'quarters', 'dates': [...], 'version': n}. Загрузка оборотов
+# добавляет в него период и увеличивает версию, а процессы держат копию в памяти и перечитывают
+# даты только при смене версии.
+
+CALENDAR_COLLECTION = 'Отчетные периоды'
+CALENDAR_ID = 'quarters'
+
+_calendar = {'version': None, 'dates': []}
+
+
+def quarter_end(quarter, year):
+    """
+    :param quarter: Квартал (1-4)
+    :param year: Год
+    :return: Дата конца квартала в формате YYYY-MM-DD
+    """
+    return make_datetime(quarter, year).strftime('%Y-%m-%d')
+
+
+def scan_report_dates():
+    """
+    Собирает даты отчетных периодов полным проходом по коллекции "Оборотная ведомость".
+
+    :return: Отсортированный список дат
+    """
+    pipeline = [{"$group": {"_id": {"квартал": "$квартал", "год": "$год"}}}]
+    periods = get_collection('Оборотная ведомость').aggregate(pipeline, allowDiskUse=True)
+    return sorted({quarter_end(doc['_id']['квартал'], doc['_id']['год']) for doc in periods
+                   if str(doc['_id']['квартал']) in ('1', '2', '3', '4')})
+
+
+def add_report_dates(dates, upsert=True):
+    """
+    Добавляет даты в календарь и увеличивает его версию.
+
+    :param dates: Даты в формате YYYY-MM-DD
+    :param upsert: Создать календарь, если его еще нет
+    """
+    get_collection(CALENDAR_COLLECTION).update_one(
+        {'_id': CALENDAR_ID},
+        {'$addToSet': {'dates': {'$each': list(dates)}}, '$inc': {'version': 1}},
+        upsert=upsert)
+
+
+def add_report_period(quarter, year):
+    """
+    Регистрирует загруженный период оборотной ведомости. Если календаря еще нет, он не создается:
+    календарь из одного периода скрыл бы остальные, его строит полным проходом get_report_dates.
+
+    :param quarter: Квартал (1-4)
+    :param year: Год
+    """
+    add_report_dates([quarter_end(quarter, year)], upsert=False)
+
+
+def rebuild_report_calendar():
+    """
+    Пересобирает календарь по текущему содержимому оборотной ведомости (например, после удаления данных).
+
+    :return: Список дат
+    """
+    dates = scan_report_dates()
+    get_collection(CALENDAR_COLLECTION).update_one(
+        {'_id': CALENDAR_ID}, {'$set': {'dates': dates}, '$inc': {'version': 1}}, upsert=True)
+    return dates
+
+
+def get_report_dates():
+    """
+    Возвращает даты отчетных периодов. Из базы читается только версия календаря,
+    сами даты перечитываются, когда она изменилась. Если календаря еще нет, он строится
+    одним полным проходом по оборотной ведомости.
+
+    :return: Отсортированный список дат в формате YYYY-MM-DD
+    """
+    collection = get_collection(CALENDAR_COLLECTION)
+    document = collection.find_one({'_id': CALENDAR_ID}, {'version': 1})
+    if document is None:
+        add_report_dates(scan_report_dates())
+        document = collection.find_one({'_id': CALENDAR_ID}, {'version': 1})
+    if document['version'] != _calendar['version']:
+        document = collection.find_one({'_id': CALENDAR_ID})
+        _calendar['dates'] = sorted(document['dates'])
+        _calendar['version'] = document['version']
+    return list(_calendar['dates'])
@@ -0,0 +1,133 @@
+import csv
+import os
+import pickle
+import re
+import threading
+from collections import namedtuple
+from os import getenv
+from time import monotonic
+
+from utils.cache_scripts import CACHE_ROOT
+from utils.mongo_scripts import get_collection
+
+# Справочник СТЕ для json_maker: СТЕ_ОКПД-2.csv и коллекция "Справочники", собранные в один словарь
+# {нормализованное название СТЕ: CatalogEntry}. Словарь сохраняется на диск в pickle вместе с версиями
+# источников (mtime и размер CSV, количество документов и последний _id коллекции) и держится
+# в памяти процесса. Версии источников проверяются не чаще раза в CATALOG_CHECK_SECONDS,
+# при их изменении словарь собирается заново.
+
+OKPD_CSV = getenv('OKPD_CSV', "/backend/src/main/java/ru/hackaton/python_scripts/СТЕ_ОКПД-2.csv")
+CATALOG_COLLECTION = 'Справочники'
+CATALOG_CACHE = os.path.join(CACHE_ROOT, 'catalog.pkl')
+CATALOG_CHECK_SECONDS = float(getenv('CATALOG_CHECK_SECONDS', '60'))
+# Меняется при изменении формата словаря, чтобы не читать сохраненный словарь старого формата
+CATALOG_FORMAT = 1
+
+# okpd - код ОКПД-2 (0, если товара нет в CSV); остальные поля - из первого документа "Справочники"
+# с этим названием, in_reference=False, если такого документа нет
+CatalogEntry = namedtuple('CatalogEntry', ['okpd', 'in_reference', 'spgz_code', 'spgz', 'kpgz', 'characteristics'])
+
+_catalog = {'versions': None, 'entries': {}, 'checked_at': None}
+_lock = threading.Lock()
+
+
+def normalize(name):
+    return re.sub(r'\s+', '', str(name)).strip().lower()
+
+
+def source_versions():
+    """
+    :return: Версии источников: (mtime_ns, размер) CSV и (количество документов, последний _id) коллекции
+    """
+    try:
+        stat = os.stat(OKPD_CSV)
+        csv_version = (stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        csv_version = None
+    collection = get_collection(CATALOG_COLLECTION)
+    last = collection.find_one({}, {'_id': 1}, sort=[('_id', -1)])
+    return csv_version, (collection.estimated_document_count(), None if last is None else str(last['_id']))
+
+
+def read_okpd():
+    """
+    :return: Словарь {нормализованное название СТЕ: код ОКПД-2}, для повторов - первая строка
+    """
+    codes = {}
+    try:
+        with open(OKPD_CSV, encoding='utf-8', newline='') as f:
+            for row in csv.DictReader(f):
+                codes.setdefault(normalize(row['Название СТЕ']), row['ОКПД-2'])
+    except OSError:
+        pass
+    return codes
+
+
+def compile_catalog():
+    """
+    Собирает словарь из CSV и коллекции "Справочники".
+
+    :return: Словарь {нормализованное название СТЕ: CatalogEntry}
+    """
+    codes = read_okpd()
+    entries = {}
+    projection = {'Название СТЕ': 1, 'СПГЗ код': 1, 'СПГЗ': 1, 'Конечный код КПГЗ': 1, 'наименование характеристик': 1}
+    for doc in get_collection(CATALOG_COLLECTION).find({}, projection).sort('_id', 1):
+        name = normalize(doc.get('Название СТЕ', ''))
+        if name in entries:
+            continue
+        entries[name] = CatalogEntry(codes.get(name, 0), True, doc.get('СПГЗ код'), doc.get('СПГЗ'),
+                                     doc.get('Конечный код КПГЗ'), doc.get('наименование характеристик') or '')
+    for name, code in codes.items():
+        if name not in entries:
+            entries[name] = CatalogEntry(code, False, None, None, None, '')
+    return entries
+
+
+def load_saved(versions):
+    try:
+        with open(CATALOG_CACHE, 'rb') as f:
+            saved = pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError):
+        return None
+    if saved.get('format') != CATALOG_FORMAT or saved.get('versions') != versions:
+        return None
+    return saved['entries']
+
+
+def save(versions, entries):
+    os.makedirs(os.path.dirname(CATALOG_CACHE), exist_ok=True)
+    tmp_path = f'{CATALOG_CACHE}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        pickle.dump({'format': CATALOG_FORMAT, 'versions': versions, 'entries': entries}, f,
+                    protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, CATALOG_CACHE)
+
+
+def get_catalog():
+    """
+    Возвращает актуальный словарь справочника: из памяти, с диска или собранный заново.
+
+    :return: Словарь {нормализованное название СТЕ: CatalogEntry}
+    """
+    now = monotonic()
+    if _catalog['checked_at'] is not None and now - _catalog['checked_at'] < CATALOG_CHECK_SECONDS:
+        return _catalog['entries']
+    with _lock:
+        versions = source_versions()
+        if versions != _catalog['versions']:
+            entries = load_saved(versions)
+            if entries is None:
+                entries = compile_catalog()
+                save(versions, entries)
+            _catalog['versions'], _catalog['entries'] = versions, entries
+        _catalog['checked_at'] = now
+    return _catalog['entries']
+
+
+def find_entry(name):
+    """
+    :param name: Название СТЕ
+    :return: CatalogEntry или None, если товара нет ни в CSV, ни в "Справочники"
+    """
+    return get_catalog().get(normalize(name))
@@ -0,0 +1,231 @@
+import fcntl
+import json
+import os
+from datetime import datetime
+from importlib.util import find_spec
+from os import getenv
+
+from bson import ObjectId
+
+from utils.mongo_scripts import get_collection
+
+# Колоночная копия "Оборотная ведомость" и "Складские остатки" в Parquet для пакетных задач.
+# Каждая выгрузка дописывает новый файл part-*.parquet с документами, у которых _id больше
+# сохраненной отметки, поэтому обновление после загрузки читает из MongoDB только новые строки.
+# Файлы открываются через memory map, фильтры применяются к колонкам Arrow без разбора BSON.
+
+COLUMNAR_DIR = getenv('COLUMNAR_DIR', "/backend/src/main/java/ru/hackaton/python_scripts/columnar/")
+# Сколько документов собирается в одну группу строк Parquet
+COLUMNAR_BATCH_ROWS = int(getenv('COLUMNAR_BATCH_ROWS', '50000'))
+# При большем количестве файлов выгрузка сливает их в один
+COLUMNAR_MAX_PARTS = int(getenv('COLUMNAR_MAX_PARTS', '32'))
+
+TURNOVER_NUMBERS = ('единиц до', 'цена до', 'единиц дебет во', 'цена дебет во',
+                    'единиц кредит во', 'цена кредит во', 'единиц после', 'цена после')
+
+
+def to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def to_text(value):
+    return None if value is None else str(value)
+
+
+def to_date(value):
+    try:
+        return datetime.strptime(value, '%d.%m.%Y').date()
+    except (TypeError, ValueError):
+        return None
+
+
+# Таблица -> коллекция и колонки (название в Parquet, поле документа, тип Arrow, преобразование)
+TABLES = {
+    'turnovers': ('Оборотная ведомость', [
+        ('name', 'name', 'string', to_text),
+        ('квартал', 'квартал', 'int8', to_int),
+        ('год', 'год', 'int16', to_int),
+        *[(column, column, 'float64', to_float) for column in TURNOVER_NUMBERS],
+        ('группа', 'группа', 'int16', to_int),
+        ('подгруппа', 'подгруппа', 'string', to_text),
+        ('единица измерения', 'единица измерения', 'string', to_text),
+    ]),
+    'stock': ('Складские остатки', [
+        ('Название', 'Название', 'string', to_text),
+        ('Дата', 'Дата', 'date32', to_date),
+        # Остаток по сч. 105 хранится строкой
+        ('Остаток', 'Остаток', 'float64', to_float),
+        ('сч', 'сч', 'int16', to_int),
+        ('Подгруппа', 'Подгруппа', 'string', to_text),
+        ('полное название', 'полное название', 'string', to_text),
+    ]),
+}
+
+
+def columnar_available():
+    """
+    :return: True, если установлен pyarrow
+    """
+    return find_spec('pyarrow') is not None
+
+
+def table_dir(table):
+    return os.path.join(COLUMNAR_DIR, table)
+
+
+def read_manifest(table):
+    """
+    :param table: Таблица ('turnovers' или 'stock')
+    :return: Описание выгрузки {'watermark', 'parts', 'rows'} или None, если выгрузки еще не было
+    """
+    try:
+        with open(os.path.join(table_dir(table), 'manifest.json'), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_manifest(table, manifest):
+    path = os.path.join(table_dir(table), 'manifest.json')
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def schema_for(table):
+    import pyarrow as pa
+
+    return pa.schema([(column, getattr(pa, type_name)()) for column, _, type_name, _ in TABLES[table][1]])
+
+
+def write_part(table, cursor, path):
+    """
+    Пишет документы курсора в файл Parquet группами по COLUMNAR_BATCH_ROWS строк.
+
+    :return: Количество строк и _id последнего документа
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    columns = TABLES[table][1]
+    schema = schema_for(table)
+    rows, last_id, writer = 0, None, None
+    batch = {column: [] for column, _, _, _ in columns}
+
+    def flush():
+        nonlocal writer
+        if writer is None:
+            writer = pq.ParquetWriter(path, schema)
+        writer.write_table(pa.Table.from_pydict(batch, schema=schema))
+        for values in batch.values():
+            values.clear()
+
+    try:
+        for doc in cursor:
+            for column, field, _, convert in columns:
+                batch[column].append(convert(doc.get(field)))
+            rows += 1
+            last_id = doc['_id']
+            if rows % COLUMNAR_BATCH_ROWS == 0:
+                flush()
+        if rows % COLUMNAR_BATCH_ROWS:
+            flush()
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows, last_id
+
+
+def compact(table, manifest):
+    """
+    Сливает файлы выгрузки в один.
+    """
+    import pyarrow.parquet as pq
+
+    directory = table_dir(table)
+    merged = f'part-{manifest["watermark"]}-all.parquet'
+    source = pq.ParquetDataset([os.path.join(directory, part) for part in manifest['parts']], memory_map=True)
+    pq.write_table(source.read(), os.path.join(directory, merged + '.tmp'), row_group_size=COLUMNAR_BATCH_ROWS)
+    os.replace(os.path.join(directory, merged + '.tmp'), os.path.join(directory, merged))
+    old_parts, manifest['parts'] = manifest['parts'], [merged]
+    write_manifest(table, manifest)
+    for part in old_parts:
+        if part != merged:
+            os.remove(os.path.join(directory, part))
+
+
+def refresh_columnar(table, full=False):
+    """
+    Дописывает в колоночную копию документы, загруженные после прошлой выгрузки.
+
+    :param table: Таблица ('turnovers' или 'stock')
+    :param full: Выгрузить коллекцию заново (например, после удаления документов)
+    :return: Количество выгруженных строк
+    """
+    directory = table_dir(table)
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, '.lock'), 'w') as lock:
+        # Выгрузки после параллельных загрузок выполняются по очереди
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        manifest = None if full else read_manifest(table)
+        if manifest is None:
+            for part in (read_manifest(table) or {}).get('parts', []):
+                try:
+                    os.remove(os.path.join(directory, part))
+                except OSError:
+                    pass
+            manifest = {'watermark': None, 'parts': [], 'rows': 0}
+
+        collection_name, columns = TABLES[table]
+        query = {} if manifest['watermark'] is None else {'_id': {'$gt': ObjectId(manifest['watermark'])}}
+        projection = {field: 1 for _, field, _, _ in columns}
+        cursor = get_collection(collection_name).find(query, projection).sort('_id', 1).batch_size(COLUMNAR_BATCH_ROWS)
+
+        part = f'part-{datetime.now().strftime("%Y%m%d%H%M%S%f")}.parquet'
+        rows, last_id = write_part(table, cursor, os.path.join(directory, part + '.tmp'))
+        if rows:
+            os.replace(os.path.join(directory, part + '.tmp'), os.path.join(directory, part))
+            manifest['parts'].append(part)
+            manifest['watermark'] = str(last_id)
+            manifest['rows'] += rows
+        write_manifest(table, manifest)
+        if len(manifest['parts']) > COLUMNAR_MAX_PARTS:
+            compact(table, manifest)
+    return rows
+
+
+def columnar_ready(table):
+    """
+    :param table: Таблица ('turnovers' или 'stock')
+    :return: True, если pyarrow установлен и выгрузка уже создавалась
+    """
+    return columnar_available() and read_manifest(table) is not None
+
+
+def read_columnar(table, columns=None, filters=None):
+    """
+    Читает колоночную копию через memory map.
+
+    :param table: Таблица ('turnovers' или 'stock')
+    :param columns: Нужные колонки, по умолчанию все
+    :param filters: Фильтры pyarrow, например [('год', '>=', 2022)]
+    :return: pyarrow.Table
+    """
+    import pyarrow.parquet as pq
+
+    manifest = read_manifest(table)
+    if manifest is None or not manifest['parts']:
+        return schema_for(table).empty_table().select(columns or schema_for(table).names)
+    paths = [os.path.join(table_dir(table), part) for part in manifest['parts']]
+    return pq.ParquetDataset(paths, filters=filters, memory_map=True).read(columns=columns)
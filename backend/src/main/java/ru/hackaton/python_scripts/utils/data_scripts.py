@@ -1,41 +1,17 @@
 from re import sub
 from os import getenv
-from datetime import datetime
 from dotenv import load_dotenv
 
-from pymongo import MongoClient
-import pandas as pd
-
+from utils.bucket_scripts import buckets_ready, find_bucket, find_all_buckets, bucket_columns
+from utils.calendar_scripts import get_report_dates
+from utils.columnar_scripts import columnar_ready, refresh_columnar, read_columnar
+from utils.mongo_scripts import get_collection
+from utils.name_scripts import name_registry
+from utils.series_scripts import quarterly_frame, empty_frame
 from utils.time_scripts import make_datetime
 
 load_dotenv(dotenv_path="py_prediction.env")
 
-MONGO_URL="mongodb://localhost:27017"
-DB_NAME="stock_remainings"
-
-
-# Функция чтобы найти все вхождения в коллекцию по фильтру
-def mongo_find(filter):
-    client = MongoClient(MONGO_URL)
-    db = client[DB_NAME]
-    collection_ost = db['Складские остатки']
-    data = collection_ost.find(filter)
-    return data
-
-
-# Функция для вставки данных, если записи еще не существует
-def insert_data_if_not_exists(name, normalized_name):
-    client = MongoClient(MONGO_URL)
-    db = client[DB_NAME]
-    collection = db['Нормализированные имена']
-    existing_document = collection.find_one({'name': name})
-    if not existing_document:
-        data = {
-            'name': name,
-            'normalized_name': normalized_name,
-        }
-        collection.insert_one(data)
-
 
 def get_mongo_collection(collection_name):
     """
@@ -43,105 +19,125 @@ def get_mongo_collection(collection_name):
 
     :return: Коллекция MongoDB
     """
-    client = MongoClient(MONGO_URL)
-    db = client[DB_NAME]
-    return db[collection_name]
+    return get_collection(collection_name)
 
 
 def normalize_name(name):
     # Приводим к нижнему регистру и удаляем пробелы
     normalized_name = sub(r'\s+', '', name).strip().lower()
-    insert_data_if_not_exists(name, normalized_name)
+    # Запись в "Нормализированные имена" откладывается и идет пачкой, запрос в базу не пишет
+    name_registry.register(name, normalized_name)
     return normalized_name
 
 
-def fetch_data(collection, name):
+def quarterly_pipeline(normalized_name, columns):
     """
-    Получает данные из коллекции MongoDB и нормализует имена.
-
-    :param collection: Коллекция MongoDB
-    :param name: Название для нормализации
-    :return: Данные и даты
+    :param normalized_name: Нормализованное название товара
+    :param columns: Колонки для суммирования
+    :return: Конвейер агрегации: суммы колонок товара по (квартал, год), колонка i - в поле sum{i}
     """
-    pipeline = [
-        {
-            "$project": {
-                "год": {"$toString": "$год"},
-                "квартал": "$квартал",
-                "start_date": {
-                    "$switch": {
-                        "branches": [
-                            {"case": {"$eq": ["$квартал", "1"]}, "then": {"$concat": ["$год", "-03-31"]}},
-                            {"case": {"$eq": ["$квартал", "2"]}, "then": {"$concat": ["$год", "-06-30"]}},
-                            {"case": {"$eq": ["$квартал", "3"]}, "then": {"$concat": ["$год", "-09-30"]}},
-                            {"case": {"$eq": ["$квартал", "4"]}, "then": {"$concat": ["$год", "-12-31"]}}
-                        ],
-                        "default": "unknown"
-                    }
-                }
-            }
-        },
-        {
-            "$group": {
-                "_id": "$start_date"
-            }
-        },
-        {
-            "$project": {
-                "date": "$_id"
-            }
-        }
+    group = {"_id": {"квартал": "$квартал", "год": "$год"}}
+    for i, column in enumerate(columns):
+        group[f"sum{i}"] = {"$sum": numeric_or_zero(column)}
+    return [
+        {"$match": {"name": normalized_name}},
+        {"$group": group},
     ]
-    result = list(collection.aggregate(pipeline))
-    dates = [doc['date'] for doc in result]
-    data = collection.find({"name": normalize_name(name)})
-    return data, dates
 
 
-def aggregate_data(data, column):
+def fetch_quarterly(collection, name, columns):
+    """
+    Суммирует колонки оборотной ведомости товара по кварталам. Если построена компактная копия
+    ("Обороты по товарам"), история читается из нее одним запросом по _id, иначе суммы считаются
+    на стороне MongoDB и из базы приходит по одному документу (квартал, год, суммы) на период.
+
+    :param collection: Коллекция "Оборотная ведомость"
+    :param name: Название товара (нормализуется)
+    :param columns: Колонки для суммирования, например ["единиц кредит во", "единиц после"]
+    :return: Квартальная таблица (PeriodIndex 'дата') с колонкой на каждую запрошенную колонку;
+        пустая, если данных нет
     """
-    Агрегирует данные по кварталам и годам.
+    normalized_name = normalize_name(name)
+    if buckets_ready():
+        document = find_bucket(normalized_name, columns)
+        if document is None:
+            return empty_frame(columns)
+        quarters, years, values = bucket_columns(document, columns)
+        return quarterly_frame(quarters, years, values, columns, get_report_dates())
+
+    docs = list(collection.aggregate(quarterly_pipeline(normalized_name, columns)))
+    if not docs:
+        return empty_frame(columns)
+    return quarterly_frame([doc["_id"]["квартал"] for doc in docs], [doc["_id"]["год"] for doc in docs],
+                           [[doc[f"sum{i}"] for i in range(len(columns))] for doc in docs],
+                           columns, get_report_dates())
+
+
+def numeric_or_zero(field):
+    """
+    Выражение агрегации: значение поля, либо 0 для NaN и отсутствующих значений.
+    NaN в MongoDB меньше любого числа, поэтому не проходит сравнение с -inf.
 
-    :param data: Исходные данные
-    :return: Агрегированные данные
+    :param field: Название поля
+    :return: Выражение $cond
     """
-    aggregated_data = {}
-    for document in data:
-        key = (document["квартал"], document["год"])
-        if key not in aggregated_data:
-            aggregated_data[key] = 0
-        aggregated_data[key] += 0 if pd.isna(document[column]) else document[column]
-    return aggregated_data
+    return {"$cond": [{"$gte": ["$" + field, float('-inf')]}, "$" + field, 0]}
 
 
-def create_dataframe(aggregated_data, columns):
+def aggregate_all_data(collection, column):
     """
-    Создает DataFrame из агрегированных данных.
+    Агрегирует данные всех товаров по кварталам и годам. Если выгружена колоночная копия
+    (maintenance.py export), суммы считаются по ней без чтения документов из MongoDB.
 
-    :param aggregated_data: Агрегированные данные
-    :return: DataFrame
+    :param collection: Коллекция MongoDB
+    :param column: Название колонки для суммирования
+    :return: Словарь {название: {(квартал, год): сумма}} и список дат отчетных периодов
     """
-    df = pd.DataFrame(
-        [(value, make_datetime(key[0], key[1])) for key, value in aggregated_data.items()],
-        columns=columns
-    )
-    return df
+    if columnar_ready('turnovers'):
+        # Колоночная копия: дописываем документы, загруженные после прошлой выгрузки, и суммируем в pandas
+        refresh_columnar('turnovers')
+        frame = read_columnar('turnovers', ['name', 'квартал', 'год', column]).to_pandas()
+        sums = frame.fillna({column: 0.}).groupby(['name', 'квартал', 'год'])[column].sum()
+        aggregated_data, periods = {}, set()
+        for (name, quarter, year), value in sums.items():
+            key = (str(quarter), str(year))
+            aggregated_data.setdefault(name, {})[key] = value
+            periods.add(key)
+        dates = [make_datetime(quarter, year).strftime('%Y-%m-%d') for quarter, year in periods]
+        return aggregated_data, dates
+
+    if buckets_ready():
+        aggregated_data, periods = {}, set()
+        for document in find_all_buckets([column]):
+            quarters, years, values = bucket_columns(document, [column])
+            sums = aggregated_data.setdefault(document["_id"], {})
+            for quarter, year, value in zip(quarters.tolist(), years.tolist(), values[:, 0].tolist()):
+                key = (str(quarter), str(year))
+                sums[key] = sums.get(key, 0.) + value
+            periods.update(sums)
+        dates = [make_datetime(quarter, year).strftime('%Y-%m-%d') for quarter, year in periods]
+        return aggregated_data, dates
+
+    pipeline = [
+        {"$group": {
+            "_id": {"name": "$name", "квартал": "$квартал", "год": "$год"},
+            "sum": {"$sum": numeric_or_zero(column)}
+        }}
+    ]
+    aggregated_data, periods = {}, set()
+    for doc in collection.aggregate(pipeline, allowDiskUse=True):
+        key = (doc["_id"]["квартал"], doc["_id"]["год"])
+        aggregated_data.setdefault(doc["_id"]["name"], {})[key] = doc["sum"]
+        periods.add(key)
+    dates = [make_datetime(quarter, year).strftime('%Y-%m-%d') for quarter, year in periods]
+    return aggregated_data, dates
 
 
-def add_missing_dates(df, dates, column):
+def find_forecast(name):
     """
-    Добавляет отсутствующие даты в DataFrame.
+    Возвращает предрассчитанный пакетным прогнозом результат для товара.
 
-    :param column: Название колонки
-    :param df: Исходный DataFrame
-    :param dates: Список дат
-    :return: DataFrame с добавленными отсутствующими датами
+    :param name: Нормализованное название товара
+    :return: Документ коллекции "Прогнозы" или None
     """
-    new_rows = []
-    for date in dates:
-        if date not in df['дата'].apply(lambda x: x.strftime('%Y-%m-%d')).values:
-            new_rows.append({'дата': datetime.strptime(date, '%Y-%m-%d'), column: 0})
-    if new_rows:
-        new_rows_df = pd.DataFrame(new_rows)
-        df = pd.concat([df, new_rows_df], ignore_index=True)
-    return df
\ No newline at end of file
+    return get_mongo_collection("Прогнозы").find_one({"name": name}, {"_id": 0})
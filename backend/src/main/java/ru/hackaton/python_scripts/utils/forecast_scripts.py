@@ -0,0 +1,184 @@
+from os import getenv
+
+import numpy as np
+
+from utils.time_scripts import make_datetime
+
+# Быстрые прогнозы для коротких и прерывистых рядов. Все функции принимают матрицу
+# товары x кварталы и считают прогноз для всех строк одновременно.
+
+SEASON = 4
+# Минимальная длина ряда (в кварталах), начиная с которой имеет смысл auto_arima
+ARIMA_MIN_QUARTERS = int(getenv('ARIMA_MIN_QUARTERS', '12'))
+# Доля нулевых кварталов, при которой ряд считается прерывистым
+INTERMITTENT_SHARE = float(getenv('INTERMITTENT_SHARE', '0.5'))
+# Движок прогноза: auto (выбор по длине ряда), arima или fast
+FORECAST_ENGINE = getenv('FORECAST_ENGINE', 'auto')
+
+METHODS = ('snaive', 'ma', 'ses', 'sba')
+
+
+def seasonal_naive(matrix, horizon, season=SEASON):
+    """
+    Сезонный наивный прогноз: повторяет последний сезон. Для рядов короче сезона повторяет последнее значение.
+
+    :param matrix: Матрица товары x кварталы
+    :param horizon: Количество прогнозируемых кварталов
+    :return: Матрица товары x horizon
+    """
+    length = matrix.shape[1]
+    if length >= season:
+        columns = length - season + np.arange(horizon) % season
+    else:
+        columns = np.full(horizon, length - 1)
+    return matrix[:, columns]
+
+
+def moving_average(matrix, horizon, window=SEASON):
+    """
+    Среднее за последние window кварталов.
+
+    :param matrix: Матрица товары x кварталы
+    :param horizon: Количество прогнозируемых кварталов
+    :return: Матрица товары x horizon
+    """
+    level = matrix[:, -window:].mean(axis=1)
+    return np.repeat(level[:, None], horizon, axis=1)
+
+
+def simple_exponential_smoothing(matrix, horizon, alpha=0.3):
+    """
+    Простое экспоненциальное сглаживание с фиксированным alpha.
+
+    :param matrix: Матрица товары x кварталы
+    :param horizon: Количество прогнозируемых кварталов
+    :return: Матрица товары x horizon
+    """
+    level = matrix[:, 0].copy()
+    for t in range(1, matrix.shape[1]):
+        level = alpha * matrix[:, t] + (1 - alpha) * level
+    return np.repeat(level[:, None], horizon, axis=1)
+
+
+def croston_sba(matrix, horizon, alpha=0.1):
+    """
+    Метод Кростона с поправкой Syntetos-Boylan для прерывистого спроса.
+
+    :param matrix: Матрица товары x кварталы
+    :param horizon: Количество прогнозируемых кварталов
+    :return: Матрица товары x horizon
+    """
+    rows = matrix.shape[0]
+    size = np.zeros(rows)
+    interval = np.ones(rows)
+    since_demand = np.ones(rows)
+    started = np.zeros(rows, dtype=bool)
+    for t in range(matrix.shape[1]):
+        demand = matrix[:, t] > 0
+        first = demand & ~started
+        update = demand & started
+        size = np.where(first, matrix[:, t], size)
+        interval = np.where(first, since_demand, interval)
+        size = np.where(update, alpha * matrix[:, t] + (1 - alpha) * size, size)
+        interval = np.where(update, alpha * since_demand + (1 - alpha) * interval, interval)
+        started |= demand
+        since_demand = np.where(demand, 1, since_demand + 1)
+    level = np.where(started, (1 - alpha / 2) * size / interval, 0.)
+    return np.repeat(level[:, None], horizon, axis=1)
+
+
+def series_stats(matrix):
+    """
+    Длина истории (от первого ненулевого квартала) и доля нулей в ней для каждой строки.
+
+    :param matrix: Матрица товары x кварталы
+    :return: Массив длин и массив долей нулей
+    """
+    positive = matrix > 0
+    has_demand = positive.any(axis=1)
+    lengths = np.where(has_demand, matrix.shape[1] - positive.argmax(axis=1), 0)
+    zero_share = 1 - positive.sum(axis=1) / np.maximum(lengths, 1)
+    return lengths, zero_share
+
+
+def choose_methods(matrix):
+    """
+    Выбирает метод для каждой строки по длине ряда и доле нулей.
+
+    :param matrix: Матрица товары x кварталы
+    :return: Массив индексов методов из METHODS
+    """
+    lengths, zero_share = series_stats(matrix)
+    methods = np.full(matrix.shape[0], METHODS.index('ses'))
+    methods[lengths < SEASON] = METHODS.index('ma')
+    methods[lengths >= 2 * SEASON] = METHODS.index('snaive')
+    methods[zero_share >= INTERMITTENT_SHARE] = METHODS.index('sba')
+    return methods
+
+
+def needs_arima(matrix):
+    """
+    Определяет, для каких строк стоит запускать auto_arima вместо быстрых методов.
+
+    :param matrix: Матрица товары x кварталы
+    :return: Булев массив
+    """
+    if FORECAST_ENGINE == 'arima':
+        return np.ones(matrix.shape[0], dtype=bool)
+    if FORECAST_ENGINE == 'fast':
+        return np.zeros(matrix.shape[0], dtype=bool)
+    lengths, zero_share = series_stats(matrix)
+    return (lengths >= ARIMA_MIN_QUARTERS) & (zero_share < INTERMITTENT_SHARE)
+
+
+def fast_forecast(matrix, horizon):
+    """
+    Прогнозирует все строки матрицы за один проход, выбирая метод для каждой строки.
+
+    :param matrix: Матрица товары x кварталы (NaN считаются нулями)
+    :param horizon: Количество прогнозируемых кварталов
+    :return: Матрица прогнозов товары x horizon и массив названий выбранных методов
+    """
+    matrix = np.nan_to_num(np.asarray(matrix, dtype='float64'))
+    forecasts = np.stack([
+        seasonal_naive(matrix, horizon),
+        moving_average(matrix, horizon),
+        simple_exponential_smoothing(matrix, horizon),
+        croston_sba(matrix, horizon),
+    ])
+    methods = choose_methods(matrix)
+    forecast = forecasts[methods, np.arange(matrix.shape[0])]
+    return np.round(np.clip(forecast, 0, None)), np.array(METHODS)[methods]
+
+
+def purchase_matrix(months, forecast):
+    """
+    Векторный аналог forcaster.purchase: потребление за months месяцев для каждой строки.
+
+    :param months: Количество месяцев
+    :param forecast: Матрица квартальных прогнозов
+    :return: Массив сумм
+    """
+    full = months // 3
+    total = forecast[:, :full].sum(axis=1)
+    if months % 3:
+        total = total + forecast[:, full] * (months % 3) / 3
+    return total
+
+
+def build_matrix(series, dates):
+    """
+    Строит матрицу товары x кварталы из результата aggregate_all_data.
+
+    :param series: Словарь {название: {(квартал, год): сумма}}
+    :param dates: Даты отчетных периодов в формате YYYY-MM-DD
+    :return: Список названий, отсортированный список дат и матрица
+    """
+    dates = sorted(dates)
+    column = {date: i for i, date in enumerate(dates)}
+    names = list(series)
+    matrix = np.zeros((len(names), len(dates)))
+    for row, name in enumerate(names):
+        for (quarter, year), value in series[name].items():
+            matrix[row, column[make_datetime(quarter, year).strftime('%Y-%m-%d')]] = value
+    return names, dates, matrix
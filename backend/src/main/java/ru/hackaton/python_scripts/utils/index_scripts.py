@@ -0,0 +1,54 @@
+from pymongo import ASCENDING, IndexModel
+
+from utils.mongo_scripts import get_database
+
+# Индексы под запросы скриптов. Имена индексов стандартные (name_1_год_1_квартал_1 и т.д.),
+# поэтому повторный запуск ничего не меняет, а индекс, уже созданный вручную с тем же ключом,
+# считается тем же индексом.
+INDEXES = {
+    # fetch_quarterly ($match по name, группировка по кварталам) и поиск цены в json_maker:
+    # _id в конце ключа покрывает сортировку price_scripts.LATEST_SORT без сортировки в памяти
+    'Оборотная ведомость': [
+        IndexModel([('name', ASCENDING), ('год', ASCENDING), ('квартал', ASCENDING), ('_id', ASCENDING)]),
+    ],
+    # Остатки товара в make_forecast
+    'Складские остатки': [
+        IndexModel([('Название', ASCENDING), ('Дата', ASCENDING)]),
+    ],
+    # Карточка СТЕ в json_maker
+    'Справочники': [
+        IndexModel([('Название СТЕ', ASCENDING)]),
+    ],
+    # Upsert-ы реестра имен и пакетного прогноза по name
+    'Нормализированные имена': [
+        IndexModel([('name', ASCENDING)], unique=True),
+    ],
+    'Прогнозы': [
+        IndexModel([('name', ASCENDING)], unique=True),
+    ],
+}
+
+
+def ensure_indexes(database=None):
+    """
+    Создает недостающие индексы из INDEXES. Существующие индексы не пересоздаются.
+
+    :param database: База данных, по умолчанию stock_remainings
+    :return: Словарь {коллекция: [имена индексов]}
+    """
+    database = database if database is not None else get_database()
+    return {collection: database[collection].create_indexes(indexes) for collection, indexes in INDEXES.items()}
+
+
+def drop_provisioned_indexes(database=None):
+    """
+    Удаляет индексы из INDEXES (для сравнения планов запросов с индексами и без).
+
+    :param database: База данных, по умолчанию stock_remainings
+    """
+    database = database if database is not None else get_database()
+    for collection, indexes in INDEXES.items():
+        existing = database[collection].index_information()
+        for index in indexes:
+            if index.document['name'] in existing:
+                database[collection].drop_index(index.document['name'])
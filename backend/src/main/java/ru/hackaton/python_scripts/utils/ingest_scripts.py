@@ -0,0 +1,102 @@
+import glob
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import islice
+from os import getenv
+from time import perf_counter
+
+from utils.bucket_scripts import update_buckets
+from utils.calendar_scripts import add_report_period
+from utils.columnar_scripts import columnar_ready, refresh_columnar
+from utils.mongo_scripts import get_collection
+from utils.name_scripts import name_registry
+from utils.price_scripts import update_price_cache
+from utils.stock_scripts import update_stock_snapshot
+from utils.workbook_scripts import quarter_year, read_stock, read_turnovers
+
+# Пакетная загрузка выгрузок из dataset/ в обход TurnoversParser и StockRemainingsParser:
+# книги читаются потоком строк, документы пишутся insert_many(ordered=False) пачками,
+# файлы обрабатываются параллельно по ядрам. Производные коллекции (календарь отчетных
+# периодов, "Обороты по товарам", "Последние цены", "Последние остатки") обновляются так же,
+# как при загрузке из Java.
+
+# Сколько документов отправляется в базу одним insert_many
+INGEST_CHUNK_SIZE = int(getenv('INGEST_CHUNK_SIZE', '5000'))
+
+# Вид выгрузки -> (папка в dataset/, коллекция, чтение книги, обновления производных коллекций)
+SOURCES = {
+    'turnovers': ('Обороты по счету', 'Оборотная ведомость', read_turnovers, (update_buckets, update_price_cache)),
+    'stock': ('Складские остатки', 'Складские остатки', read_stock, (update_stock_snapshot,)),
+}
+
+
+def dataset_files(dataset_dir, kinds=None):
+    """
+    :param dataset_dir: Папка dataset/
+    :param kinds: Виды выгрузок ('turnovers', 'stock'), по умолчанию все
+    :return: Список (вид, путь к книге)
+    """
+    return [(kind, path) for kind in (kinds or list(SOURCES))
+            for path in sorted(glob.glob(os.path.join(dataset_dir, SOURCES[kind][0], '*.xlsx')))]
+
+
+def chunks(documents, size):
+    documents = iter(documents)
+    while True:
+        chunk = list(islice(documents, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def ingest_file(kind, path, chunk_size=INGEST_CHUNK_SIZE):
+    """
+    Загружает одну книгу.
+
+    :param kind: Вид выгрузки ('turnovers' или 'stock')
+    :param path: Путь к книге
+    :param chunk_size: Документов в одном insert_many
+    :return: Количество документов и время загрузки в секундах
+    """
+    start = perf_counter()
+    _, collection_name, read, derived_updates = SOURCES[kind]
+    collection = get_collection(collection_name)
+    rows = 0
+    for chunk in chunks(read(path), chunk_size):
+        if kind == 'stock':
+            for doc in chunk:
+                name_registry.register(doc['полное название'], doc['Название'])
+        collection.insert_many(chunk, ordered=False)
+        for update_derived in derived_updates:
+            update_derived(chunk)
+        rows += len(chunk)
+    if kind == 'turnovers':
+        add_report_period(*quarter_year(os.path.basename(path)))
+    name_registry.flush()
+    return rows, perf_counter() - start
+
+
+def ingest(files, chunk_size=INGEST_CHUNK_SIZE, workers=None, progress=None):
+    """
+    Загружает книги параллельно по процессам.
+
+    :param files: Список (вид, путь к книге), например из dataset_files
+    :param chunk_size: Документов в одном insert_many
+    :param workers: Количество процессов, по умолчанию по числу ядер
+    :param progress: Вызывается после каждой книги с (вид, путь, документов, секунд)
+    :return: Словарь {вид: документов}
+    """
+    totals = {kind: 0 for kind, _ in files}
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        futures = {executor.submit(ingest_file, kind, path, chunk_size): (kind, path) for kind, path in files}
+        for future in as_completed(futures):
+            kind, path = futures[future]
+            rows, seconds = future.result()
+            totals[kind] += rows
+            if progress is not None:
+                progress(kind, path, rows, seconds)
+    # Колоночная копия дописывается так же, как после загрузки через контроллеры
+    for kind in totals:
+        if columnar_ready(kind):
+            refresh_columnar(kind)
+    return totals
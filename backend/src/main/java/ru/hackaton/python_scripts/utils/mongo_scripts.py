@@ -0,0 +1,81 @@
+import atexit
+import os
+import threading
+from os import getenv
+
+from pymongo import MongoClient
+
+# Один MongoClient на процесс. У клиента собственный пул соединений и фоновые потоки мониторинга,
+# поэтому создавать его на каждый запрос дорого: каждый новый клиент заново проходит handshake.
+# Клиент создается при первом обращении и пересоздается в дочерних процессах после fork.
+
+MONGO_URL = "mongodb://localhost:27017"
+DB_NAME = "stock_remainings"
+MONGO_MAX_POOL_SIZE = int(getenv('MONGO_MAX_POOL_SIZE', '10'))
+MONGO_MIN_POOL_SIZE = int(getenv('MONGO_MIN_POOL_SIZE', '0'))
+MONGO_CONNECT_TIMEOUT_MS = int(getenv('MONGO_CONNECT_TIMEOUT_MS', '5000'))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(getenv('MONGO_SERVER_SELECTION_TIMEOUT_MS', '5000'))
+MONGO_SOCKET_TIMEOUT_MS = int(getenv('MONGO_SOCKET_TIMEOUT_MS', '120000'))
+
+_client = None
+_client_pid = None
+_lock = threading.Lock()
+
+
+def get_client():
+    """
+    Возвращает общий клиент MongoDB процесса, создавая его при первом вызове.
+
+    :return: MongoClient
+    """
+    global _client, _client_pid
+    if _client is None or _client_pid != os.getpid():
+        with _lock:
+            if _client is None or _client_pid != os.getpid():
+                _client = MongoClient(MONGO_URL,
+                                      maxPoolSize=MONGO_MAX_POOL_SIZE,
+                                      minPoolSize=MONGO_MIN_POOL_SIZE,
+                                      connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+                                      serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+                                      socketTimeoutMS=MONGO_SOCKET_TIMEOUT_MS,
+                                      connect=False)
+                _client_pid = os.getpid()
+    return _client
+
+
+def get_database():
+    """
+    :return: База данных DB_NAME
+    """
+    return get_client()[DB_NAME]
+
+
+def get_collection(collection_name):
+    """
+    :param collection_name: Название коллекции
+    :return: Коллекция базы DB_NAME
+    """
+    return get_database()[collection_name]
+
+
+def close_client():
+    """
+    Закрывает общий клиент процесса. Следующее обращение создаст новый.
+    """
+    global _client, _client_pid
+    with _lock:
+        if _client is not None and _client_pid == os.getpid():
+            _client.close()
+        _client, _client_pid = None, None
+
+
+def _forget_after_fork():
+    # Клиент родителя нельзя использовать и закрывать в дочернем процессе: его сокеты и потоки
+    # принадлежат родителю. Дочерний процесс просто создаст свой клиент при первом обращении.
+    global _client, _client_pid, _lock
+    _client, _client_pid = None, None
+    _lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_forget_after_fork)
+atexit.register(close_client)
@@ -0,0 +1,79 @@
+import matplotlib
+
+matplotlib.use('Agg')
+
+import numpy as np
+from matplotlib import colormaps
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from matplotlib.font_manager import FontProperties
+
+# Отрисовка столбчатых графиков через matplotlib. Шрифты и палитра создаются один раз на процесс,
+# фигура переиспользуется между вызовами и не регистрируется в pyplot, поэтому память не растет.
+
+FIGSIZE = (8, 7)
+VALUE_FONT = FontProperties(family='serif', style='italic', size=10)
+XTICK_FONT = FontProperties(family='serif', style='italic', size=10)
+YTICK_FONT = FontProperties(family='serif', style='italic', size=12)
+LABEL_FONT = FontProperties(family='serif', style='italic', size=14)
+TITLE_FONT = FontProperties(family='serif', style='italic', size=16)
+PALETTE = colormaps['Reds']
+
+_figure = None
+
+
+def get_figure():
+    """
+    Возвращает переиспользуемую фигуру процесса, очищенную от предыдущего графика.
+
+    :return: Фигура matplotlib
+    """
+    global _figure
+    if _figure is None:
+        _figure = Figure(figsize=FIGSIZE)
+        FigureCanvasAgg(_figure)
+    _figure.clear()
+    return _figure
+
+
+def palette(n_colors):
+    """
+    Палитра Reds из n_colors цветов, как seaborn.color_palette('Reds', n_colors).
+
+    :param n_colors: Количество цветов
+    :return: Массив RGBA цветов
+    """
+    return PALETTE(np.linspace(0, 1, n_colors + 2)[1:-1])
+
+
+def render_bar_chart(labels, values, title, ylabel, target, xlabel='Дата'):
+    """
+    Рисует столбчатый график с подписями значений и сохраняет его в PNG.
+
+    :param labels: Подписи столбцов (даты)
+    :param values: Высоты столбцов
+    :param title: Заголовок графика
+    :param ylabel: Подпись оси Y
+    :param target: Путь к файлу или файловый объект
+    :param xlabel: Подпись оси X
+    """
+    values = np.nan_to_num(np.asarray(values, dtype='float64'))
+    positions = np.arange(len(values))
+
+    fig = get_figure()
+    ax = fig.add_subplot()
+    ax.bar(positions, values, width=0.8, color=palette(len(values)))
+    if len(values) == 1:
+        ax.set_xlim(-2, 2)
+    for position, value in zip(positions, values):
+        ax.text(position, value, f'{value:.2f}', ha='center', va='bottom', fontproperties=VALUE_FONT)
+
+    ax.set_xticks(positions)
+    ax.set_xticklabels(labels, rotation=45, ha='center', fontproperties=XTICK_FONT)
+    for label in ax.get_yticklabels():
+        label.set_fontproperties(YTICK_FONT)
+    ax.set_xlabel(xlabel, fontproperties=LABEL_FONT)
+    ax.set_ylabel(ylabel, ha='center', fontproperties=LABEL_FONT)
+    ax.set_title(title, fontproperties=TITLE_FONT)
+
+    fig.savefig(target, format='png')
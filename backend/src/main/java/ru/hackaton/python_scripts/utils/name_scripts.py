@@ -0,0 +1,154 @@
+import logging
+import os
+import threading
+from os import getenv
+
+from pymongo import DeleteMany, UpdateOne
+from pymongo.errors import OperationFailure
+
+from utils.mongo_scripts import get_collection
+
+# Реестр нормализованных имен товаров ("Нормализированные имена"). Запросы на чтение только
+# запоминают имя в памяти процесса; запись в базу идет пачкой upsert-ов в фоновом потоке
+# (или явным flush при загрузке данных), поэтому прогноз и остатки не пишут в базу.
+# Буфер сбрасывается только долгоживущими процессами: воркерами пула (по таймеру и при остановке)
+# и загрузкой данных. Разовый запуск скрипта без пула при выходе ничего не пишет.
+
+NAMES_COLLECTION = 'Нормализированные имена'
+# Как часто фоновый поток сбрасывает накопленные имена в базу, секунды
+NAME_FLUSH_SECONDS = float(getenv('NAME_FLUSH_SECONDS', '30'))
+# Сколько имен хранится в буфере, пока база недоступна; более старые отбрасываются
+NAME_MAX_PENDING = int(getenv('NAME_MAX_PENDING', '10000'))
+
+log = logging.getLogger(__name__)
+
+
+def dedupe_names(collection):
+    """
+    Удаляет повторы name, оставляя первый документ, чтобы можно было построить уникальный индекс.
+
+    :param collection: Коллекция "Нормализированные имена"
+    :return: Количество удаленных документов
+    """
+    pipeline = [
+        {'$group': {'_id': '$name', 'ids': {'$push': '$_id'}, 'count': {'$sum': 1}}},
+        {'$match': {'count': {'$gt': 1}}},
+    ]
+    operations = [DeleteMany({'_id': {'$in': doc['ids'][1:]}})
+                  for doc in collection.aggregate(pipeline, allowDiskUse=True)]
+    if not operations:
+        return 0
+    return collection.bulk_write(operations, ordered=False).deleted_count
+
+
+class NameRegistry:
+    """
+    Буфер имен для "Нормализированные имена".
+
+    Уже встречавшиеся в процессе имена повторно не записываются. Новые копятся в буфере
+    и записываются одним bulk_write с UpdateOne(upsert=True), так что повторная запись
+    того же имени из другого процесса ничего не меняет. Уникальность name обеспечивает индекс.
+    """
+
+    def __init__(self, flush_interval, max_pending):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._seen = set()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._timer = None
+        self._index_ready = False
+
+    def register(self, name, normalized_name):
+        """
+        Запоминает имя для записи в базу. Обращений к базе не делает.
+
+        :param name: Имя в исходном виде
+        :param normalized_name: Нормализованное имя
+        """
+        if name in self._seen:
+            return
+        with self._lock:
+            self._seen.add(name)
+            self._pending[name] = normalized_name
+            self._schedule()
+
+    def _schedule(self):
+        # Вызывается под self._lock
+        if self._timer is None and self.flush_interval > 0:
+            self._timer = threading.Timer(self.flush_interval, self.try_flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _ensure_index(self, collection):
+        try:
+            collection.create_index('name', unique=True)
+        except OperationFailure as e:
+            # В старых базах имена могли записываться повторно: убираем повторы и строим индекс снова
+            log.warning('Не удалось построить уникальный индекс "%s": %s', NAMES_COLLECTION, e)
+            log.warning('Удалено повторов имен: %s', dedupe_names(collection))
+            try:
+                collection.create_index('name', unique=True)
+            except OperationFailure:
+                # Без индекса upsert-ы продолжают работать, только без гарантии уникальности
+                log.exception('Уникальный индекс "%s" не построен', NAMES_COLLECTION)
+        self._index_ready = True
+
+    def flush(self):
+        """
+        Записывает накопленные имена в базу одним запросом.
+
+        :return: Количество записанных имен
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._timer = None
+        if not pending:
+            return 0
+        try:
+            collection = get_collection(NAMES_COLLECTION)
+            if not self._index_ready:
+                self._ensure_index(collection)
+            collection.bulk_write([
+                UpdateOne({'name': name}, {'$setOnInsert': {'normalized_name': normalized_name}}, upsert=True)
+                for name, normalized_name in pending.items()
+            ], ordered=False)
+        except Exception:
+            # Возвращаем имена в буфер, они уйдут при следующем сбросе
+            with self._lock:
+                pending.update(self._pending)
+                overflow = len(pending) - self.max_pending
+                if overflow > 0:
+                    # База долго недоступна: отбрасываем самые старые имена, чтобы буфер не рос без предела.
+                    # Из _seen они тоже убираются и будут записаны, когда встретятся снова
+                    for name in list(pending)[:overflow]:
+                        del pending[name]
+                        self._seen.discard(name)
+                    log.warning('Буфер имен переполнен, отброшено %s имен', overflow)
+                self._pending = pending
+            raise
+        return len(pending)
+
+    def try_flush(self):
+        """
+        Сбрасывает буфер, не пробрасывая ошибки базы (для фонового потока и остановки воркера).
+        """
+        try:
+            self.flush()
+        except Exception:
+            # Имена не нужны для ответа на запрос, ошибку базы только записываем в лог
+            # и повторяем сброс через flush_interval
+            log.exception('Не удалось записать имена в "%s"', NAMES_COLLECTION)
+            with self._lock:
+                if self._pending:
+                    self._schedule()
+
+    def _after_fork(self):
+        # Таймер родителя в дочернем процессе не работает, а блокировка могла остаться захваченной
+        self._lock = threading.Lock()
+        self._timer = None
+        self._pending = {}
+
+
+name_registry = NameRegistry(NAME_FLUSH_SECONDS, NAME_MAX_PENDING)
+os.register_at_fork(after_in_child=name_registry._after_fork)
@@ -0,0 +1,180 @@
+import math
+import os
+from importlib.util import find_spec
+from os import getenv
+
+from PIL import Image, ImageDraw, ImageFont
+
+# Отрисовка столбчатых графиков через Pillow без импорта matplotlib. Разметка повторяет
+# графики mpl_plot_scripts: фигура 8x7 дюймов при 100 dpi, поля осей matplotlib по умолчанию,
+# палитра Reds, курсивный шрифт с засечками.
+
+DPI = 100
+WIDTH, HEIGHT = 8 * DPI, 7 * DPI
+# Границы области осей в долях фигуры, как subplotpars matplotlib
+AXES_LEFT, AXES_RIGHT, AXES_BOTTOM, AXES_TOP = 0.125, 0.9, 0.11, 0.88
+TICK_LENGTH = 5
+TICK_PAD = 5
+# Опорные цвета палитры Reds (ColorBrewer), между ними цвет интерполируется линейно
+REDS = ((255, 245, 240), (254, 224, 210), (252, 187, 161), (252, 146, 114), (251, 106, 74),
+        (239, 59, 44), (203, 24, 29), (165, 15, 21), (103, 0, 13))
+FONT_NAME = 'DejaVuSerif-Italic.ttf'
+
+_fonts = {}
+
+
+def font_path():
+    """
+    Ищет курсивный шрифт с засечками: переменная CHART_FONT, системный DejaVu или шрифт из пакета matplotlib.
+    Сам matplotlib при этом не импортируется.
+
+    :return: Путь к файлу шрифта или None
+    """
+    candidates = [getenv('CHART_FONT'), os.path.join('/usr/share/fonts/truetype/dejavu', FONT_NAME)]
+    spec = find_spec('matplotlib')
+    if spec is not None and spec.origin:
+        candidates.append(os.path.join(os.path.dirname(spec.origin), 'mpl-data', 'fonts', 'ttf', FONT_NAME))
+    for path in candidates:
+        if path and os.path.exists(path):
+            return path
+    return None
+
+
+def get_font(size):
+    """
+    Возвращает шрифт заданного размера в пунктах, загружая каждый размер один раз на процесс.
+
+    :param size: Размер шрифта в пунктах
+    :return: Шрифт Pillow
+    """
+    if size not in _fonts:
+        pixels = round(size * DPI / 72)
+        path = font_path()
+        _fonts[size] = ImageFont.truetype(path, pixels) if path else ImageFont.load_default(pixels)
+    return _fonts[size]
+
+
+def palette(n_colors):
+    """
+    Палитра Reds из n_colors цветов, как seaborn.color_palette('Reds', n_colors).
+
+    :param n_colors: Количество цветов
+    :return: Список RGB цветов
+    """
+    colors = []
+    for i in range(1, n_colors + 1):
+        position = i / (n_colors + 1) * (len(REDS) - 1)
+        low = min(int(position), len(REDS) - 2)
+        share = position - low
+        colors.append(tuple(round(a + (b - a) * share) for a, b in zip(REDS[low], REDS[low + 1])))
+    return colors
+
+
+def nice_ticks(low, high, max_ticks=9):
+    """
+    Подбирает деления оси с шагом 1, 2, 2.5 или 5, умноженным на степень десяти.
+
+    :param low: Нижняя граница оси
+    :param high: Верхняя граница оси
+    :return: Список значений делений
+    """
+    raw_step = (high - low) / max_ticks
+    magnitude = 10 ** math.floor(math.log10(raw_step))
+    step = next(m * magnitude for m in (1, 2, 2.5, 5, 10) if m * magnitude >= raw_step)
+    first = math.ceil(low / step - 1e-9)
+    return [i * step for i in range(first, int(math.floor(high / step + 1e-9)) + 1)]
+
+
+def tick_label(value):
+    return f'{value:g}' if abs(value) < 1e6 else f'{value:.1e}'
+
+
+def text_size(draw, text, font):
+    left, top, right, bottom = draw.textbbox((0, 0), text, font=font)
+    return right - left, bottom - top, left, top
+
+
+def draw_text(draw, xy, text, font, anchor):
+    draw.text(xy, text, font=font, fill='black', anchor=anchor)
+
+
+def rotated_text(text, font, angle):
+    """
+    Рисует текст на прозрачном слое и поворачивает его.
+
+    :return: Изображение RGBA с повернутым текстом
+    """
+    probe = ImageDraw.Draw(Image.new('L', (1, 1)))
+    width, height, left, top = text_size(probe, text, font)
+    layer = Image.new('RGBA', (width + 2, height + 2), (255, 255, 255, 0))
+    ImageDraw.Draw(layer).text((1 - left, 1 - top), text, font=font, fill='black')
+    return layer.rotate(angle, expand=True, resample=Image.BICUBIC)
+
+
+def render_bar_chart(labels, values, title, ylabel, target, xlabel='Дата'):
+    """
+    Рисует столбчатый график с подписями значений и сохраняет его в PNG.
+
+    :param labels: Подписи столбцов (даты)
+    :param values: Высоты столбцов
+    :param title: Заголовок графика
+    :param ylabel: Подпись оси Y
+    :param target: Путь к файлу или файловый объект
+    :param xlabel: Подпись оси X
+    """
+    labels = [str(label) for label in labels]
+    values = [0. if value != value else float(value) for value in values]
+
+    image = Image.new('RGB', (WIDTH, HEIGHT), 'white')
+    draw = ImageDraw.Draw(image)
+    left, right = AXES_LEFT * WIDTH, AXES_RIGHT * WIDTH
+    top, bottom = (1 - AXES_TOP) * HEIGHT, (1 - AXES_BOTTOM) * HEIGHT
+
+    # Пределы осей как у matplotlib: 5% запаса, столбцы "прилипают" к нулю
+    low, high = min(values + [0.]), max(values + [0.])
+    span = (high - low) or 1.
+    y_low = low - 0.05 * span if low < 0 else 0.
+    y_high = high + 0.05 * span if high > 0 or low == high else 0.
+    if len(values) == 1:
+        x_low, x_high = -2., 2.
+    else:
+        x_low, x_high = -0.4 - 0.05 * (len(values) - 0.2), len(values) - 0.6 + 0.05 * (len(values) - 0.2)
+
+    def to_x(x):
+        return left + (x - x_low) / (x_high - x_low) * (right - left)
+
+    def to_y(y):
+        return bottom - (y - y_low) / (y_high - y_low) * (bottom - top)
+
+    value_font, xtick_font, ytick_font = get_font(10), get_font(10), get_font(12)
+    for position, (value, color) in enumerate(zip(values, palette(len(values)))):
+        x0, x1 = to_x(position - 0.4), to_x(position + 0.4)
+        y0, y1 = sorted((to_y(0.), to_y(value)))
+        draw.rectangle((round(x0), round(y0), round(x1) - 1, round(y1)), fill=color)
+        draw_text(draw, (to_x(position), to_y(value) - 1), f'{value:.2f}', value_font, 'mb')
+    draw.rectangle((round(left), round(top), round(right), round(bottom)), outline='black')
+
+    ytick_width = 0
+    for tick in nice_ticks(y_low, y_high):
+        y = round(to_y(tick))
+        draw.line((left - TICK_LENGTH, y, left, y), fill='black')
+        text = tick_label(tick)
+        ytick_width = max(ytick_width, text_size(draw, text, ytick_font)[0])
+        draw_text(draw, (left - TICK_LENGTH - TICK_PAD, y), text, ytick_font, 'rm')
+
+    xtick_height = 0
+    for position, label in enumerate(labels):
+        x = round(to_x(position))
+        draw.line((x, bottom, x, bottom + TICK_LENGTH), fill='black')
+        layer = rotated_text(label, xtick_font, 45)
+        image.paste(layer, (x - layer.width // 2, round(bottom) + TICK_LENGTH + TICK_PAD), layer)
+        xtick_height = max(xtick_height, layer.height)
+
+    label_font = get_font(14)
+    draw_text(draw, ((left + right) / 2, bottom + TICK_LENGTH + TICK_PAD + xtick_height + 4), xlabel, label_font, 'mt')
+    layer = rotated_text(ylabel, label_font, 90)
+    image.paste(layer, (round(left - TICK_LENGTH - TICK_PAD - ytick_width - 8 - layer.width),
+                        round((top + bottom - layer.height) / 2)), layer)
+    draw_text(draw, ((left + right) / 2, top - 8), title, get_font(16), 'mb')
+
+    image.save(target, format='PNG')
@@ -0,0 +1,109 @@
+import base64
+from collections import OrderedDict
+from importlib import import_module
+from io import BytesIO
+from os import getenv
+
+from utils.cache_scripts import chart_cache
+
+# Общий модуль графиков: выбор движка отрисовки, кеш PNG на диске и в памяти, формат ответа скриптов.
+# Движок импортируется при первой отрисовке, поэтому ответ из кеша не загружает matplotlib.
+
+# Увеличивается при изменении оформления, чтобы не отдавать из кеша графики в старом стиле
+CHART_STYLE_VERSION = 1
+# Движок отрисовки: matplotlib или pillow (не импортирует matplotlib, заметно быстрее на холодном старте)
+CHART_RENDERER = getenv('CHART_RENDERER', 'matplotlib')
+RENDERERS = {
+    'matplotlib': 'utils.mpl_plot_scripts',
+    'pillow': 'utils.pil_plot_scripts',
+}
+# Сколько PNG хранить в памяти процесса для ответов без записи на диск
+CHART_MEMORY_SIZE = int(getenv('CHART_MEMORY_SIZE', '64'))
+
+_chart_bytes = OrderedDict()
+
+
+def render_bar_chart(labels, values, title, ylabel, target, xlabel='Дата'):
+    """
+    Рисует столбчатый график движком CHART_RENDERER и сохраняет его в PNG.
+
+    :param labels: Подписи столбцов (даты)
+    :param values: Высоты столбцов
+    :param title: Заголовок графика
+    :param ylabel: Подпись оси Y
+    :param target: Путь к файлу или файловый объект
+    :param xlabel: Подпись оси X
+    """
+    if CHART_RENDERER not in RENDERERS:
+        raise ValueError(f'Неизвестный движок отрисовки CHART_RENDERER={CHART_RENDERER}, '
+                         f'доступны: {", ".join(RENDERERS)}')
+    import_module(RENDERERS[CHART_RENDERER]).render_bar_chart(labels, values, title, ylabel, target, xlabel)
+
+
+def chart_key(kind, labels, values, title, ylabel, xlabel, horizon):
+    """
+    Приводит данные графика к простым типам и считает ключ кеша.
+
+    :return: Ключ, подписи и значения столбцов
+    """
+    labels = [str(label) for label in labels]
+    values = [0. if value != value else float(value) for value in values]
+    key = chart_cache.key(CHART_STYLE_VERSION, CHART_RENDERER, kind, labels, values, title, ylabel, xlabel, horizon)
+    return key, labels, values
+
+
+def cached_bar_chart(kind, labels, values, title, ylabel, xlabel='Дата', horizon=None):
+    """
+    Возвращает путь к столбчатому графику из кеша, отрисовывая его только для новых данных.
+
+    :param kind: Тип графика (remainings, known_consume, forecast, ...)
+    :param labels: Подписи столбцов (даты)
+    :param values: Высоты столбцов
+    :param title: Заголовок графика
+    :param ylabel: Подпись оси Y
+    :param xlabel: Подпись оси X
+    :param horizon: Горизонт прогноза в месяцах, если график относится к прогнозу
+    :return: Путь к PNG-файлу
+    """
+    key, labels, values = chart_key(kind, labels, values, title, ylabel, xlabel, horizon)
+    return chart_cache.get_or_render(key, lambda path: render_bar_chart(labels, values, title, ylabel, path, xlabel))
+
+
+def bar_chart_bytes(kind, labels, values, title, ylabel, xlabel='Дата', horizon=None):
+    """
+    Рисует столбчатый график в память и возвращает PNG без записи на диск.
+    Последние графики хранятся в памяти процесса, поэтому воркер пула не перерисовывает их повторно.
+
+    :param kind: Тип графика (remainings, known_consume, forecast, ...)
+    :param labels: Подписи столбцов (даты)
+    :param values: Высоты столбцов
+    :param title: Заголовок графика
+    :param ylabel: Подпись оси Y
+    :param xlabel: Подпись оси X
+    :param horizon: Горизонт прогноза в месяцах, если график относится к прогнозу
+    :return: Содержимое PNG
+    """
+    key, labels, values = chart_key(kind, labels, values, title, ylabel, xlabel, horizon)
+    if key in _chart_bytes:
+        _chart_bytes.move_to_end(key)
+        return _chart_bytes[key]
+    buffer = BytesIO()
+    render_bar_chart(labels, values, title, ylabel, buffer, xlabel)
+    _chart_bytes[key] = buffer.getvalue()
+    while len(_chart_bytes) > CHART_MEMORY_SIZE:
+        _chart_bytes.popitem(last=False)
+    return _chart_bytes[key]
+
+
+def chart_response(message, charts, inline):
+    """
+    Собирает ответ скрипта с графиками.
+
+    :param message: Текст ответа
+    :param charts: Пути к файлам графиков или содержимое PNG
+    :param inline: True, если charts содержат PNG, которые нужно вернуть в ответе
+    :return: Словарь с сообщением и PNG в base64 или строка с путями к файлам по одному на строке
+    """
+    if inline:
+        return {'message': message, 'images': [base64.b64encode(chart).decode('ascii') for chart in charts]}
+    return '\n'.join([message] + charts)
@@ -0,0 +1,121 @@
+from datetime import datetime
+from os import getenv
+
+from pymongo import UpdateOne
+
+from utils.mongo_scripts import get_collection
+
+# Цены товаров из оборотной ведомости для JSON закупки: по каждому товару берется строка
+# за последний загруженный квартал (год, затем квартал по убыванию). Если построен кеш
+# "Последние цены" (один документ {'_id': название, 'q': год * 10 + квартал, цены...} на товар),
+# цена читается из него по _id. Кеш обновляется при загрузке оборотов, но используется только
+# после сборки командой maintenance.py prices: до нее в нем нет товаров, загруженных раньше.
+
+TURNOVER_COLLECTION = 'Оборотная ведомость'
+PRICE_COLLECTION = 'Последние цены'
+# Поля строки оборотной ведомости, нужные для цены и единицы измерения
+PRICE_FIELDS = ('цена до', 'цена после', 'цена кредит во', 'цена дебет во', 'единица измерения')
+# Читать цены из кеша, если он построен (0 - всегда из оборотной ведомости)
+PRICE_CACHE = getenv('PRICE_CACHE', '1') == '1'
+# _id отметки о сборке кеша; нормализованные названия не содержат пробелов, поэтому не совпадут с ней
+BUILT_ID = 'cache built'
+# Год и квартал хранятся строками из цифр (год из 4 цифр, квартал из одной), поэтому
+# сортировка строк совпадает с числовой и идет по индексу (name, год, квартал, _id) в обратном порядке
+LATEST_SORT = [('год', -1), ('квартал', -1), ('_id', -1)]
+
+_cache = {'ready': False}
+
+
+def price_update(document):
+    """
+    Операция обновления кеша для одной строки оборотной ведомости.
+
+    :param document: Документ "Оборотная ведомость"
+    :return: UpdateOne для bulk_write
+    """
+    key = int(document['год']) * 10 + int(document['квартал'])
+    # Строка за более поздний (или тот же) квартал заменяет сохраненную, как при сортировке LATEST_SORT
+    newer = {'$gte': [key, {'$ifNull': ['$q', key]}]}
+    fields = {field: {'$cond': [newer, {'$literal': document.get(field)}, '$' + field]} for field in PRICE_FIELDS}
+    return UpdateOne({'_id': document['name']}, [{'$set': {**fields, 'q': {'$cond': [newer, key, '$q']}}}],
+                     upsert=True)
+
+
+def update_price_cache(documents):
+    """
+    Обновляет кеш цен по загруженным строкам оборотной ведомости.
+
+    :param documents: Документы "Оборотная ведомость"
+    :return: Количество строк
+    """
+    operations = [price_update(doc) for doc in documents if doc.get('год') and doc.get('квартал')]
+    if operations:
+        # Порядок важен: из строк одного квартала остается последняя
+        get_collection(PRICE_COLLECTION).bulk_write(operations, ordered=True)
+    return len(operations)
+
+
+def rebuild_price_cache():
+    """
+    Пересобирает кеш цен по всей оборотной ведомости.
+
+    :return: Количество товаров
+    """
+    pipeline = [
+        {'$project': {'name': 1, **{field: 1 for field in PRICE_FIELDS},
+                      'q': {'$add': [{'$multiply': [{'$toInt': '$год'}, 10]}, {'$toInt': '$квартал'}]}}},
+        {'$sort': {'q': 1, '_id': 1}},
+        {'$group': {'_id': '$name', 'q': {'$last': '$q'}, **{field: {'$last': '$' + field} for field in PRICE_FIELDS}}},
+        {'$out': PRICE_COLLECTION},
+    ]
+    get_collection(TURNOVER_COLLECTION).aggregate(pipeline, allowDiskUse=True)
+    collection = get_collection(PRICE_COLLECTION)
+    count = collection.estimated_document_count()
+    collection.insert_one({'_id': BUILT_ID, 'built_at': datetime.now()})
+    _cache['ready'] = True
+    return count
+
+
+def price_cache_ready():
+    """
+    :return: True, если кеш цен включен и собран командой maintenance.py prices
+    """
+    if not PRICE_CACHE:
+        return False
+    if not _cache['ready']:
+        _cache['ready'] = get_collection(PRICE_COLLECTION).find_one({'_id': BUILT_ID}, {'_id': 1}) is not None
+    return _cache['ready']
+
+
+def latest_price(name):
+    """
+    Строка оборотной ведомости за последний квартал одним чтением: из кеша по _id
+    или запросом с сортировкой и limit 1 по индексу (name, год, квартал, _id).
+
+    :param name: Нормализованное название товара
+    :return: Документ с полями PRICE_FIELDS или None, если оборотов по товару нет
+    """
+    if price_cache_ready():
+        return get_collection(PRICE_COLLECTION).find_one({'_id': name})
+    return get_collection(TURNOVER_COLLECTION).find_one({'name': name}, {field: 1 for field in PRICE_FIELDS},
+                                                        sort=LATEST_SORT)
+
+
+def latest_prices(names):
+    """
+    Строки оборотной ведомости за последний квартал для набора товаров одним запросом.
+
+    :param names: Нормализованные названия товаров
+    :return: Словарь {название: документ с полями PRICE_FIELDS}; товаров без оборотов в нем нет
+    """
+    names = list(set(names))
+    if price_cache_ready():
+        return {doc['_id']: doc for doc in get_collection(PRICE_COLLECTION).find({'_id': {'$in': names}})}
+    pipeline = [
+        {'$match': {'name': {'$in': names}}},
+        # Все поля в одном направлении, чтобы сортировку покрыл обратный проход по индексу
+        {'$sort': {'name': -1, **dict(LATEST_SORT)}},
+        {'$group': {'_id': '$name', 'document': {'$first': '$$ROOT'}}},
+        {'$project': {f'document.{field}': 1 for field in PRICE_FIELDS}},
+    ]
+    return {doc['_id']: doc['document'] for doc in get_collection(TURNOVER_COLLECTION).aggregate(pipeline)}
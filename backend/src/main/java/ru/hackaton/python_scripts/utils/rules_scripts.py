@@ -0,0 +1,179 @@
+import os
+import re
+import threading
+from collections import namedtuple
+from os import getenv
+from time import monotonic
+
+# Правила 44-ФЗ из "Настроечные таблицы" (ограничения ПП, преимущества УИС и организациям инвалидов,
+# перечень аукционной продукции). Из каждой книги берутся листы атрибутов со списком кодов ОКПД-2
+# (колонки "Код" и "С учетом дочерних") и складываются в префиксное дерево по символам кода.
+# Иерархия ОКПД-2 совпадает с префиксами строки кода ("13.2" -> "13.20.44.120"), поэтому проверка
+# кода - один проход по его символам. Листы "Кроме ..."/"Искл..." - исключения из списка кодов
+# правила, название которого остается после удаления слова-исключения ("Искл.ОКПД-2" -> "ОКПД-2");
+# если такого списка в правиле нет, исключение действует на все списки правила.
+# Дерево перестраивается, когда меняется содержимое папки.
+
+SETTINGS_DIR = getenv('SETTINGS_DIR', '/backend/src/main/resources/Настроечные таблицы/')
+# Как часто проверять, изменилась ли папка с таблицами, секунды
+RULES_CHECK_SECONDS = float(getenv('RULES_CHECK_SECONDS', '5'))
+
+# Код из листа атрибута правила; exclude - код из листа исключений, list_name - список, к которому
+# относится код (для исключения - список, из которого оно исключает, None - все списки правила)
+RuleEntry = namedtuple('RuleEntry', ['rule_id', 'rule', 'attribute', 'code', 'with_children', 'exclude',
+                                     'list_name'])
+
+EXCLUDE_SHEET = re.compile(r'кроме|искл', re.IGNORECASE)
+EXCLUDE_WORD = re.compile(r'кроме|искл\w*\.?', re.IGNORECASE)
+END = ''
+
+_rules = {'signature': None, 'trie': {}, 'checked_at': None}
+_lock = threading.Lock()
+
+
+def directory_signature(directory):
+    """
+    :return: Имена, mtime и размеры книг в папке (None, если папки нет)
+    """
+    try:
+        return tuple(sorted((entry.name, entry.stat().st_mtime_ns, entry.stat().st_size)
+                            for entry in os.scandir(directory) if entry.is_file()))
+    except OSError:
+        return None
+
+
+def rule_info(sheet, filename):
+    """
+    :param sheet: Лист "Правило" без заголовка
+    :param filename: Имя книги, используется, если в листе нет названия
+    :return: ИД правила, название и признак активности
+    """
+    fields = {str(sheet.iat[i, 0]).strip(): sheet.iat[i, 1] for i in range(len(sheet))} if sheet.shape[1] > 1 else {}
+    title = re.search(r'"(.+)"', str(sheet.iat[0, 0]), re.DOTALL) if len(sheet) else None
+    title = ' '.join(title.group(1).split()) if title else re.sub(r'^\d+_', '', os.path.splitext(filename)[0])
+    rule_id = fields.get('ИД правила')
+    if not isinstance(rule_id, (int, float)):
+        # ИД правила - номер в начале имени книги
+        rule_id = re.match(r'\d*', filename).group() or 0
+    return int(rule_id), title, fields.get('Активность', 'Активно') == 'Активно'
+
+
+def code_rows(sheet):
+    """
+    :param sheet: Лист атрибута без заголовка
+    :return: Пары (код ОКПД-2, с учетом дочерних) или пустой список, если лист не про коды ОКПД-2
+    """
+    for i in range(len(sheet)):
+        if str(sheet.iat[i, 0]) != 'entity_id':
+            continue
+        header = [str(value) for value in sheet.iloc[i]]
+        if 'Код' not in header:
+            return []
+        code, children = header.index('Код'), header.index('С учетом дочерних') if 'С учетом дочерних' in header else None
+        return [(str(row[code]).strip(), children is None or row[children] == 'Да')
+                for row in sheet.iloc[i + 1:].itertuples(index=False) if isinstance(row[code], str)]
+    return []
+
+
+def list_key(attribute):
+    """
+    :param attribute: Название листа атрибута без "Атр-"
+    :return: Название списка без слова-исключения, пробелов по краям и регистра
+    """
+    return ' '.join(EXCLUDE_WORD.sub(' ', attribute).split()).strip(' .-').lower()
+
+
+def exclusion_target(attribute, attributes):
+    """
+    :param attribute: Название листа исключений
+    :param attributes: Названия листов-списков правила
+    :return: Список, из которого исключает лист, или None, если пары нет
+    """
+    key = list_key(attribute)
+    return next((name for name in attributes if list_key(name) == key), None)
+
+
+def read_rules(directory):
+    """
+    Читает коды ОКПД-2 всех активных правил из книг папки.
+
+    :param directory: Папка "Настроечные таблицы"
+    :return: Список RuleEntry
+    """
+    import pandas as pd
+
+    entries = []
+    for filename in sorted(os.listdir(directory)):
+        sheets = pd.read_excel(os.path.join(directory, filename), sheet_name=None, header=None, dtype=object)
+        if 'Правило' not in sheets:
+            continue
+        rule_id, rule, active = rule_info(sheets['Правило'], filename)
+        if not active:
+            continue
+        attributes = [sheet_name[len('Атр-'):] for sheet_name in sheets if sheet_name.startswith('Атр-')]
+        lists = [attribute for attribute in attributes if EXCLUDE_SHEET.search(attribute) is None]
+        for attribute in attributes:
+            exclude = EXCLUDE_SHEET.search(attribute) is not None
+            list_name = exclusion_target(attribute, lists) if exclude else attribute
+            for code, with_children in code_rows(sheets['Атр-' + attribute]):
+                entries.append(RuleEntry(rule_id, rule, attribute, code, with_children, exclude, list_name))
+    return entries
+
+
+def build_trie(entries):
+    """
+    :param entries: Список RuleEntry
+    :return: Префиксное дерево {символ: узел}, записи кода лежат в узле под ключом END
+    """
+    trie = {}
+    for entry in entries:
+        node = trie
+        for char in entry.code:
+            node = node.setdefault(char, {})
+        node.setdefault(END, []).append(entry)
+    return trie
+
+
+def get_trie():
+    now = monotonic()
+    if _rules['checked_at'] is not None and now - _rules['checked_at'] < RULES_CHECK_SECONDS:
+        return _rules['trie']
+    with _lock:
+        signature = directory_signature(SETTINGS_DIR)
+        if signature != _rules['signature']:
+            _rules['trie'] = build_trie(read_rules(SETTINGS_DIR)) if signature else {}
+            _rules['signature'] = signature
+        _rules['checked_at'] = now
+    return _rules['trie']
+
+
+def matching_entries(okpd):
+    """
+    :param okpd: Код ОКПД-2
+    :return: Записи, чей код совпадает с okpd или (с учетом дочерних) является его префиксом
+    """
+    found, node = [], get_trie()
+    code = str(okpd).strip()
+    for i, char in enumerate(code):
+        node = node.get(char)
+        if node is None:
+            break
+        last = i == len(code) - 1
+        found.extend(entry for entry in node.get(END, ()) if last or entry.with_children)
+    return found
+
+
+def matching_rules(okpd):
+    """
+    Правила, под которые попадает код ОКПД-2: код есть в списке правила и не попал в исключения
+    из этого списка.
+
+    :param okpd: Код ОКПД-2
+    :return: Список RuleEntry по одному на совпавший код, отсортированный по ИД правила
+    """
+    entries = matching_entries(okpd)
+    # (правило, список); список None - исключение из всех списков правила
+    excluded = {(entry.rule_id, entry.list_name) for entry in entries if entry.exclude}
+    kept = (entry for entry in entries if not entry.exclude
+            and (entry.rule_id, entry.list_name) not in excluded and (entry.rule_id, None) not in excluded)
+    return sorted(kept, key=lambda entry: (entry.rule_id, entry.attribute, entry.code))
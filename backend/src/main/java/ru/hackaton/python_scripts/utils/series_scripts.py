@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+
+# Квартальные ряды товаров. История товара хранится как плотный массив, выровненный по PeriodIndex
+# с частотой 'Q': каждый квартал - одна строка, пропуски относительно календаря отчетных периодов
+# заполняются нулями одним reindex. Даты концов кварталов нужны только для графиков и моделей.
+
+QUARTER = pd.PeriodDtype('Q')
+
+
+def quarter_periods(quarters, years):
+    """
+    Векторно переводит пары (квартал, год) в кварталы pandas.
+
+    :param quarters: Номера кварталов (1-4), числа или строки
+    :param years: Годы, числа или строки
+    :return: PeriodIndex с частотой 'Q'
+    """
+    quarters = np.asarray(quarters).astype('int64')
+    years = np.asarray(years).astype('int64')
+    # Порядковый номер квартала в pandas отсчитывается от 1970Q1
+    ordinals = (years - 1970) * 4 + quarters - 1
+    return pd.PeriodIndex(pd.arrays.PeriodArray(ordinals, dtype=QUARTER), name='дата')
+
+
+def calendar_periods(dates):
+    """
+    :param dates: Даты отчетных периодов в формате YYYY-MM-DD
+    :return: PeriodIndex кварталов календаря
+    """
+    return pd.DatetimeIndex(dates).to_period('Q').rename('дата')
+
+
+def quarterly_frame(quarters, years, values, columns, dates):
+    """
+    Строит плотную квартальную таблицу: кварталы с данными плюс все кварталы календаря,
+    отсутствующие кварталы заполняются нулями.
+
+    :param quarters: Номера кварталов строк
+    :param years: Годы строк
+    :param values: Значения, по строке на квартал и по столбцу на колонку
+    :param columns: Названия колонок
+    :param dates: Даты отчетных периодов в формате YYYY-MM-DD
+    :return: DataFrame с PeriodIndex 'дата' по возрастанию
+    """
+    values = np.asarray(values, dtype='float64').reshape(len(quarters), len(columns))
+    valid = np.isin(np.asarray(quarters).astype('int64'), (1, 2, 3, 4))
+    index = quarter_periods(np.asarray(quarters)[valid], np.asarray(years)[valid])
+    frame = pd.DataFrame(values[valid], index=index, columns=columns)
+    if not frame.index.is_unique:
+        # Квартал и год встречаются и строкой, и числом: $group вернет такой квартал дважды
+        frame = frame.groupby(level=0).sum()
+    return frame.reindex(frame.index.union(calendar_periods(dates)), fill_value=0.)
+
+
+def empty_frame(columns):
+    """
+    :param columns: Названия колонок
+    :return: Пустая квартальная таблица
+    """
+    return pd.DataFrame(columns=columns, index=pd.PeriodIndex([], dtype=QUARTER, name='дата'), dtype='float64')
+
+
+def quarter_ends(series):
+    """
+    Переводит квартальный ряд на даты концов кварталов (как их ожидают модели прогноза).
+
+    :param series: Series с PeriodIndex
+    :return: Series с DatetimeIndex
+    """
+    return series.set_axis(series.index.to_timestamp(how='end').normalize())
@@ -0,0 +1,153 @@
+from datetime import datetime
+
+from pymongo import UpdateOne
+
+from utils.mongo_scripts import get_collection
+
+# Последний известный остаток каждого товара: один документ {'_id': название, 'Остаток', 'Дата'}
+# в коллекции "Последние остатки". Загрузка складских остатков обновляет документ товара,
+# если дата ведомости не раньше сохраненной, поэтому остаток товара читается одним запросом по _id.
+# Снимок используется только после полной сборки командой maintenance.py stock (отметка BUILT_ID):
+# обновления при загрузке создают документы лишь для товаров из загруженной ведомости. До сборки
+# остаток читается из "Складские остатки" по индексу (Название, Дата).
+
+SNAPSHOT_COLLECTION = 'Последние остатки'
+STOCK_COLLECTION = 'Складские остатки'
+# _id отметки о сборке снимка; нормализованные названия не содержат пробелов, поэтому не совпадут с ней
+BUILT_ID = 'snapshot built'
+
+_snapshot = {'ready': False}
+
+
+def parse_date(date):
+    """
+    :param date: Дата ведомости в формате dd.mm.yyyy
+    :return: datetime или None, если строка не дата
+    """
+    try:
+        return datetime.strptime(str(date), '%d.%m.%Y')
+    except ValueError:
+        return None
+
+
+def parse_remaining(remaining):
+    """
+    :param remaining: Остаток (число или строка с числом)
+    :return: Остаток числом, 0 для пустых и нечисловых значений
+    """
+    try:
+        return float(remaining)
+    except (TypeError, ValueError):
+        return 0.
+
+
+def snapshot_update(name, date, remaining):
+    """
+    Операция обновления снимка для одной строки ведомости остатков.
+
+    :param name: Нормализованное название товара
+    :param date: Дата ведомости в формате dd.mm.yyyy
+    :param remaining: Остаток (число или строка с числом)
+    :return: UpdateOne для bulk_write
+    """
+    moment = datetime.strptime(date, '%d.%m.%Y')
+    # Строка из более поздней (или той же) ведомости заменяет сохраненную, как при сортировке по дате
+    newer = {'$gte': [moment, {'$ifNull': ['$Дата', moment]}]}
+    return UpdateOne({'_id': name}, [{'$set': {
+        'Остаток': {'$cond': [newer, float(remaining), '$Остаток']},
+        'Дата': {'$cond': [newer, moment, '$Дата']},
+    }}], upsert=True)
+
+
+def update_stock_snapshot(documents):
+    """
+    Обновляет снимок по загруженным документам "Складские остатки".
+
+    :param documents: Документы с полями Название, Дата, Остаток
+    :return: Количество обработанных строк
+    """
+    operations = [snapshot_update(doc['Название'], doc['Дата'], doc['Остаток']) for doc in documents]
+    if operations:
+        # Порядок важен: из строк одной даты остается последняя
+        get_collection(SNAPSHOT_COLLECTION).bulk_write(operations, ordered=True)
+    return len(operations)
+
+
+def latest_stock_pipeline():
+    """
+    :return: Конвейер агрегации: последний остаток и дата ведомости по каждому товару "Складские остатки"
+    """
+    return [
+        {'$set': {'_date': {'$dateFromString': {'dateString': '$Дата', 'format': '%d.%m.%Y', 'onError': None}}}},
+        {'$match': {'_date': {'$ne': None}}},
+        # _id сохраняет порядок загрузки строк одной даты
+        {'$sort': {'_date': 1, '_id': 1}},
+        {'$group': {
+            '_id': '$Название',
+            'Остаток': {'$last': {'$convert': {'input': '$Остаток', 'to': 'double', 'onError': 0., 'onNull': 0.}}},
+            'Дата': {'$last': '$_date'},
+        }},
+    ]
+
+
+def rebuild_stock_snapshot():
+    """
+    Пересобирает снимок по всей коллекции "Складские остатки".
+
+    :return: Количество товаров в снимке
+    """
+    get_collection(STOCK_COLLECTION).aggregate(latest_stock_pipeline() + [{'$out': SNAPSHOT_COLLECTION}],
+                                               allowDiskUse=True)
+    collection = get_collection(SNAPSHOT_COLLECTION)
+    count = collection.estimated_document_count()
+    collection.update_one({'_id': BUILT_ID}, {'$set': {'built_at': datetime.now()}}, upsert=True)
+    _snapshot['ready'] = True
+    return count
+
+
+def stock_snapshot_ready():
+    """
+    :return: True, если снимок собран командой maintenance.py stock
+    """
+    if not _snapshot['ready']:
+        _snapshot['ready'] = get_collection(SNAPSHOT_COLLECTION).find_one({'_id': BUILT_ID}, {'_id': 1}) is not None
+    return _snapshot['ready']
+
+
+def latest_stock(name):
+    """
+    Последний известный остаток товара: из снимка по _id или, пока снимок не собран,
+    по строкам товара в "Складские остатки" (индекс (Название, Дата)).
+
+    :param name: Нормализованное название товара
+    :return: Остаток и дата ведомости (datetime) или None, если товара нет в остатках
+    """
+    if stock_snapshot_ready():
+        document = get_collection(SNAPSHOT_COLLECTION).find_one({'_id': name})
+        if document is None:
+            return None
+        return document['Остаток'], document['Дата']
+
+    # Дата хранится строкой dd.mm.yyyy и не сортируется как строка, поэтому последняя
+    # ведомость выбирается здесь; из строк одной даты остается загруженная последней (больший _id)
+    latest, latest_key = None, None
+    for document in get_collection(STOCK_COLLECTION).find({'Название': name}, {'Дата': 1, 'Остаток': 1}):
+        moment = parse_date(document.get('Дата'))
+        if moment is not None and (latest_key is None or (moment, document['_id']) > latest_key):
+            latest, latest_key = (parse_remaining(document.get('Остаток')), moment), (moment, document['_id'])
+    return latest
+
+
+def latest_stocks(since=None):
+    """
+    Последние остатки всех товаров.
+
+    :param since: Учитывать только остатки из ведомостей не раньше этой даты
+    :return: Словарь {название: остаток}
+    """
+    if stock_snapshot_ready():
+        query = {'_id': {'$ne': BUILT_ID}} if since is None else {'Дата': {'$gte': since}}
+        return {doc['_id']: doc['Остаток'] for doc in get_collection(SNAPSHOT_COLLECTION).find(query)}
+    pipeline = latest_stock_pipeline() + ([] if since is None else [{'$match': {'Дата': {'$gte': since}}}])
+    return {doc['_id']: doc['Остаток']
+            for doc in get_collection(STOCK_COLLECTION).aggregate(pipeline, allowDiskUse=True)}
@@ -0,0 +1,272 @@
+import math
+import re
+from functools import lru_cache
+from itertools import islice
+
+# Чтение выгрузок из dataset/ в документы MongoDB той же формы, что пишут TurnoversParser
+# и StockRemainingsParser. Книги открываются openpyxl в режиме read_only и читаются потоком строк.
+
+TURNOVER_GROUPS = (21, 101, 105)
+
+
+def open_sheet(path):
+    """
+    :param path: Путь к книге .xlsx
+    :return: Книга и первый лист (книгу нужно закрыть после чтения)
+    """
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    return workbook, workbook.worksheets[0]
+
+
+def cell(row, index):
+    return row[index] if row is not None and index < len(row) else None
+
+
+def text(value):
+    return '' if value is None else str(value)
+
+
+def number(value):
+    """
+    Числовое значение ячейки как в TurnoversParser.getCellValue: NaN для пустых и нечисловых ячеек.
+    """
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float('nan')
+
+
+def per_unit(total, count):
+    # Цена за единицу: сумма делится на количество, если количество известно
+    if math.isnan(count):
+        return total
+    if count == 0:
+        return float('nan') if total == 0 or math.isnan(total) else math.copysign(float('inf'), total)
+    return total / count
+
+
+@lru_cache(maxsize=65536)
+def normalize(name):
+    # Так же, как normalizeName в парсерах: без пробельных символов и в нижнем регистре.
+    # Названия повторяются из квартала в квартал, поэтому результат запоминается
+    return re.sub(r'\s', '', name).lower()
+
+
+def turnover_group(filename):
+    """
+    :param filename: Имя файла оборотной ведомости ("... сч. 105 ..." или "... сч_105 ...")
+    :return: Счет (21, 101, 105) или None
+    """
+    match = re.search(r'сч[._]\s*(\d+)', filename)
+    if match and int(match.group(1)) in TURNOVER_GROUPS:
+        return int(match.group(1))
+    return None
+
+
+def quarter_year(filename):
+    """
+    :param filename: Имя файла оборотной ведомости
+    :return: Квартал и год строками, как их сохраняет TurnoversParser
+    """
+    quarter = re.search(r'(\d+) кв\.', filename)
+    year = re.search(r'кв\. (\d+)', filename)
+    return (quarter.group(1) if quarter else None), (year.group(1) if year else None)
+
+
+def turnover_document(name, group, subgroup, quarter, year, unit, counts, totals):
+    count_before, count_debit, count_credit, count_after = counts
+    total_before, total_debit, total_credit, total_after = totals
+    return {
+        "name": normalize(name),
+        "единиц до": count_before,
+        "цена до": per_unit(total_before, count_before),
+        "цена дебет во": per_unit(total_debit, count_debit),
+        "единиц дебет во": count_debit,
+        "цена кредит во": per_unit(total_credit, count_credit),
+        "единиц кредит во": count_credit,
+        "цена после": per_unit(total_after, count_after),
+        "единиц после": count_after,
+        "группа": group,
+        "подгруппа": subgroup,
+        "квартал": quarter,
+        "год": year,
+        "единица измерения": unit,
+    }
+
+
+def read_turnovers_105(rows, quarter, year):
+    subgroup = None
+    for row in islice(rows, 2, None):
+        if text(cell(row, 0)) == '':
+            if text(cell(row, 1)) != '':
+                subgroup = text(cell(row, 1)).split(' ')[0]
+            continue
+        if text(cell(row, 3)) == 'Итого':
+            break
+        name = text(cell(row, 3))
+        if name == '':
+            continue
+        yield turnover_document(name, 105, subgroup, quarter, year, text(cell(row, 4)),
+                                [number(cell(row, column)) for column in (5, 7, 9, 11)],
+                                [number(cell(row, column)) for column in (6, 8, 10, 12)])
+
+
+def read_turnovers_common(rows, group, quarter, year):
+    # Строка товара содержит суммы, следующая за ней - количества; еще две строки - расшифровка
+    subgroup = None
+    rows = islice(rows, 9, None)
+    for row in rows:
+        value = text(cell(row, 0))
+        if re.fullmatch(rf'{group}\.\d+', value):
+            subgroup = value
+        elif value == 'Итого':
+            break
+        elif subgroup is not None and value != '':
+            counts_row = next(rows, None)
+            yield turnover_document(value, group, subgroup, quarter, year, 'шт.',
+                                    [number(cell(counts_row, column)) for column in (10, 12, 13, 14)],
+                                    [number(cell(row, column)) for column in (10, 12, 13, 14)])
+            for _ in islice(rows, 2):
+                pass
+
+
+def read_turnovers(path):
+    """
+    Читает оборотную ведомость (сч. 21, 101 или 105) в документы "Оборотная ведомость".
+
+    :param path: Путь к книге; счет, квартал и год берутся из имени файла
+    :return: Генератор документов
+    """
+    filename = re.split(r'[\\/]', path)[-1]
+    group = turnover_group(filename)
+    if group is None:
+        raise ValueError(f'Не удалось определить счет оборотной ведомости: {filename}')
+    quarter, year = quarter_year(filename)
+    workbook, sheet = open_sheet(path)
+    try:
+        rows = sheet.iter_rows(values_only=True)
+        if group == 105:
+            yield from read_turnovers_105(rows, quarter, year)
+        else:
+            yield from read_turnovers_common(rows, group, quarter, year)
+    finally:
+        workbook.close()
+
+
+def stock_date(filename):
+    """
+    :param filename: Имя файла "Ведомость остатков на dd.mm.yyyy ..."
+    :return: Дата остатков строкой dd.mm.yyyy
+    """
+    return filename[22:32]
+
+
+def read_stock_fixed_assets(rows, group, date, first_row):
+    # Остатки по сч. 21 и 101: строки товаров пронумерованы, строка подгруппы начинается с номера счета
+    subgroup = ''
+    skip = 0
+    for row in islice(rows, first_row, None):
+        if skip:
+            skip -= 1
+            continue
+        value = cell(row, 0)
+        if value is None:
+            continue
+        value = text(value).replace(' ', '') if group == 21 else text(value)
+        if value.isdigit():
+            name = cell(row, 2)
+            if name is not None:
+                yield {
+                    "Название": normalize(text(name)),
+                    "Остаток": number(cell(row, 20)),
+                    "Подгруппа": subgroup,
+                    "Дата": date,
+                    "сч": group,
+                    "полное название": text(name),
+                }
+        elif f'{group}.' in value:
+            match = re.search(rf'{group}\.\d+', value)
+            if match:
+                subgroup = match.group()
+            skip = 4
+        elif value == 'Итого':
+            break
+
+
+def read_stock_105(rows, date):
+    # Остатки по сч. 105: подгруппа - число перед блоком товаров, "1" - номер КФО внутри подгруппы
+    is_new_subgroup, seen_one, subgroup = False, False, 0.
+    for row in islice(rows, 6, None):
+        value = cell(row, 0)
+        if value is None:
+            continue
+        try:
+            numeric = float(value)
+        except ValueError:
+            numeric = None
+        if numeric is not None:
+            if not is_new_subgroup:
+                is_new_subgroup, subgroup = True, numeric
+            elif numeric == 1.:
+                seen_one = True
+            elif seen_one:
+                subgroup = numeric
+            else:
+                is_new_subgroup, seen_one = False, False
+            continue
+        value = text(value)
+        if value in ('', 'Итого') or ',' not in value or not isinstance(cell(row, 2), (int, float)):
+            continue
+        name = value[:value.rindex(',')]
+        yield {
+            "Название": normalize(name),
+            # StockRemainingsParser сохраняет количество по сч. 105 строкой
+            "Остаток": str(float(cell(row, 2))),
+            "Подгруппа": subgroup,
+            "Дата": date,
+            "сч": 105,
+            "полное название": name,
+        }
+
+
+def read_stock(path):
+    """
+    Читает ведомость остатков (сч. 21, 101 или 105) в документы "Складские остатки".
+
+    :param path: Путь к книге; счет и дата берутся из имени файла
+    :return: Генератор документов
+    """
+    filename = re.split(r'[\\/]', path)[-1]
+    group = turnover_group(filename)
+    if group is None:
+        raise ValueError(f'Не удалось определить счет ведомости остатков: {filename}')
+    date = stock_date(filename)
+    workbook, sheet = open_sheet(path)
+    try:
+        rows = sheet.iter_rows(values_only=True)
+        if group == 105:
+            yield from read_stock_105(rows, date)
+        else:
+            yield from read_stock_fixed_assets(rows, group, date, 8 if group == 21 else 9)
+    finally:
+        workbook.close()
+
+
+def read_catalog(path):
+    """
+    Читает справочник КПГЗ/СПГЗ/СТЕ: первая строка - названия полей.
+
+    :param path: Путь к книге
+    :return: Генератор документов "Справочники"
+    """
+    workbook, sheet = open_sheet(path)
+    try:
+        rows = sheet.iter_rows(values_only=True)
+        header = [text(value) for value in next(rows, ())]
+        for row in rows:
+            if any(value is not None for value in row):
+                yield {column: value for column, value in zip(header, row) if column}
+    finally:
+        workbook.close()
@@ -0,0 +1,114 @@
+import json
+import sys
+from os import getenv
+from urllib import error, request
+
+# Клиент пула воркеров и сервера классификации. Модуль использует только стандартную библиотеку,
+# чтобы CLI скриптов оставались легкими и не импортировали pandas/pmdarima/torch.
+
+POOL_URL = getenv('WORKER_POOL_URL', 'http://127.0.0.1:8765')
+CALL_TIMEOUT = float(getenv('WORKER_POOL_TIMEOUT', '120'))
+CLASSIFY_SERVER_URL = getenv('CLASSIFY_SERVER_URL', '')
+CLASSIFY_TIMEOUT = float(getenv('CLASSIFY_TIMEOUT', '10'))
+
+
+class PoolUnavailable(Exception):
+    """Пул воркеров не запущен или недоступен."""
+
+
+class PoolError(Exception):
+    """Пул принял запрос, но не смог его выполнить (ошибка, таймаут, переполнение очереди)."""
+
+
+def call(method, *args, timeout=None):
+    """
+    Вызывает метод в пуле воркеров.
+
+    :param method: Название метода (make_forecast, make_plot_of_remainings, ...)
+    :param args: Позиционные аргументы метода, должны сериализоваться в JSON
+    :param timeout: Таймаут вызова в секундах
+    :return: Результат метода
+    """
+    if not POOL_URL:
+        raise PoolUnavailable('WORKER_POOL_URL не задан')
+    timeout = CALL_TIMEOUT if timeout is None else timeout
+    return post(POOL_URL + '/call', {'method': method, 'args': list(args), 'timeout': timeout}, timeout)['result']
+
+
+def classify(texts, timeout=None):
+    """
+    Классифицирует запросы пользователей на сервере classify_server.py.
+
+    :param texts: Тексты запросов
+    :param timeout: Таймаут вызова в секундах
+    :return: Список классов
+    """
+    if not CLASSIFY_SERVER_URL:
+        raise PoolUnavailable('CLASSIFY_SERVER_URL не задан')
+    timeout = CLASSIFY_TIMEOUT if timeout is None else timeout
+    return post(CLASSIFY_SERVER_URL + '/classify', {'texts': list(texts), 'timeout': timeout}, timeout)['labels']
+
+
+def post(url, payload, timeout):
+    """
+    Отправляет JSON-запрос серверу.
+
+    :return: Ответ сервера
+    """
+    body = json.dumps(payload).encode('utf-8')
+    req = request.Request(url, data=body, headers={'Content-Type': 'application/json'})
+    try:
+        # Небольшой запас, чтобы таймаут сработал на стороне сервера, а не клиента
+        with request.urlopen(req, timeout=timeout + 5) as response:
+            return json.loads(response.read().decode('utf-8'))
+    except error.HTTPError as e:
+        try:
+            message = json.loads(e.read().decode('utf-8'))['error']
+        except (ValueError, KeyError):
+            message = str(e)
+        raise PoolError(message)
+    except (error.URLError, ConnectionError) as e:
+        raise PoolUnavailable(str(e))
+
+
+def to_text(result):
+    """
+    Форматирует результат метода для печати: строки как есть, словари и списки в JSON.
+
+    :param result: Результат метода
+    :return: Строка
+    """
+    if isinstance(result, (dict, list)):
+        return json.dumps(result, ensure_ascii=False)
+    return str(result)
+
+
+def forward_cli(method, converters, output=to_text, as_list=False, flags=()):
+    """
+    Передает аргументы командной строки скрипта в пул воркеров и печатает ответ.
+    Если пул недоступен или аргументы не подходят, возвращает управление скрипту,
+    который выполнит запрос сам.
+
+    :param method: Название метода пула
+    :param converters: Функции преобразования для каждого позиционного аргумента
+    :param output: Функция форматирования результата для печати
+    :param as_list: Передать аргументы методу одним списком
+    :param flags: Булевы флаги скрипта (--inline, ...), передаются методу после позиционных аргументов
+    """
+    argv = [value for value in sys.argv[1:] if value not in flags]
+    if len(argv) != len(converters) or any(value.startswith('--') for value in argv):
+        return
+    try:
+        args = [convert(value) for convert, value in zip(converters, argv)]
+    except ValueError:
+        return
+    args += [flag in sys.argv[1:] for flag in flags]
+    try:
+        result = call(method, args) if as_list else call(method, *args)
+    except PoolUnavailable:
+        return
+    except PoolError as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
+    print(output(result))
+    sys.exit(0)
@@ -0,0 +1,275 @@
+import argparse
+import importlib
+import json
+import logging
+import multiprocessing
+import queue
+import sys
+import threading
+import traceback
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from os import getenv
+from time import monotonic
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+log = logging.getLogger('worker_pool')
+
+# Методы, которые обслуживает пул: название -> (модуль, функция)
+METHODS = {
+    'make_forecast': ('forcaster', 'make_forecast'),
+    'make_plot_of_remainings': ('remainings_by_item', 'make_plot_of_remainings'),
+    'make_action_time_code': ('classify_product', 'make_action_time_code'),
+    'make_json': ('json_maker', 'make_json'),
+    'make_json_batch': ('json_maker', 'make_json_batch'),
+}
+
+WARMUP_TIMEOUT = 300
+# Сколько ждать, пока остановленный воркер сбросит буфер имен товаров и закроет клиент MongoDB
+STOP_TIMEOUT = 10
+
+
+class Server(ThreadingHTTPServer):
+    # Очереди accept по умолчанию (5) мало для пачки одновременных вызовов из Java
+    request_queue_size = 128
+    daemon_threads = True
+
+
+class PoolBusyError(Exception):
+    """Очередь пула переполнена."""
+
+
+class CallTimeoutError(Exception):
+    """Вызов не уложился в отведенное время."""
+
+
+def worker_main(conn):
+    """
+    Цикл процесса-воркера: один раз импортирует скрипты и затем выполняет запросы из канала.
+
+    :param conn: Конец канала multiprocessing.Pipe со стороны воркера
+    """
+    functions, failed = {}, {}
+    for method, (module_name, function_name) in METHODS.items():
+        try:
+            module = importlib.import_module(module_name)
+            # Скрипты загружают тяжелые зависимости лениво; воркер делает это заранее,
+            # чтобы первый запрос не ждал импорта torch или pmdarima
+            if hasattr(module, 'warm_up'):
+                module.warm_up()
+            functions[method] = getattr(module, function_name)
+        except Exception:
+            failed[method] = traceback.format_exc()
+    conn.send(('ready', sorted(failed)))
+
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            break
+        if task is None:
+            break
+        method, args = task
+        if method in failed:
+            conn.send(('error', failed[method]))
+            continue
+        try:
+            conn.send(('ok', functions[method](*args)))
+        except Exception:
+            conn.send(('error', traceback.format_exc()))
+    conn.close()
+    # multiprocessing завершает воркер без atexit, поэтому накопленные имена товаров
+    # и клиент MongoDB сбрасываем и закрываем явно
+    names = sys.modules.get('utils.name_scripts')
+    if names is not None:
+        names.name_registry.try_flush()
+    mongo = sys.modules.get('utils.mongo_scripts')
+    if mongo is not None:
+        mongo.close_client()
+
+
+class Worker:
+    """Процесс-воркер с прогретыми импортами и счетчиком выполненных задач."""
+
+    def __init__(self, max_tasks):
+        self.max_tasks = max_tasks
+        self.process = None
+        self.conn = None
+        self.tasks = 0
+
+    def start(self):
+        parent_conn, child_conn = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=worker_main, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.conn = parent_conn
+        self.tasks = 0
+        if not self.conn.poll(WARMUP_TIMEOUT):
+            self.stop()
+            raise RuntimeError('Воркер не успел прогреться')
+        _, failed = self.conn.recv()
+        if failed:
+            log.warning('Воркер %s запущен без методов: %s', self.process.pid, ', '.join(failed))
+        log.info('Воркер %s готов', self.process.pid)
+
+    def stop(self):
+        if self.process is None:
+            return
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(STOP_TIMEOUT)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+        self.conn.close()
+        self.process = None
+
+    def restart(self):
+        self.stop()
+        self.start()
+
+    @property
+    def exhausted(self):
+        return self.process is None or not self.process.is_alive() or self.tasks >= self.max_tasks
+
+    def call(self, method, args, timeout):
+        self.conn.send((method, args))
+        if not self.conn.poll(timeout):
+            # Зависший воркер нельзя переиспользовать, останавливаем его
+            self.stop()
+            raise CallTimeoutError(f'{method} не завершился за {timeout} с')
+        try:
+            status, payload = self.conn.recv()
+        except EOFError:
+            self.stop()
+            raise RuntimeError(f'Воркер завершился во время выполнения {method}')
+        self.tasks += 1
+        if status == 'error':
+            raise RuntimeError(payload)
+        return payload
+
+
+class WorkerPool:
+    """
+    Пул прогретых процессов с ограниченной очередью ожидания.
+
+    Воркеры перезапускаются после max_tasks задач, по таймауту и при падении.
+    """
+
+    def __init__(self, size, queue_size, max_tasks, timeout):
+        self.timeout = timeout
+        self._idle = queue.Queue()
+        self._slots = threading.BoundedSemaphore(size + queue_size)
+        for _ in range(size):
+            self._recycle(Worker(max_tasks))
+
+    def _recycle(self, worker):
+        def restart():
+            while True:
+                try:
+                    worker.restart()
+                    break
+                except Exception:
+                    log.exception('Не удалось запустить воркер')
+            self._idle.put(worker)
+
+        threading.Thread(target=restart, daemon=True).start()
+
+    def call(self, method, args, timeout=None):
+        """
+        Выполняет метод в свободном воркере.
+
+        :param method: Название метода из METHODS
+        :param args: Список позиционных аргументов
+        :param timeout: Таймаут вызова в секундах
+        :return: Результат метода
+        """
+        if method not in METHODS:
+            raise KeyError(method)
+        timeout = self.timeout if timeout is None else timeout
+        # Ожидание свободного воркера и выполнение укладываются в один таймаут,
+        # иначе клиент (timeout + 5 с) перестает ждать раньше пула
+        deadline = monotonic() + timeout
+        if not self._slots.acquire(blocking=False):
+            raise PoolBusyError('Очередь пула воркеров переполнена')
+        try:
+            try:
+                worker = self._idle.get(timeout=timeout)
+            except queue.Empty:
+                raise CallTimeoutError(f'Нет свободного воркера для {method} за {timeout} с')
+            try:
+                remaining = deadline - monotonic()
+                if remaining <= 0:
+                    raise CallTimeoutError(f'Нет свободного воркера для {method} за {timeout} с')
+                return worker.call(method, args, remaining)
+            finally:
+                if worker.exhausted:
+                    self._recycle(worker)
+                else:
+                    self._idle.put(worker)
+        finally:
+            self._slots.release()
+
+
+def make_handler(pool):
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, status, data):
+            body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == '/health':
+                self._reply(200, {'status': 'ok', 'idle': pool._idle.qsize()})
+            else:
+                self._reply(404, {'error': 'Not found'})
+
+        def do_POST(self):
+            if self.path != '/call':
+                self._reply(404, {'error': 'Not found'})
+                return
+            try:
+                request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                method, args = request['method'], request.get('args', [])
+            except (ValueError, KeyError):
+                self._reply(400, {'error': 'Некорректный запрос'})
+                return
+            try:
+                self._reply(200, {'result': pool.call(method, args, request.get('timeout'))})
+            except KeyError:
+                self._reply(404, {'error': f'Неизвестный метод {method}'})
+            except PoolBusyError as e:
+                self._reply(503, {'error': str(e)})
+            except CallTimeoutError as e:
+                self._reply(504, {'error': str(e)})
+            except Exception as e:
+                self._reply(500, {'error': str(e)})
+
+        def log_message(self, format, *args):
+            log.info('%s %s', self.address_string(), format % args)
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Пул прогретых воркеров для python-скриптов.')
+    parser.add_argument('--host', type=str, default=getenv('WORKER_POOL_HOST', '127.0.0.1'))
+    parser.add_argument('--port', type=int, default=int(getenv('WORKER_POOL_PORT', '8765')))
+    parser.add_argument('--workers', type=int, default=int(getenv('WORKER_POOL_SIZE', '2')))
+    parser.add_argument('--queue-size', type=int, default=int(getenv('WORKER_POOL_QUEUE', '16')))
+    parser.add_argument('--max-tasks', type=int, default=int(getenv('WORKER_POOL_MAX_TASKS', '200')))
+    parser.add_argument('--timeout', type=float, default=float(getenv('WORKER_POOL_TIMEOUT', '120')))
+    args = parser.parse_args()
+
+    pool = WorkerPool(args.workers, args.queue_size, args.max_tasks, args.timeout)
+    server = Server((args.host, args.port), make_handler(pool))
+    log.info('Пул воркеров слушает %s:%s', args.host, args.port)
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+package ru.hackaton.service;
+
+import lombok.extern.slf4j.Slf4j;
+import org.springframework.stereotype.Component;
+
+import java.io.BufferedReader;
+import java.io.InputStreamReader;
+import java.util.concurrent.ExecutorService;
+import java.util.concurrent.Executors;
+
+/**
+ * Сервис обновления колоночной копии (Parquet) оборотной ведомости и складских остатков.
+ * После загрузки файла в фоне запускается maintenance.py export, который дописывает
+ * в копию только новые документы. Выгрузки выполняются по очереди в одном потоке,
+ * ответ на загрузку их не ждет.
+ */
+@Slf4j
+@Component
+public class ColumnarExportService {
+    /**
+     * Путь к скрипту служебных команд.
+     */
+    private static final String MAINTENANCE_SCRIPT_PATH = "/backend/src/main/java/ru/hackaton/python_scripts/maintenance.py";
+    /**
+     * Поток, в котором выполняются выгрузки.
+     */
+    private final ExecutorService executor = Executors.newSingleThreadExecutor();
+
+    /**
+     * Ставит в очередь обновление колоночной копии таблицы.
+     *
+     * @param table Таблица: "turnovers" или "stock".
+     */
+    public void refresh(String table) {
+        executor.submit(() -> export(table));
+    }
+
+    private void export(String table) {
+        String[] command = {"python3", MAINTENANCE_SCRIPT_PATH, "export", "--table", table};
+        try {
+            ProcessBuilder pb = new ProcessBuilder(command);
+            pb.redirectErrorStream(true);
+            Process process = pb.start();
+            StringBuilder outputBuilder = new StringBuilder();
+            try (BufferedReader output = new BufferedReader(new InputStreamReader(process.getInputStream()))) {
+                String s;
+                while ((s = output.readLine()) != null) {
+                    outputBuilder.append(s).append("\n");
+                }
+            }
+            int exitCode = process.waitFor();
+            if (exitCode != 0) {
+                log.error("Выгрузка {} завершилась с кодом {}: {}", table, exitCode, outputBuilder.toString().trim());
+            } else {
+                log.info(outputBuilder.toString().trim());
+            }
+        } catch (Exception e) {
+            log.error("Exception occurred: {}", e.getMessage());
+        }
+    }
+}
@@ -0,0 +1,47 @@
+package ru.hackaton.service;
+
+import lombok.extern.slf4j.Slf4j;
+import org.springframework.scheduling.annotation.Scheduled;
+import org.springframework.stereotype.Component;
+
+import java.io.BufferedReader;
+import java.io.InputStreamReader;
+
+/**
+ * Сервис пакетного прогноза. Раз в сутки, до проверки мониторинга товаров, запускает
+ * forcaster.py --batch, который прогнозирует потребление всех товаров в коллекцию "Прогнозы".
+ * Запросы прогноза из бота и мониторинга берут готовый прогноз оттуда вместо обучения модели.
+ */
+@Slf4j
+@Component
+public class ForecastBatchService {
+    /**
+     * Путь к скрипту прогноза.
+     */
+    private static final String FORECASTER_SCRIPT_PATH = "/backend/src/main/java/ru/hackaton/python_scripts/forcaster.py";
+
+    @Scheduled(cron = "0 0 1 * * ?")
+    public void forecastAll() {
+        String[] command = {"python3", FORECASTER_SCRIPT_PATH, "--batch", "--months", Integer.toString(3)};
+        try {
+            ProcessBuilder pb = new ProcessBuilder(command);
+            pb.redirectErrorStream(true);
+            Process process = pb.start();
+            StringBuilder outputBuilder = new StringBuilder();
+            try (BufferedReader output = new BufferedReader(new InputStreamReader(process.getInputStream()))) {
+                String s;
+                while ((s = output.readLine()) != null) {
+                    outputBuilder.append(s).append("\n");
+                }
+            }
+            int exitCode = process.waitFor();
+            if (exitCode != 0) {
+                log.error("Пакетный прогноз завершился с кодом {}: {}", exitCode, outputBuilder.toString().trim());
+            } else {
+                log.info("Пакетный прогноз сохранен: {} товаров", outputBuilder.toString().trim());
+            }
+        } catch (Exception e) {
+            log.error("Exception occurred: {}", e.getMessage());
+        }
+    }
+}
@@ -10,7 +10,7 @@ from dateutil.relativedelta import relativedelta
 
 from aiogram import Router
 from aiogram.fsm.context import FSMContext
-from aiogram.types import CallbackQuery, FSInputFile
+from aiogram.types import CallbackQuery, FSInputFile, BufferedInputFile
 
 from utils.keyboards import keyboard_builder
 from utils.auth_methods import get_token, store_session, is_refresh_expired, delete_token, \
@@ -205,9 +205,8 @@ async def stock_choose_good(query: CallbackQuery, state: FSMContext):
     await state.update_data(chosen_product=chosen_product)
     await query.message.edit_text("Был выбран товар:\n\n<b>" + chosen_product + "</b>", parse_mode="HTML")
     remains_response = get_remains(chosen_product)
-    await query.message.answer_photo(photo=FSInputFile(remains_response["file_name"]))
+    await query.message.answer_photo(photo=BufferedInputFile(remains_response["image"], filename="chart.png"))
     await state.set_state(BotStates.choosing_predict)
-    os.remove(remains_response["file_name"])
     await query.message.answer(remains_response["message"], reply_markup=keyboard_builder(["Сформировать прогноз",
                                                                                            "Вернуться назад↩️"]))
 
@@ -255,22 +254,19 @@ async def choose_predict_period(query: CallbackQuery, state: FSMContext):
     await state.update_data(json_product=chosen_product)
     await state.update_data(json_period=n_months)
     await state.set_state(BotStates.asking_json)
-    if not response_data["file_name1"] and not response_data["file_name2"]:
+    if not response_data["image1"] and not response_data["image2"]:
         await query.message.answer(response_data["message"],
                                    reply_markup=keyboard_builder(["Вернуться назад↩️"]))
-    elif response_data["file_name1"] and not response_data["file_name2"]:
-        await query.message.answer_photo(photo=FSInputFile(response_data["file_name1"]),
+    elif response_data["image1"] and not response_data["image2"]:
+        await query.message.answer_photo(photo=BufferedInputFile(response_data["image1"], filename="chart1.png"),
                                          caption="Статистика по потреблению.")
-        os.remove(response_data["file_name1"])
         await query.message.answer(response_data["message"],
                                    reply_markup=keyboard_builder(["Вернуться назад↩️"]))
-    elif response_data["file_name1"] and response_data["file_name2"]:
-        await query.message.answer_photo(photo=FSInputFile(response_data["file_name1"]),
+    elif response_data["image1"] and response_data["image2"]:
+        await query.message.answer_photo(photo=BufferedInputFile(response_data["image1"], filename="chart1.png"),
                                          caption="Статистика по потреблению.")
-        os.remove(response_data["file_name1"])
-        await query.message.answer_photo(photo=FSInputFile(response_data["file_name2"]),
+        await query.message.answer_photo(photo=BufferedInputFile(response_data["image2"], filename="chart2.png"),
                                          caption="Прогнозируемое потребление товара.")
-        os.remove(response_data["file_name2"])
         if response_data["message"] == "На складе имеется достаточное количество товаров для данного срока.":
             await state.update_data(json_num=0)
         else:
@@ -325,21 +321,18 @@ async def nlp_forecast_choose_good(query: CallbackQuery, state: FSMContext):
     await state.update_data(json_product=chosen_product)
     await state.update_data(json_period=user_data["n_months"])
     await state.set_state(BotStates.asking_json)
-    if not prediction_response["file_name1"] and not prediction_response["file_name2"]:
+    if not prediction_response["image1"] and not prediction_response["image2"]:
         await query.message.answer(prediction_response["message"], reply_markup=keyboard_builder(["Вернуться назад↩️"]))
-    elif prediction_response["file_name1"] and not prediction_response["file_name2"]:
-        await query.message.answer_photo(photo=FSInputFile(prediction_response["file_name1"]),
+    elif prediction_response["image1"] and not prediction_response["image2"]:
+        await query.message.answer_photo(photo=BufferedInputFile(prediction_response["image1"], filename="chart1.png"),
                                          caption="Статистика по потреблению.")
-        os.remove(prediction_response["file_name1"])
         await query.message.answer(prediction_response["message"],
                                    reply_markup=keyboard_builder(["Вернуться назад↩️"]))
-    elif prediction_response["file_name1"] and prediction_response["file_name2"]:
-        await query.message.answer_photo(photo=FSInputFile(prediction_response["file_name1"]),
+    elif prediction_response["image1"] and prediction_response["image2"]:
+        await query.message.answer_photo(photo=BufferedInputFile(prediction_response["image1"], filename="chart1.png"),
                                          caption="Статистика по потреблению.")
-        os.remove(prediction_response["file_name1"])
-        await query.message.answer_photo(photo=FSInputFile(prediction_response["file_name2"]),
+        await query.message.answer_photo(photo=BufferedInputFile(prediction_response["image2"], filename="chart2.png"),
                                          caption="Прогнозируемое потребление товара.")
-        os.remove(prediction_response["file_name2"])
         if prediction_response["message"] == "На складе имеется достаточное количество товаров для данного срока.":
             await state.update_data(json_num=0)
         else:
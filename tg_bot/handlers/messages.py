@@ -6,7 +6,7 @@ from functools import wraps
 
 from aiogram import Router
 from aiogram.fsm.context import FSMContext
-from aiogram.types import Message, FSInputFile
+from aiogram.types import Message, BufferedInputFile
 
 from utils.keyboards import keyboard_builder
 from utils.auth_methods import get_token, store_session, is_refresh_expired, delete_token, \
@@ -120,22 +120,19 @@ async def choose_action(message: Message, state: FSMContext):
                     await state.update_data(json_product=prediction_prod_list[0])
                     await state.update_data(json_period=n_months)
                     await state.set_state(BotStates.asking_json)
-                    if not prediction_response["file_name1"] and not prediction_response["file_name2"]:
+                    if not prediction_response["image1"] and not prediction_response["image2"]:
                         await message.answer(prediction_response["message"],
                                              reply_markup=keyboard_builder(["Вернуться назад↩️"]))
-                    elif prediction_response["file_name1"] and not prediction_response["file_name2"]:
-                        await message.answer_photo(photo=FSInputFile(prediction_response["file_name1"]),
+                    elif prediction_response["image1"] and not prediction_response["image2"]:
+                        await message.answer_photo(photo=BufferedInputFile(prediction_response["image1"], filename="chart1.png"),
                                                    caption="Статистика по потреблению.")
-                        os.remove(prediction_response["file_name1"])
                         await message.answer(prediction_response["message"],
                                              reply_markup=keyboard_builder(["Вернуться назад↩️"]))
-                    elif prediction_response["file_name1"] and prediction_response["file_name2"]:
-                        await message.answer_photo(photo=FSInputFile(prediction_response["file_name1"]),
+                    elif prediction_response["image1"] and prediction_response["image2"]:
+                        await message.answer_photo(photo=BufferedInputFile(prediction_response["image1"], filename="chart1.png"),
                                                    caption="Статистика по потреблению.")
-                        os.remove(prediction_response["file_name1"])
-                        await message.answer_photo(photo=FSInputFile(prediction_response["file_name2"]),
+                        await message.answer_photo(photo=BufferedInputFile(prediction_response["image2"], filename="chart2.png"),
                                                    caption="Прогнозируемое потребление товара.")
-                        os.remove(prediction_response["file_name2"])
                         if prediction_response["message"] == ("На складе имеется достаточное количество товаров для "
                                                               "данного срока."):
                             await state.update_data(json_num=0)
@@ -191,9 +188,8 @@ async def choose_action(message: Message, state: FSMContext):
                     await message.answer("Найден только 1 подходящий товар, поэтому он был выбран:\n\n<b>" +
                                          remains_prod_list[0] + "</b>", parse_mode="HTML")
                     remains_response = get_remains(remains_prod_list[0])
-                    await message.answer_photo(photo=FSInputFile(remains_response["file_name"]))
+                    await message.answer_photo(photo=BufferedInputFile(remains_response["image"], filename="chart.png"))
                     await state.set_state(BotStates.choosing_predict)
-                    os.remove(remains_response["file_name"])
                     await message.answer(remains_response["message"],
                                          reply_markup=keyboard_builder(["Сформировать прогноз", "Вернуться назад↩️"]))
                 elif remains_prod_list:
@@ -245,9 +241,8 @@ async def stock_remains(message: Message, state: FSMContext):
         await message.answer("Найден только 1 подходящий товар, поэтому он был выбран:\n\n<b>" +
                              remains_prod_list[0] + "</b>", parse_mode="HTML")
         remains_response = get_remains(remains_prod_list[0])
-        await message.answer_photo(photo=FSInputFile(remains_response["file_name"]))
+        await message.answer_photo(photo=BufferedInputFile(remains_response["image"], filename="chart.png"))
         await state.set_state(BotStates.choosing_predict)
-        os.remove(remains_response["file_name"])
         await message.answer(remains_response["message"], reply_markup=keyboard_builder(["Сформировать прогноз",
                                                                                          "Вернуться назад↩️"]))
     elif remains_prod_list:
@@ -350,22 +345,19 @@ async def choose_period(message: Message, state: FSMContext):
         await state.update_data(json_period=n_months)
         await state.update_data(json_product=desired_product)
         await state.set_state(BotStates.asking_json)
-        if not prediction_response["file_name1"] and not prediction_response["file_name2"]:
+        if not prediction_response["image1"] and not prediction_response["image2"]:
             await message.answer(prediction_response["message"],
                                  reply_markup=keyboard_builder(["Вернуться назад↩️"]))
-        elif prediction_response["file_name1"] and not prediction_response["file_name2"]:
-            await message.answer_photo(photo=FSInputFile(prediction_response["file_name1"]),
+        elif prediction_response["image1"] and not prediction_response["image2"]:
+            await message.answer_photo(photo=BufferedInputFile(prediction_response["image1"], filename="chart1.png"),
                                        caption="Статистика по потреблению.")
-            os.remove(prediction_response["file_name1"])
             await message.answer(prediction_response["message"],
                                  reply_markup=keyboard_builder(["Вернуться назад↩️"]))
-        elif prediction_response["file_name1"] and prediction_response["file_name2"]:
-            await message.answer_photo(photo=FSInputFile(prediction_response["file_name1"]),
+        elif prediction_response["image1"] and prediction_response["image2"]:
+            await message.answer_photo(photo=BufferedInputFile(prediction_response["image1"], filename="chart1.png"),
                                        caption="Статистика по потреблению.")
-            os.remove(prediction_response["file_name1"])
-            await message.answer_photo(photo=FSInputFile(prediction_response["file_name2"]),
+            await message.answer_photo(photo=BufferedInputFile(prediction_response["image2"], filename="chart2.png"),
                                        caption="Прогнозируемое потребление товара.")
-            os.remove(prediction_response["file_name2"])
             if prediction_response["message"] == "На складе имеется достаточное количество товаров для данного срока.":
                 await state.update_data(json_num=0)
             else:
@@ -398,22 +390,19 @@ async def nlp_forecast_choose_good(message: Message, state: FSMContext):
         await state.update_data(json_product=chosen_product)
         await state.update_data(json_period=user_data["n_months"])
         await state.set_state(BotStates.asking_json)
-        if not prediction_response["file_name1"] and not prediction_response["file_name2"]:
+        if not prediction_response["image1"] and not prediction_response["image2"]:
             await message.answer(prediction_response["message"],
                                  reply_markup=keyboard_builder(["Вернуться назад↩️"]))
-        elif prediction_response["file_name1"] and not prediction_response["file_name2"]:
-            await message.answer_photo(photo=FSInputFile(prediction_response["file_name1"]),
+        elif prediction_response["image1"] and not prediction_response["image2"]:
+            await message.answer_photo(photo=BufferedInputFile(prediction_response["image1"], filename="chart1.png"),
                                        caption="Статистика по потреблению.")
-            os.remove(prediction_response["file_name1"])
             await message.answer(prediction_response["message"],
                                  reply_markup=keyboard_builder(["Вернуться назад↩️"]))
-        elif prediction_response["file_name1"] and prediction_response["file_name2"]:
-            await message.answer_photo(photo=FSInputFile(prediction_response["file_name1"]),
+        elif prediction_response["image1"] and prediction_response["image2"]:
+            await message.answer_photo(photo=BufferedInputFile(prediction_response["image1"], filename="chart1.png"),
                                        caption="Статистика по потреблению.")
-            os.remove(prediction_response["file_name1"])
-            await message.answer_photo(photo=FSInputFile(prediction_response["file_name2"]),
+            await message.answer_photo(photo=BufferedInputFile(prediction_response["image2"], filename="chart2.png"),
                                        caption="Прогнозируемое потребление товара.")
-            os.remove(prediction_response["file_name2"])
             if prediction_response["message"] == "На складе имеется достаточное количество товаров для данного срока.":
                 await state.update_data(json_num=0)
             else:
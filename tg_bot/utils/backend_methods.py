@@ -1,6 +1,5 @@
 import base64
 import os
-import time
 
 import requests
 from dotenv import load_dotenv
@@ -25,11 +24,9 @@ def get_remains(message):
     if response.status_code // 100 == 2:
         data = response.json()
         message = data['message']
-        file_data = base64.b64decode(data['image'])
-        file_name = "temp_files/" + str(time.time_ns()) + '.png'
-        with open(file_name, 'wb') as f:
-            f.write(file_data)
-        return {'message': message, 'file_name': file_name}
+        # Изображение передается в обработчики в памяти, без временных файлов
+        image = base64.b64decode(data['image'])
+        return {'message': message, 'image': image}
     return None
 
 
@@ -39,21 +36,9 @@ def get_prediction(message, n_months):
     if response.status_code // 100 == 2:
         data = response.json()
         message = data['message']
-        if data['image1']:
-            file_data1 = base64.b64decode(data['image1'])
-            file_name1 = "temp_files/" + str(time.time_ns()) + '1.png'
-            with open(file_name1, 'wb') as f:
-                f.write(file_data1)
-        else:
-            file_name1 = None
-        if data['image2']:
-            file_data2 = base64.b64decode(data['image2'])
-            file_name2 = "temp_files/" + str(time.time_ns()) + '2.png'
-            with open(file_name2, 'wb') as f:
-                f.write(file_data2)
-        else:
-            file_name2 = None
-        return {'message': message, 'file_name1': file_name1, 'file_name2': file_name2}
+        image1 = base64.b64decode(data['image1']) if data['image1'] else None
+        image2 = base64.b64decode(data['image2']) if data['image2'] else None
+        return {'message': message, 'image1': image1, 'image2': image2}
     return None
 
 